@@ -0,0 +1,281 @@
+from datetime import datetime
+import threading
+import tempfile
+import glob
+import json
+import re
+import os
+import sys
+sys.path.append('../scraper')
+from fields import parse_score, parse_timestamp
+from recrawl import canonical_url
+import argparse
+
+
+class ScoreHistory:
+    '''
+    This class keeps the scores of every run as a time series of typed columns, one snapshot file per run, Parquet by default,
+    so the history can be ranked and compared with vectorised pandas operations instead of re-parsing the JSON of every show.
+    A Scraper adds each saved show to the current run with record(), and commit() writes the run out as a new snapshot.
+    Every batch_size shows, the recorded rows are written to a part file in a pending folder, so a long crawl does not hold its whole run in memory,
+    and commit() renames the parts into place as the run's snapshot, split over numbered part files when there is more than one.
+    Snapshots are only read when they are first needed, and kept in memory after that
+
+    Parameters:
+    ----------
+    root: str
+        The folder the snapshot files are saved in
+    format: str
+        'parquet', or 'pickle' where no Parquet engine is installed
+    weights: tuple
+        How much the tomatometer and the audience score each count towards the combined score
+    batch_size: int
+        Number of recorded shows kept in memory before they are written to a part file of the run
+
+
+    Attributes:
+    ----------
+    rows: dict
+        The columns of the run being recorded that have not been written to a part file yet, each a list of values
+    parts: list
+        The part files already written for the run being recorded
+    cache: dict
+        The snapshots read so far, keyed by run
+
+
+    Methods:
+    -------
+    record()
+        Adds the typed scores of an item dictionary to the run being recorded, writing a part file once batch_size are held
+    frame()
+        Returns recorded rows as a DataFrame of typed columns
+    write_frame()
+        Writes a DataFrame in the history's format to a temporary file and renames it into place
+    write_part()
+        Writes recorded rows to the next part file of the run being recorded
+    commit()
+        Writes the last recorded rows out, then renames the run's part files into place as a snapshot named after the time, and an optional suffix, and starts a new run
+    import_items()
+        Records every item dictionary of an iterable and commits them as one snapshot, for example the items of a storage backend's read()
+    import_folder()
+        Records the data.json file of every show folder saved by the FolderStorage and commits them as one snapshot
+    runs()
+        Returns the name of every snapshot, oldest first
+    concat()
+        Joins snapshots or parts into one DataFrame, with the union of their genre and TV network categories
+    snapshot()
+        Returns one run's snapshot as a DataFrame, reading its part files the first time it is needed
+    history()
+        Returns every snapshot as one DataFrame, sorted by the time each show was scraped
+    latest()
+        Returns the most recent scores of every show across all snapshots
+    rank()
+        Returns the shows ranked by their combined score, optionally for one genre or TV network
+    deltas()
+        Returns how much each show's scores changed between its last two observations, or between two runs
+    top_movers()
+        Returns the shows whose scores changed the most
+    '''
+
+    COLUMNS = ('url', 'id', 'title', 'genre', 'tv_network', 'tomatometer', 'audience_score', 'scraped_at')
+    EXTENSIONS = {'parquet': 'parquet', 'pickle': 'pkl'}
+    PART = re.compile(r'\.part\d{5}$')
+
+    def __init__(self, root='../raw_data/score_history', format='parquet', weights=(0.5, 0.5), batch_size=10000):
+        if format not in ScoreHistory.EXTENSIONS:
+            raise ValueError(f"format must be 'parquet' or 'pickle', not '{format}'")
+        self.root = os.path.abspath(root)
+        self.format = format
+        self.weights = weights
+        self.batch_size = batch_size
+        self.rows = {column: [] for column in ScoreHistory.COLUMNS}
+        self.parts = []
+        self.cache = {}
+        self._history = None
+        self._pending = None
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def record(self, item_dict):
+        url = item_dict.get('URL') or item_dict['ID']
+        values = (
+            canonical_url(url) if url.startswith('http') else url,
+            item_dict.get('ID'),
+            item_dict.get('Title'),
+            item_dict.get('Genre'),
+            item_dict.get('TV Network'),
+            parse_score(item_dict.get('Tomatometer')),
+            parse_score(item_dict.get('Audience Score')),
+            parse_timestamp(item_dict.get('Timestamp')) or datetime.now()
+        )
+        with self._lock:
+            for column, value in zip(ScoreHistory.COLUMNS, values):
+                self.rows[column].append(value)
+            if len(self.rows['url']) >= self.batch_size:
+                ScoreHistory.write_part(self)
+
+    def frame(self, rows):
+        import pandas as pd
+        frame = pd.DataFrame(rows)
+        frame['tomatometer'] = frame['tomatometer'].astype('float32')
+        frame['audience_score'] = frame['audience_score'].astype('float32')
+        frame['scraped_at'] = pd.to_datetime(frame['scraped_at'])
+        for column in ('genre', 'tv_network'):
+            frame[column] = frame[column].astype('category')
+        return frame
+
+    def write_frame(self, frame, path):
+        if self.format == 'parquet':
+            frame.to_parquet(f'{path}.tmp', index=False)
+        else:
+            frame.to_pickle(f'{path}.tmp', compression=None)
+        os.replace(f'{path}.tmp', path)
+
+    def write_part(self):
+        rows = self.rows
+        self.rows = {column: [] for column in ScoreHistory.COLUMNS}
+        if self._pending == None:
+            self._pending = tempfile.mkdtemp(prefix='.pending-', dir=self.root)
+        path = os.path.join(self._pending, f'part{len(self.parts):05d}.{ScoreHistory.EXTENSIONS[self.format]}')
+        ScoreHistory.write_frame(self, ScoreHistory.frame(self, rows), path)
+        self.parts.append((path, len(rows['url'])))
+
+    def commit(self, suffix=None):
+        with self._lock:
+            if len(self.rows['url']) > 0:
+                ScoreHistory.write_part(self)
+            parts, pending = self.parts, self._pending
+            self.parts = []
+            self._pending = None
+        if len(parts) == 0:
+            return None
+        run = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        if suffix != None:
+            run = f'{run}-{suffix}'
+        extension = ScoreHistory.EXTENSIONS[self.format]
+        for n, (path, count) in enumerate(parts):
+            name = f'{run}.{extension}' if len(parts) == 1 else f'{run}.part{n:05d}.{extension}'
+            os.replace(path, os.path.join(self.root, name))
+        os.rmdir(pending)
+        with self._lock:
+            self._history = None
+        print(f'Score history snapshot {run} saved with {sum(count for path, count in parts)} shows')
+        return run
+
+    def import_items(self, item_dicts, suffix='import'):
+        for item_dict in item_dicts:
+            ScoreHistory.record(self, item_dict)
+        return ScoreHistory.commit(self, suffix)
+
+    def import_folder(self, folder='../raw_data'):
+        def read_folder():
+            for path in glob.glob(os.path.join(folder, '*', 'data.json')):
+                with open(path) as fp:
+                    yield json.load(fp)
+        return ScoreHistory.import_items(self, read_folder(), suffix='folder')
+
+    def runs(self):
+        extension = ScoreHistory.EXTENSIONS[self.format]
+        return sorted(set(ScoreHistory.PART.sub('', name[:-len(extension) - 1]) for name in os.listdir(self.root) if name.endswith(f'.{extension}')))
+
+    def concat(self, frames):
+        import pandas as pd
+        for column in ('genre', 'tv_network'):
+            categories = pd.api.types.union_categoricals([frame[column] for frame in frames]).categories
+            frames = [frame.assign(**{column: frame[column].cat.set_categories(categories)}) for frame in frames]
+        return pd.concat(frames, ignore_index=True)
+
+    def snapshot(self, run):
+        import pandas as pd
+        with self._lock:
+            if run in self.cache:
+                return self.cache[run]
+        extension = ScoreHistory.EXTENSIONS[self.format]
+        names = sorted(name for name in os.listdir(self.root) if name == f'{run}.{extension}' or (name.startswith(f'{run}.part') and ScoreHistory.PART.fullmatch(name[len(run):-len(extension) - 1])))
+        frames = []
+        for name in names:
+            path = os.path.join(self.root, name)
+            if self.format == 'parquet':
+                frames.append(pd.read_parquet(path))
+            else:
+                frames.append(pd.read_pickle(path, compression=None))
+        frame = ScoreHistory.concat(self, frames).assign(run=run)
+        with self._lock:
+            self.cache[run] = frame
+        return frame
+
+    def history(self):
+        import pandas as pd
+        runs = ScoreHistory.runs(self)
+        with self._lock:
+            if self._history != None and self._history[0] == runs:
+                return self._history[1]
+        if len(runs) == 0:
+            return pd.DataFrame(columns=list(ScoreHistory.COLUMNS) + ['run'])
+        frames = [ScoreHistory.snapshot(self, run) for run in runs]
+        history = ScoreHistory.concat(self, frames).sort_values(['scraped_at', 'run'], kind='stable', ignore_index=True)
+        with self._lock:
+            self._history = (runs, history)
+        return history
+
+    def latest(self):
+        return ScoreHistory.history(self).drop_duplicates('url', keep='last').reset_index(drop=True)
+
+    def combined(self, frame):
+        tomatometer_weight, audience_weight = self.weights
+        return (frame['tomatometer'] * tomatometer_weight + frame['audience_score'] * audience_weight) / (tomatometer_weight + audience_weight)
+
+    def rank(self, limit=None, genre=None, tv_network=None):
+        frame = ScoreHistory.latest(self)
+        frame = frame[frame['tomatometer'].notna() & frame['audience_score'].notna()]
+        if genre != None:
+            frame = frame[frame['genre'] == genre]
+        if tv_network != None:
+            frame = frame[frame['tv_network'] == tv_network]
+        frame = frame.assign(combined=ScoreHistory.combined(self, frame))
+        frame['rank'] = frame['combined'].rank(ascending=False, method='min').astype('int64')
+        frame = frame.sort_values(['rank', 'title'], ignore_index=True)
+        return frame if limit == None else frame.head(limit)
+
+    def deltas(self, before=None, after=None):
+        columns = ['tomatometer', 'audience_score']
+        if before != None and after != None:
+            old = ScoreHistory.snapshot(self, before).drop_duplicates('url', keep='last').set_index('url')
+            new = ScoreHistory.snapshot(self, after).drop_duplicates('url', keep='last').set_index('url')
+            shared = new.index.intersection(old.index)
+            frame = new.loc[shared, ['title', 'genre', 'tv_network', 'scraped_at'] + columns].copy()
+            changes = new.loc[shared, columns] - old.loc[shared, columns]
+            frame = frame.reset_index()
+            changes = changes.reset_index(drop=True)
+        else:
+            history = ScoreHistory.history(self)
+            observations = history.groupby('url', sort=False).cumcount()
+            counts = history.groupby('url', sort=False)['url'].transform('size')
+            changes = history[columns].groupby(history['url'], sort=False).diff()
+            last = (observations == counts - 1) & (counts > 1)
+            frame = history.loc[last, ['url', 'title', 'genre', 'tv_network', 'scraped_at'] + columns].reset_index(drop=True)
+            changes = changes[last].reset_index(drop=True)
+        frame['tomatometer_delta'] = changes['tomatometer']
+        frame['audience_score_delta'] = changes['audience_score']
+        frame['combined_delta'] = ScoreHistory.combined(self, changes)
+        return frame
+
+    def top_movers(self, limit=10, column='combined_delta', before=None, after=None):
+        frame = ScoreHistory.deltas(self, before, after)
+        order = frame[column].abs().sort_values(ascending=False, kind='stable').index
+        return frame.loc[order].head(limit).reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ranks the scraped TV shows and finds the biggest score changes between runs')
+    parser.add_argument('--root', default='../raw_data/score_history', help='folder of the score history snapshots')
+    parser.add_argument('--format', choices=['parquet', 'pickle'], default='parquet', help='file format of the snapshots')
+    parser.add_argument('--import-folder', action='store_true', help='add the shows saved in ../raw_data by the folder storage as a snapshot first')
+    parser.add_argument('--top', type=int, default=10, help='number of shows ranked and movers listed')
+    parser.add_argument('--genre', help='only rank shows of this genre')
+    args = parser.parse_args()
+    history = ScoreHistory(args.root, format=args.format)
+    if args.import_folder:
+        history.import_folder()
+    print(history.rank(limit=args.top, genre=args.genre)[['rank', 'title', 'tomatometer', 'audience_score', 'combined']].to_string(index=False))
+    print(history.top_movers(limit=args.top)[['title', 'tomatometer_delta', 'audience_score_delta', 'combined_delta']].to_string(index=False))
@@ -0,0 +1,286 @@
+import threading
+import hashlib
+import mmap
+import glob
+import json
+import os
+import sys
+sys.path.append('../scraper')
+from recrawl import canonical_url
+import argparse
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+KEY_FIELDS = ('Title', 'ID', 'URL', 'Tomatometer', 'Audience Score', 'TV Network', 'Premiere Date', 'Genre', 'Timestamp')
+
+
+def corpus_key(item_dict):
+    '''
+    Returns the key a show is stored under in the corpus, its canonical url, or its ID if it has no url
+    '''
+    url = item_dict.get('URL')
+    return canonical_url(url) if url else item_dict['ID']
+
+
+class CorpusIndex:
+    '''
+    This class keeps a packed copy of every saved dictionary next to the show folders, so the corpus can be loaded without opening each folder.
+    Each dictionary is appended to a single pack file as one line of compact JSON, then a manifest line holding its key fields,
+    folder, offset, length and hash is appended to the manifest, so an update never rewrites what has already been saved.
+    A later line for the same show replaces the earlier one, and compact() drops the replaced records.
+    Writers in several threads or processes share the files, taking an exclusive lock around each append
+
+    Parameters:
+    ----------
+    root: str
+        The folder the pack, manifest and lock files are saved in, the raw_data folder holding the show folders by default
+    name: str
+        The file name the pack, manifest and lock files start with
+
+
+    Attributes:
+    ----------
+    added: int
+        Number of dictionaries added to the corpus by this index
+
+
+    Methods:
+    -------
+    lock()
+        Takes the shared or exclusive lock of the corpus files, between threads and, where fcntl is available, between processes
+    unlock()
+        Releases the lock
+    entry()
+        Returns the manifest entry of a packed dictionary
+    add()
+        Appends a dictionary to the pack and its entry to the manifest
+    import_folder()
+        Adds the data.json file of every show folder saved by the FolderStorage, to index a corpus saved before the index existed
+    compact()
+        Rewrites the pack and manifest with only the latest record of each show
+    '''
+
+    def __init__(self, root='../raw_data', name='corpus'):
+        self.root = os.path.abspath(root)
+        self.name = name
+        self.pack_path = os.path.join(self.root, f'{name}.pack')
+        self.manifest_path = os.path.join(self.root, f'{name}.manifest.jsonl')
+        self.lock_path = os.path.join(self.root, f'{name}.lock')
+        self.added = 0
+        self._lock = threading.Lock()
+        self._lock_file = None
+        os.makedirs(self.root, exist_ok=True)
+
+    def lock(self, shared=False):
+        self._lock.acquire()
+        self._lock_file = open(self.lock_path, 'a')
+        if fcntl != None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+
+    def unlock(self):
+        if fcntl != None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._lock_file.close()
+        self._lock_file = None
+        self._lock.release()
+
+    def entry(self, item_dict, folder, offset, record):
+        entry = {'key': corpus_key(item_dict), 'folder': folder, 'offset': offset, 'length': len(record), 'sha256': hashlib.sha256(record).hexdigest()}
+        for field in KEY_FIELDS:
+            entry[field] = item_dict.get(field)
+        return entry
+
+    def add(self, item_dict, file_path=None):
+        record = json.dumps(item_dict, separators=(',', ':')).encode() + b'\n'
+        folder = os.path.basename(file_path) if file_path != None else None
+        CorpusIndex.lock(self)
+        try:
+            with open(self.pack_path, 'ab') as fp:
+                offset = fp.seek(0, os.SEEK_END)
+                fp.write(record)
+            with open(self.manifest_path, 'a') as fp:
+                fp.write(json.dumps(CorpusIndex.entry(self, item_dict, folder, offset, record)) + '\n')
+            self.added += 1
+        finally:
+            CorpusIndex.unlock(self)
+
+    def import_folder(self, folder=None):
+        folder = folder or self.root
+        added = self.added
+        for path in sorted(glob.glob(os.path.join(folder, '*', 'data.json'))):
+            with open(path) as fp:
+                CorpusIndex.add(self, json.load(fp), os.path.dirname(path))
+        print(f'{self.added - added} show folders added to the corpus index in {self.root}')
+        return self.added - added
+
+    def compact(self):
+        CorpusIndex.lock(self)
+        try:
+            loader = CorpusLoader(self.root, self.name, locked=True)
+            with open(f'{self.pack_path}.tmp', 'wb') as pack, open(f'{self.manifest_path}.tmp', 'w') as manifest:
+                for entry in sorted(loader.entries.values(), key=lambda entry: entry['offset']):
+                    record = loader.record(entry)
+                    manifest.write(json.dumps(dict(entry, offset=pack.tell())) + '\n')
+                    pack.write(record)
+            loader.close()
+            os.replace(f'{self.pack_path}.tmp', self.pack_path)
+            os.replace(f'{self.manifest_path}.tmp', self.manifest_path)
+        finally:
+            CorpusIndex.unlock(self)
+        print(f'Corpus {self.name} compacted to {len(loader)} shows')
+        return len(loader)
+
+
+class CorpusLoader:
+    '''
+    This class loads the corpus kept by a CorpusIndex without touching the show folders.
+    The manifest is read once, giving the key fields of every show and the offset of its record,
+    and the pack is memory-mapped, so a record is only read and parsed when it is asked for
+
+    Parameters:
+    ----------
+    root: str
+        The folder the pack and manifest files are saved in
+    name: str
+        The file name the pack and manifest files start with
+    locked: bool
+        If True, the caller already holds the corpus lock, so the loader does not take it
+
+
+    Attributes:
+    ----------
+    entries: dict
+        The latest manifest entry of each show, keyed by canonical url or ID
+    ids: dict
+        The key of each show, by ID
+    titles: dict
+        The key of each show, by title
+
+
+    Methods:
+    -------
+    load()
+        Reads the manifest and maps the pack, skipping entries whose record is not completely written
+    record()
+        Returns the packed bytes of a manifest entry
+    get()
+        Returns the dictionary of a show by canonical url or ID
+    by_id()
+        Returns the dictionary of a show by its ID
+    by_title()
+        Returns the dictionary of a show by its title
+    manifest()
+        Yields the manifest entry of every show, without reading the pack
+    items()
+        Yields the dictionary of every show, in the order they were packed
+    verify()
+        Returns the keys of the shows whose packed record does not match the hash in the manifest
+    close()
+        Unmaps the pack
+    '''
+
+    def __init__(self, root='../raw_data', name='corpus', locked=False):
+        self.root = os.path.abspath(root)
+        self.name = name
+        self.entries = {}
+        self.ids = {}
+        self.titles = {}
+        self.pack = None
+        self._pack_file = None
+        self.load(locked)
+
+    def load(self, locked=False):
+        index = CorpusIndex(self.root, self.name)
+        if not os.path.isfile(index.manifest_path):
+            return
+        if not locked:
+            index.lock(shared=True)
+        try:
+            with open(index.manifest_path, 'rb') as fp:
+                lines = fp.read().splitlines()
+            self._pack_file = open(index.pack_path, 'rb')
+            size = os.fstat(self._pack_file.fileno()).st_size
+            if size > 0:
+                self.pack = mmap.mmap(self._pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            if not locked:
+                index.unlock()
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry['offset'] + entry['length'] > size:
+                continue
+            self.entries[entry['key']] = entry
+        for key, entry in self.entries.items():
+            self.ids[entry['ID']] = key
+            self.titles[entry['Title']] = key
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def record(self, entry):
+        return self.pack[entry['offset']:entry['offset'] + entry['length']]
+
+    def get(self, key):
+        key = canonical_url(key) if key.startswith('http') else key
+        if key not in self.entries:
+            key = self.ids.get(key)
+        if key == None:
+            return None
+        return json.loads(CorpusLoader.record(self, self.entries[key]))
+
+    def by_id(self, id):
+        key = self.ids.get(id)
+        return CorpusLoader.get(self, key) if key != None else None
+
+    def by_title(self, title):
+        key = self.titles.get(title)
+        return CorpusLoader.get(self, key) if key != None else None
+
+    def manifest(self):
+        yield from self.entries.values()
+
+    def items(self):
+        for entry in sorted(self.entries.values(), key=lambda entry: entry['offset']):
+            yield json.loads(CorpusLoader.record(self, entry))
+
+    def __iter__(self):
+        return CorpusLoader.items(self)
+
+    def verify(self):
+        return [key for key, entry in self.entries.items() if hashlib.sha256(CorpusLoader.record(self, entry)).hexdigest() != entry['sha256']]
+
+    def close(self):
+        if self.pack != None:
+            self.pack.close()
+            self.pack = None
+        if self._pack_file != None:
+            self._pack_file.close()
+            self._pack_file = None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Builds, compacts or checks the packed corpus index of the raw_data folder')
+    parser.add_argument('--root', default='../raw_data', help='folder of the show folders and the corpus files')
+    parser.add_argument('--import-folder', action='store_true', help='add every show folder to the index, for a corpus saved before the index existed')
+    parser.add_argument('--compact', action='store_true', help='drop the replaced records from the pack')
+    parser.add_argument('--verify', action='store_true', help='check every packed record against its hash')
+    args = parser.parse_args()
+    index = CorpusIndex(args.root)
+    if args.import_folder:
+        index.import_folder()
+    if args.compact:
+        index.compact()
+    loader = CorpusLoader(args.root)
+    print(f'{len(loader)} shows in the corpus index in {loader.root}')
+    if args.verify:
+        print(f'{len(loader.verify())} packed records do not match their hash')
+    loader.close()
@@ -0,0 +1,237 @@
+import queue
+import threading
+import psutil
+from contextlib import contextmanager
+import sys
+sys.path.append('../scraper')
+from metrics import timed
+from driver_factory import DriverFactory
+
+
+class DriverPool:
+    '''
+    This class keeps a fixed number of headless Firefox webdrivers alive so they can be reused across many urls,
+    instead of starting and quitting a new browser for every page.
+    A webdriver that has loaded too many pages, or whose browser has grown too large, is replaced with a fresh one,
+    and any geckodriver or Firefox process that does not exit when its webdriver is quit is killed
+
+    Parameters:
+    ----------
+    size: int
+        The maximum number of webdrivers the pool will launch, normally the thread pool's max_workers
+    driver_factory: callable
+        Function that creates and returns a new webdriver, defaults to a headless Firefox with the lean DriverFactory profile
+    metrics: Metrics
+        If given, the time taken to start each webdriver is recorded as the 'driver_start' stage, and recycled and killed webdrivers are counted
+    max_pages: int
+        Number of pages a webdriver loads before it is replaced, webdrivers are never replaced for their page count if None
+    max_rss_mb: float
+        The resident memory in MB of a webdriver's geckodriver and Firefox processes above which it is replaced, never checked if None
+    quit_timeout: float
+        Number of seconds to wait for a webdriver to quit before its processes are killed
+
+
+    Attributes:
+    ----------
+    size: int
+        The maximum number of webdrivers the pool will launch
+    drivers_launched: int
+        Total number of webdrivers launched over the lifetime of the pool, including replacements
+    idle: queue.Queue
+        The warmed webdrivers waiting to be checked out
+    drivers_recycled: int
+        Number of webdrivers replaced for their page count or memory use
+    processes_killed: int
+        Number of geckodriver and Firefox processes killed after their webdriver did not quit cleanly
+
+
+    Methods:
+    -------
+    create_driver()
+        Launches a new headless Firefox webdriver
+    acquire()
+        Checks out an idle webdriver, launching a new one if the pool is not yet full
+    release()
+        Returns a webdriver to the pool, replacing it if it fails the health check
+    driver()
+        Context manager that acquires a webdriver and always releases it
+    is_healthy()
+        Checks the webdriver's browser is still responding
+    should_recycle()
+        Counts a page loaded by a webdriver and returns True if it has reached max_pages or max_rss_mb
+    processes()
+        Returns the webdriver's geckodriver process and every browser process started by it
+    rss_mb()
+        Returns the resident memory in MB of the webdriver's processes
+    discard()
+        Quits a webdriver, kills its processes if they are still running after quit_timeout, and frees its place in the pool
+    kill_processes()
+        Kills the processes that are still running, and returns the number killed
+    trim()
+        Quits idle webdrivers until no more than a given number are alive
+    shutdown()
+        Quits every idle webdriver in the pool, and kills the processes of any webdriver that was never given back
+    '''
+
+    def __init__(self, size=4, driver_factory=None, metrics=None, max_pages=None, max_rss_mb=None, quit_timeout=30):
+        self.size = size
+        self.metrics = metrics
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.quit_timeout = quit_timeout
+        self.drivers_recycled = 0
+        self.processes_killed = 0
+        self.pages = {}
+        self.drivers = {}
+        self.driver_factory = driver_factory or DriverPool.create_driver
+        self.drivers_launched = 0
+        self.idle = queue.Queue()
+        self._live = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @staticmethod
+    def create_driver():
+        return DriverFactory().create_driver()
+
+    def acquire(self):
+        while True:
+            if self._closed:
+                raise RuntimeError('Driver pool has been shut down')
+            try:
+                driver = self.idle.get_nowait()
+                if self.is_healthy(driver):
+                    return driver
+                self.discard(driver)
+                continue
+            except queue.Empty:
+                pass
+            with self._lock:
+                launch = self._live < self.size
+                if launch:
+                    self._live += 1
+            if launch:
+                break
+            try:
+                driver = self.idle.get(timeout=1)
+            except queue.Empty:
+                continue
+            if self.is_healthy(driver):
+                return driver
+            self.discard(driver)
+        try:
+            with timed(self.metrics, 'driver_start'):
+                driver = self.driver_factory()
+        except:
+            with self._lock:
+                self._live -= 1
+            raise
+        with self._lock:
+            self.drivers_launched += 1
+            self.drivers[id(driver)] = driver
+        return driver
+
+    def release(self, driver):
+        if self._closed or not self.is_healthy(driver):
+            self.discard(driver)
+        elif self.should_recycle(driver):
+            with self._lock:
+                self.drivers_recycled += 1
+            if self.metrics != None:
+                self.metrics.increment('drivers_recycled')
+            self.discard(driver)
+        else:
+            self.idle.put(driver)
+
+    @contextmanager
+    def driver(self):
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def is_healthy(self, driver):
+        try:
+            driver.current_url
+            return True
+        except:
+            return False
+
+    def should_recycle(self, driver):
+        with self._lock:
+            self.pages[id(driver)] = self.pages.get(id(driver), 0) + 1
+            pages = self.pages[id(driver)]
+        if self.max_pages != None and pages >= self.max_pages:
+            return True
+        return self.max_rss_mb != None and self.rss_mb(driver) > self.max_rss_mb
+
+    def processes(self, driver):
+        try:
+            geckodriver = psutil.Process(driver.service.process.pid)
+            return [geckodriver] + geckodriver.children(recursive=True)
+        except (AttributeError, psutil.Error):
+            return []
+
+    def rss_mb(self, driver):
+        rss = 0
+        for process in self.processes(driver):
+            try:
+                rss += process.memory_info().rss
+            except psutil.Error:
+                pass
+        return rss / 1024 ** 2
+
+    def discard(self, driver):
+        processes = self.processes(driver)
+        def quit_driver():
+            try:
+                driver.quit()
+            except:
+                pass
+        quitter = threading.Thread(target=quit_driver, daemon=True)
+        quitter.start()
+        quitter.join(self.quit_timeout)
+        killed = self.kill_processes(processes)
+        with self._lock:
+            self.pages.pop(id(driver), None)
+            self.drivers.pop(id(driver), None)
+            self.processes_killed += killed
+            self._live -= 1
+        if killed > 0 and self.metrics != None:
+            self.metrics.increment('driver_processes_killed', killed)
+
+    def kill_processes(self, processes):
+        killed = 0
+        for process in processes:
+            try:
+                if process.is_running() and process.status() != psutil.STATUS_ZOMBIE:
+                    process.kill()
+                    killed += 1
+            except psutil.Error:
+                pass
+        return killed
+
+    def trim(self, size):
+        while self._live > size:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(driver)
+
+    def shutdown(self):
+        self._closed = True
+        while True:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(driver)
+        with self._lock:
+            leaked = list(self.drivers.values())
+        for driver in leaked:
+            killed = self.kill_processes(self.processes(driver))
+            with self._lock:
+                self.processes_killed += killed
+        print(f'{self.drivers_launched} browsers launched, {self.drivers_recycled} recycled, {self.processes_killed} hung browser processes killed')
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+
+TIMESTAMP_FORMAT = '%d-%b-%Y (%H:%M:%S.%f)'
+
+
+def parse_score(score):
+    '''
+    Returns a tomatometer or audience score such as '96%', '96' or 96 as a float, or None if it is missing
+    '''
+    try:
+        return float(str(score).strip().rstrip('%'))
+    except ValueError:
+        return None
+
+
+def parse_premiere_date(premiere_date):
+    '''
+    Returns a premiere date such as 'Jan 15, 2023' as a datetime, or None if it is missing
+    '''
+    for date_format in ('%b %d, %Y', '%B %d, %Y', '%Y'):
+        try:
+            return datetime.strptime(str(premiere_date).strip(), date_format)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_timestamp(timestamp):
+    '''
+    Returns a Timestamp written by Items.get_timestamp() as a datetime, or None if it is missing
+    '''
+    try:
+        return datetime.strptime(str(timestamp), TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
@@ -0,0 +1,140 @@
+from bs4 import BeautifulSoup
+import sys
+sys.path.append('../scraper')
+from items import Items
+from http_session import create_session
+from metrics import timed
+
+
+class HttpItems(Items):
+    '''
+    This class fetches the rotten tomatoes page of a TV show over plain HTTP and reads the same fields as the Items class,
+    using the same selectors on the static html instead of rendering the page in a browser
+
+    Parameters:
+    ----------
+    url: str
+        url for the rotten tomatoes page of a particular TV show
+    session: requests.Session
+        The shared session used to fetch the page, a new pooled session is created if none is given
+    timeout: int
+        Number of seconds to wait for the page before giving up
+    metrics: Metrics
+        If given, the time taken to fetch and parse the page is recorded as the 'http_fetch' stage
+
+
+    Attributes:
+    ----------
+    item_dict: dict
+        The dictionary used to store all of the information for a particular TV show
+    soup: BeautifulSoup
+        The parsed html of the page
+    missing: list
+        Keys of the item_dict that could not be found in the html
+
+
+    Methods:
+    -------
+    fetch()
+        Requests the page and parses it with the beautifulsoup html parser
+    get_text()
+        Returns the whitespace normalised text of the first element matching a css selector
+    get_title()
+        Locates the title text and returns it with a consistent reformatting
+    get_scores()
+        Locates and returns the tomatometer and audience scores
+    get_synopsis()
+        Locates and returns the full synopsis
+    get_tv_network()
+        Locates and returns the TV network the show is available on
+    get_premiere_date()
+        Locates and returns the premiere date for the show
+    get_genre()
+        Locates and returns the shows genre
+    get_img()
+        Locates and returns the poster img url
+    get_items()
+        Calls the other methods and replaces the corresponding dictionary value with their return values, then returns the populated dictionary
+        Returns None if the page could not be fetched or any field is missing, so the page can be scraped with selenium instead
+    '''
+
+    def __init__(self, url, session=None, timeout=10, metrics=None):
+        Items.__init__(self, driver=None, batched=False, url=url, metrics=metrics)
+        self.session = session or create_session()
+        self.timeout = timeout
+        self.soup = None
+        self.missing = []
+
+    def fetch(self):
+        response = self.session.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        self.soup = BeautifulSoup(response.text, 'html.parser')
+
+    def get_text(self, selector):
+        element = self.soup.select_one(selector)
+        if element == None:
+            return 'N/A'
+        text = ' '.join(element.get_text().split())
+        if text == '':
+            return 'N/A'
+        return text
+
+    def get_title(self):
+        raw_text = self.get_text('h1[class="title"]')
+        if raw_text == 'N/A':
+            return raw_text
+        return Items.format_title(raw_text)
+
+    def get_scores(self):
+        score_board = self.soup.select_one('score-board[data-qa="score-panel"]')
+        if score_board == None:
+            return 'N/A', 'N/A'
+        tomatometer = score_board.get('tomatometerscore') or 'N/A'
+        audience_score = score_board.get('audiencescore') or 'N/A'
+        return tomatometer, audience_score
+
+    def get_synopsis(self):
+        return self.get_text('p[data-qa="series-info-description"]')
+
+    def get_tv_network(self):
+        for label in self.soup.select('li > b'):
+            if 'TV Network:' in label.get_text():
+                value = label.parent.select_one('span.info-item-value')
+                if value != None:
+                    network = ' '.join(value.get_text().split())
+                    return network or 'N/A'
+        return 'N/A'
+
+    def get_premiere_date(self):
+        return self.get_text('span[data-qa="series-details-premiere-date"]')
+
+    def get_genre(self):
+        return self.get_text('span[data-qa="series-details-genre"]')
+
+    def get_img(self):
+        img = self.soup.select_one('img[data-qa="poster-image"]')
+        if img == None or not img.get('src'):
+            return 'N/A'
+        return img.get('src')
+
+    def get_items(self):
+        try:
+            with timed(self.metrics, 'http_fetch'):
+                self.fetch()
+        except Exception as error:
+            print(f'{self.url}: page could not be fetched ({error})')
+            return None
+        self.item_dict['Title'] = self.get_title()
+        self.item_dict['Tomatometer'], self.item_dict['Audience Score'] = self.get_scores()
+        self.item_dict['Synopsis'] = self.get_synopsis()
+        self.item_dict['TV Network'] = self.get_tv_network()
+        self.item_dict['Premiere Date'] = self.get_premiere_date()
+        self.item_dict['Genre'] = self.get_genre()
+        self.item_dict['Img'] = self.get_img()
+        self.item_dict['Timestamp'] = self.get_timestamp()
+        self.item_dict['URL'] = self.get_url()
+        self.item_dict['ID'] = self.get_uuid()
+        self.missing = [key for key, value in self.item_dict.items() if value == 'N/A']
+        if self.missing:
+            return None
+        return self.item_dict
@@ -0,0 +1,170 @@
+import concurrent.futures
+import threading
+import tempfile
+import hashlib
+import shutil
+import uuid
+import json
+import os
+import sys
+sys.path.append('../scraper')
+from image_downloader import ImageDownloader
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def make_thumbnails(path, thumbnails_root, sizes):
+    '''
+    Saves a thumbnail of an image for each (width, height) in sizes, skipping any that already exist.
+    Runs in a worker process of the ImageStore so decoding and resizing never holds up the scrape threads
+    '''
+    from PIL import Image
+    name = os.path.basename(path)
+    with Image.open(path) as image:
+        image = image.convert('RGB')
+        for width, height in sizes:
+            thumbnail_path = os.path.join(thumbnails_root, f'{width}x{height}', name)
+            if os.path.exists(thumbnail_path):
+                continue
+            os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+            thumbnail = image.copy()
+            thumbnail.thumbnail((width, height))
+            thumbnail.save(f'{thumbnail_path}.tmp', format='JPEG', quality=85)
+            os.replace(f'{thumbnail_path}.tmp', thumbnail_path)
+    return path
+
+
+class ImageStore:
+    '''
+    This class saves each poster img once, named by the hash of its content, however many shows or urls it appears under.
+    Urls that have already been resolved to a hash are not downloaded again,
+    and a set of thumbnails is made for each new img in a pool of background processes
+
+    Parameters:
+    ----------
+    root: str
+        The folder the imgs, thumbnails and url map are saved in
+    downloader: ImageDownloader
+        Used to download the imgs in its thread pool, a new ImageDownloader is created if none is given
+    thumbnail_sizes: list
+        The (width, height) of each thumbnail made for every img
+    processes: int
+        Number of processes making thumbnails
+
+
+    Attributes:
+    ----------
+    url_map: dict
+        The content hash of every img url resolved so far, keyed by url
+    stored: int
+        Number of new imgs saved
+    deduplicated: int
+        Number of imgs skipped because the url had been resolved before, or its content was already saved
+
+
+    Methods:
+    -------
+    path_for()
+        Returns the path of the img with a particular content hash
+    submit()
+        Queues an img url to be stored on the downloader's threads and returns its future
+    store()
+        Downloads an img unless its url is in the url map, saves it under its content hash, links it to link_path if given, and queues its thumbnails
+    link()
+        Hard links a stored img to another path, or copies it if a link is not possible
+    save_url_map()
+        Merges the url map with the one on disk, which other worker processes may have saved, then writes it to a temporary file of this process and renames it into place
+    close()
+        Waits for the downloads and thumbnails to finish, then saves the url map
+    '''
+
+    def __init__(self, root='../raw_data/images', downloader=None, thumbnail_sizes=((103, 153), (206, 305)), processes=2):
+        self.root = os.path.abspath(root)
+        self.objects_root = os.path.join(self.root, 'objects')
+        self.thumbnails_root = os.path.join(self.root, 'thumbnails')
+        self.url_map_path = os.path.join(self.root, 'url_map.json')
+        self.lock_path = os.path.join(self.root, 'url_map.lock')
+        self._owns_downloader = downloader == None
+        self.downloader = downloader or ImageDownloader()
+        self.thumbnail_sizes = [tuple(size) for size in thumbnail_sizes]
+        self.thumbnail_pool = concurrent.futures.ProcessPoolExecutor(max_workers=processes) if self.thumbnail_sizes else None
+        self.url_map = {}
+        self.stored = 0
+        self.deduplicated = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.objects_root, exist_ok=True)
+        if os.path.isfile(self.url_map_path):
+            with open(self.url_map_path) as fp:
+                self.url_map = json.load(fp)
+
+    def path_for(self, content_hash):
+        return os.path.join(self.objects_root, content_hash[:2], f'{content_hash}.jpg')
+
+    def submit(self, url, link_path=None):
+        return self.downloader.executor.submit(self.store, url, link_path)
+
+    def store(self, url, link_path=None):
+        with self._lock:
+            content_hash = self.url_map.get(url)
+        if content_hash != None and os.path.exists(self.path_for(content_hash)):
+            with self._lock:
+                self.deduplicated += 1
+        else:
+            temp_path = os.path.join(self.objects_root, f'{uuid.uuid4().hex}.download')
+            if self.downloader.download(url, temp_path) == None:
+                return None
+            sha256 = hashlib.sha256()
+            with open(temp_path, 'rb') as handler:
+                for chunk in iter(lambda: handler.read(65536), b''):
+                    sha256.update(chunk)
+            content_hash = sha256.hexdigest()
+            path = self.path_for(content_hash)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with self._lock:
+                is_new = not os.path.exists(path)
+                if is_new:
+                    os.replace(temp_path, path)
+                    self.stored += 1
+                else:
+                    os.remove(temp_path)
+                    self.deduplicated += 1
+                self.url_map[url] = content_hash
+            if is_new and self.thumbnail_pool != None:
+                self.thumbnail_pool.submit(make_thumbnails, path, self.thumbnails_root, self.thumbnail_sizes)
+        path = self.path_for(content_hash)
+        if link_path != None:
+            self.link(path, link_path)
+        return path
+
+    def link(self, path, link_path):
+        os.makedirs(os.path.dirname(link_path), exist_ok=True)
+        if os.path.exists(link_path):
+            os.remove(link_path)
+        try:
+            os.link(path, link_path)
+        except OSError:
+            shutil.copyfile(path, link_path)
+
+    def save_url_map(self):
+        with self._lock, open(self.lock_path, 'a') as lock_file:
+            if fcntl != None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            url_map = {}
+            if os.path.isfile(self.url_map_path):
+                with open(self.url_map_path) as fp:
+                    url_map = json.load(fp)
+            url_map.update(self.url_map)
+            fd, temp_path = tempfile.mkstemp(prefix='url_map.', suffix='.tmp', dir=self.root)
+            with os.fdopen(fd, 'w') as fp:
+                json.dump(obj=url_map, fp=fp)
+            os.replace(temp_path, self.url_map_path)
+            self.url_map = url_map
+
+    def close(self):
+        if self._owns_downloader:
+            self.downloader.shutdown()
+        if self.thumbnail_pool != None:
+            self.thumbnail_pool.shutdown(wait=True)
+        self.save_url_map()
@@ -1,12 +1,13 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
 from datetime import datetime
-import uuid
 from bs4 import BeautifulSoup
 import re
+import sys
+sys.path.append('../scraper')
+from readiness import Readiness
+from recrawl import canonical_url, stable_id
+from metrics import timed
+from driver_factory import DriverFactory
 
 
 class Items:
@@ -16,8 +17,18 @@ class Items:
 
     Parameters:
     ----------
+    driver: webdriver
+        The webdriver that has the rotten tomatoes page of a particular TV show open
+    batched: bool
+        If True, every field is read in a single execute_script call, and the per-field methods are only used for fields it could not find
+    readiness: Readiness
+        Waits on the page's DOM instead of sleeping for a fixed time, shared with the Scraper when given
     url: str
-        url for the rotten tomatoes page of a particular TV show
+        url of the page, the webdriver's current url is used if none is given
+    metrics: Metrics
+        If given, the time taken to read each field is recorded as a stage named after its method
+    cookie_banner: bool
+        If False, the cookies pop-up is not waited for, because consent cookies were installed in the webdriver
 
 
     Attributes:
@@ -30,6 +41,10 @@ class Items:
     -------
     accept_cookies()
         Accepts the cookies pop-up
+    format_title()
+        Reformats the raw title text into upper case words joined by underscores
+    get_batch()
+        Reads every field in one execute_script call and returns a dictionary of the values it found
     get_title()
         Locates the title text and returns it with a consistent reformatting
     get_scores()
@@ -46,15 +61,51 @@ class Items:
         Locates and returns the poster img url
     get_timestamp()
         Returns the current datetime at which the item was scraped
+    get_url()
+        Returns the canonical url of the TV show page
     get_uuid()
-        Assigns and returns a uuid code for each TV show
+        Returns a uuid code derived from the canonical url, so each TV show keeps the same ID between runs
+    measure()
+        Calls one of the methods, recording how long it takes if there are metrics
     get_items()
+        Accepts the cookies pop-up unless consent cookies were installed, fills the dictionary from get_batch() when batched, and calls the per-field methods for anything still missing
         Calls the other methods and replaces the corresponding dictionary value with their return values, then returns the populated dictionary
         Omits any incomplete dictionaries and instead returns None
     '''
 
-    def __init__(self, driver):
+    BATCH_SCRIPT = '''
+        var text = function (element) {
+            return element ? element.textContent.replace(/\\s+/g, ' ').trim() : null;
+        };
+        var more = document.querySelector('button[class="button--link"]');
+        if (more) { more.click(); }
+        var board = document.querySelector('score-board[data-qa="score-panel"]');
+        var network = null;
+        document.querySelectorAll('li > b').forEach(function (label) {
+            if (network === null && label.textContent.indexOf('TV Network:') !== -1) {
+                network = text(label.parentElement.querySelector('span.info-item-value'));
+            }
+        });
+        var poster = document.querySelector('img[data-qa="poster-image"]');
+        return {
+            'Title': text(document.querySelector('h1[class="title"]')),
+            'Tomatometer': board ? board.getAttribute('tomatometerscore') : null,
+            'Audience Score': board ? board.getAttribute('audiencescore') : null,
+            'Synopsis': text(document.querySelector('p[data-qa="series-info-description"]')),
+            'TV Network': network,
+            'Premiere Date': text(document.querySelector('span[data-qa="series-details-premiere-date"]')),
+            'Genre': text(document.querySelector('span[data-qa="series-details-genre"]')),
+            'Img': poster ? poster.getAttribute('src') : null
+        };
+    '''
+
+    def __init__(self, driver, batched=True, readiness=None, url=None, metrics=None, cookie_banner=True):
         self.driver = driver
+        self.cookie_banner = cookie_banner
+        self.metrics = metrics
+        self.url = url
+        self.batched = batched
+        self.readiness = readiness or Readiness()
         self.item_dict = {
             'Title': 'N/A',
             'Tomatometer': 'N/A',
@@ -65,22 +116,46 @@ class Items:
             'Genre': 'N/A',
             'Img': 'N/A',
             'Timestamp': 'N/A',
-            'ID': 'N/A'
+            'ID': 'N/A',
+            'URL': 'N/A'
         }
     
     def accept_cookies(self):
         try:
-            WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.XPATH, '//*[@id="onetrust-accept-btn-handler"]')))
-            self.driver.find_element(By.XPATH, '//*[@id="onetrust-accept-btn-handler"]').click()
-            time.sleep(1)
+            button = self.readiness.wait_for_cookie_banner(self.driver)
+            if button != None:
+                button.click()
+                self.readiness.wait_for_cookie_banner_closed(self.driver)
         except:
             pass   
     
+    @staticmethod
+    def format_title(raw_text):
+        underscores = raw_text.upper().replace(' ', '_')
+        return re.sub(r'[^a-zA-Z0-9_]', '', underscores)
+
+    def get_batch(self):
+        try:
+            batch = self.driver.execute_script(Items.BATCH_SCRIPT)
+        except:
+            return {}
+        if not isinstance(batch, dict):
+            return {}
+        found = {}
+        for key, value in batch.items():
+            if value == None or value == '':
+                continue
+            if key == 'Title':
+                value = Items.format_title(value)
+            elif key == 'Synopsis':
+                value = str(BeautifulSoup(value, 'html.parser'))
+            found[key] = value
+        return found
+
     def get_title(self):
         try:
             raw_text = self.driver.find_element(By.XPATH, '//h1[@class= "title"]').text
-            underscores = raw_text.upper().replace(' ', '_')
-            title = re.sub(r'[^a-zA-Z0-9_]', '', underscores)
+            title = Items.format_title(raw_text)
         except:
             title = 'N/A'
         return title
@@ -137,8 +212,7 @@ class Items:
 
     def get_img(self):
         try:
-            WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.XPATH, '//img[@data-qa= "poster-image"]')))
-            img = self.driver.find_element(By.XPATH, '//img[@data-qa= "poster-image"]').get_attribute('src')
+            img = self.readiness.wait_for_poster(self.driver).get_attribute('src')
         except:
             img = 'N/A'    
         return img
@@ -148,37 +222,55 @@ class Items:
         timestamp = dateTimeObj.strftime("%d-%b-%Y (%H:%M:%S.%f)")
         return timestamp
 
+    def get_url(self):
+        try:
+            url = canonical_url(self.url or self.driver.current_url)
+        except:
+            url = 'N/A'
+        return url
+
     def get_uuid(self):
-        id = str(uuid.uuid4())
-        return id
+        if self.item_dict['URL'] == 'N/A':
+            return 'N/A'
+        return stable_id(self.item_dict['URL'])
+
+    def measure(self, method):
+        with timed(self.metrics, method.__name__):
+            return method(self)
 
     def get_items(self):
-        Items.accept_cookies(self)
-        self.item_dict['Title'] = Items.get_title(self)
-        self.item_dict['Tomatometer'] = Items.get_scores(self)[0]
-        self.item_dict['Audience Score'] = Items.get_scores(self)[1]
-        self.item_dict['Synopsis'] = Items.get_synopsis(self)
-        self.item_dict['TV Network'] = Items.get_tv_network(self)
-        self.item_dict['Premiere Date'] = Items.get_premiere_date(self)
-        self.item_dict['Genre'] = Items.get_genre(self)
-        self.item_dict['Img'] = Items.get_img(self)
+        if self.cookie_banner:
+            Items.measure(self, Items.accept_cookies)
+        if self.batched:
+            self.item_dict.update(Items.measure(self, Items.get_batch))
+        if self.item_dict['Title'] == 'N/A':
+            self.item_dict['Title'] = Items.measure(self, Items.get_title)
+        if 'N/A' in (self.item_dict['Tomatometer'], self.item_dict['Audience Score']):
+            self.item_dict['Tomatometer'], self.item_dict['Audience Score'] = Items.measure(self, Items.get_scores)
+        if self.item_dict['Synopsis'] == 'N/A':
+            self.item_dict['Synopsis'] = Items.measure(self, Items.get_synopsis)
+        if self.item_dict['TV Network'] == 'N/A':
+            self.item_dict['TV Network'] = Items.measure(self, Items.get_tv_network)
+        if self.item_dict['Premiere Date'] == 'N/A':
+            self.item_dict['Premiere Date'] = Items.measure(self, Items.get_premiere_date)
+        if self.item_dict['Genre'] == 'N/A':
+            self.item_dict['Genre'] = Items.measure(self, Items.get_genre)
+        if self.item_dict['Img'] == 'N/A':
+            self.item_dict['Img'] = Items.measure(self, Items.get_img)
         self.item_dict['Timestamp'] = Items.get_timestamp(self)
+        self.item_dict['URL'] = Items.get_url(self)
         self.item_dict['ID'] = Items.get_uuid(self)
         for key, value in self.item_dict.items():
             if value == 'N/A':
-                print(f'{self.get_title()}: invalid {key} data, result omitted')
+                print(f'{self.item_dict["Title"]}: invalid {key} data, result omitted')
                 return None
         return self.item_dict
 
 
 if __name__ == '__main__':
-    firefox_options = webdriver.FirefoxOptions()
-    firefox_options.add_argument('--window-size=1920,1080')
-    firefox_options.add_argument('--headless')
-    driver = webdriver.Firefox(options=firefox_options)
+    driver = DriverFactory().create_driver()
     test_url = 'https://www.rottentomatoes.com/tv/the_last_of_us'
     driver.get(test_url)
-    time.sleep(2)
     items = Items(driver)
     item_dict = items.get_items()
     driver.quit()
@@ -0,0 +1,184 @@
+from selenium.common.exceptions import TimeoutException
+from urllib.parse import urlsplit
+import threading
+import requests
+import random
+import time
+
+
+class TokenBucket:
+    '''
+    This class lets requests through at a steady rate, with short bursts allowed up to its capacity.
+    A request that finds the bucket empty reserves the next token and is told how long to wait for it,
+    so waiting requests are let through in the order they arrived
+
+    Parameters:
+    ----------
+    rate: float
+        Number of tokens added per second
+    capacity: float
+        The most tokens the bucket holds, and so the largest burst let through at once
+
+
+    Methods:
+    -------
+    reserve()
+        Takes a token and returns the number of seconds to wait before using it
+    '''
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+
+class RateLimiter:
+    '''
+    This class keeps a token bucket for every host, shared by every thread, webdriver and session of the scraper,
+    so a burst of parallel requests is spread out instead of hitting a host all at once
+
+    Parameters:
+    ----------
+    rate: float
+        Number of requests per second allowed to a host with no rate of its own
+    burst: float
+        Number of requests allowed to a host at once before the rate applies, the rate is used if none is given
+    rates: dict
+        The requests per second allowed to particular hosts, keyed by host name
+
+
+    Attributes:
+    ----------
+    waited: float
+        Total number of seconds requests have been held back
+
+
+    Methods:
+    -------
+    bucket()
+        Returns the token bucket of a host, creating it the first time the host is seen
+    wait()
+        Blocks until a request to the host of a url is allowed
+    '''
+
+    def __init__(self, rate=5, burst=None, rates=None):
+        self.rate = rate
+        self.burst = burst
+        self.rates = rates or {}
+        self.buckets = {}
+        self.waited = 0
+        self._lock = threading.Lock()
+
+    def bucket(self, host):
+        with self._lock:
+            if host not in self.buckets:
+                rate = self.rates.get(host, self.rate)
+                self.buckets[host] = TokenBucket(rate, self.burst or max(rate, 1))
+            return self.buckets[host]
+
+    def wait(self, url):
+        delay = self.bucket(urlsplit(url).hostname or '').reserve()
+        if delay > 0:
+            with self._lock:
+                self.waited += delay
+            time.sleep(delay)
+        return delay
+
+
+class RetryPolicy:
+    '''
+    This class makes a page or image request through the rate limiter and retries it if it fails in a way that is likely to pass,
+    a timeout, a dropped connection, or a 429 or 5xx response, waiting a random time of up to an exponentially growing delay between attempts.
+    A Retry-After header is respected when the host sends one
+
+    Parameters:
+    ----------
+    limiter: RateLimiter
+        The per-host rate limiter every attempt waits on, a RateLimiter with the default rate is created if none is given
+    retries: int
+        Number of times a request is retried before its last error or response is returned
+    base_delay: float
+        The largest wait in seconds before the first retry, doubled for each retry after it
+    max_delay: float
+        The largest wait in seconds before any retry
+    retry_statuses: tuple
+        The response status codes that are retried
+
+
+    Attributes:
+    ----------
+    retried: int
+        Number of attempts that were retried
+    gave_up: int
+        Number of requests that still failed after every retry
+
+
+    Methods:
+    -------
+    call()
+        Calls a function that makes a request to a url, waiting on the rate limiter before every attempt and retrying retryable failures
+    is_retryable()
+        Returns True if an exception is a timeout or connection error
+    backoff()
+        Returns the number of seconds to wait before a retry
+    '''
+
+    RETRY_EXCEPTIONS = (requests.Timeout, requests.ConnectionError, TimeoutException)
+
+    def __init__(self, limiter=None, retries=3, base_delay=0.5, max_delay=30, retry_statuses=(429, 500, 502, 503, 504)):
+        self.limiter = limiter or RateLimiter()
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = retry_statuses
+        self.retried = 0
+        self.gave_up = 0
+        self._lock = threading.Lock()
+
+    def call(self, url, function, *args, **kwargs):
+        for attempt in range(self.retries + 1):
+            self.limiter.wait(url)
+            retry_after = None
+            try:
+                result = function(*args, **kwargs)
+            except Exception as error:
+                if not self.is_retryable(error) or attempt == self.retries:
+                    if self.is_retryable(error):
+                        with self._lock:
+                            self.gave_up += 1
+                    raise
+                print(f'{url}: {type(error).__name__}, retrying')
+            else:
+                status_code = getattr(result, 'status_code', None)
+                if status_code not in self.retry_statuses:
+                    return result
+                if attempt == self.retries:
+                    with self._lock:
+                        self.gave_up += 1
+                    return result
+                retry_after = result.headers.get('Retry-After')
+                result.close()
+                print(f'{url}: {status_code} response, retrying')
+            with self._lock:
+                self.retried += 1
+            time.sleep(self.backoff(attempt, retry_after))
+
+    def is_retryable(self, error):
+        return isinstance(error, RetryPolicy.RETRY_EXCEPTIONS)
+
+    def backoff(self, attempt, retry_after=None):
+        if retry_after != None and retry_after.isdigit():
+            return min(float(retry_after), self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
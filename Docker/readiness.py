@@ -0,0 +1,151 @@
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+import threading
+import time
+
+
+class Readiness:
+    '''
+    This class replaces fixed sleeps with waits on concrete DOM conditions, and records how long each wait actually took.
+    Only the count, total and longest time of each wait are kept, so memory use does not grow with the length of a crawl
+
+    Parameters:
+    ----------
+    timeout: float
+        Default number of seconds to wait for a condition before giving up
+    poll_frequency: float
+        Number of seconds between checks of a condition
+    timeouts: dict
+        Timeouts for particular waits, keyed by wait name, overriding the default timeout
+
+
+    Attributes:
+    ----------
+    wait_times: dict
+        The count, total and max seconds spent in each wait, keyed by wait name
+    timed_out: dict
+        Number of times each wait reached its timeout, keyed by wait name
+
+
+    Methods:
+    -------
+    wait()
+        Waits until a condition returns a truthy value or the timeout is reached, and records the time taken
+    wait_for_tiles()
+        Waits for the TV show tiles on the "TV SHOWS" page to be present
+    wait_for_tile_growth()
+        Waits for the number of TV show tiles to grow past a previous count
+    wait_for_load_more()
+        Waits for the "Load more" button to be clickable and returns it
+    wait_for_cookie_banner()
+        Waits for the cookies pop-up accept button to be clickable and returns it
+    wait_for_cookie_banner_closed()
+        Waits for the cookies pop-up to disappear
+    wait_for_score_board()
+        Waits for the score-board on a TV show page to be present
+    wait_for_poster()
+        Waits for the poster img on a TV show page to be present and returns it
+    summary()
+        Returns the count, mean, max and total seconds of each wait
+    merge()
+        Adds the wait times and timeouts recorded by another Readiness, such as one in a worker process
+    state()
+        Returns copies of the wait times and timeouts that can be sent between processes
+    print_summary()
+        Prints the summary
+    '''
+
+    TILES = (By.CLASS_NAME, 'js-tile-link')
+    LOAD_MORE = (By.XPATH, '//button[contains(text(), "Load more")]')
+    COOKIE_BANNER = (By.XPATH, '//*[@id="onetrust-accept-btn-handler"]')
+    SCORE_BOARD = (By.XPATH, '//score-board[@data-qa= "score-panel"]')
+    POSTER = (By.XPATH, '//img[@data-qa= "poster-image"]')
+
+    def __init__(self, timeout=10, poll_frequency=0.1, timeouts=None):
+        self.timeout = timeout
+        self.poll_frequency = poll_frequency
+        self.timeouts = {
+            'cookie_banner': 2,
+            'cookie_banner_closed': 2,
+            'score_board': 5,
+            'poster': 5
+        }
+        if timeouts != None:
+            self.timeouts.update(timeouts)
+        self.wait_times = {}
+        self.timed_out = {}
+        self._lock = threading.Lock()
+
+    def wait(self, driver, name, condition, timeout=None):
+        if timeout == None:
+            timeout = self.timeouts.get(name, self.timeout)
+        start = time.perf_counter()
+        try:
+            result = WebDriverWait(driver, timeout, poll_frequency=self.poll_frequency).until(condition)
+        except TimeoutException:
+            result = None
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            times = self.wait_times.setdefault(name, {'count': 0, 'total': 0, 'max': 0})
+            times['count'] += 1
+            times['total'] += elapsed
+            times['max'] = max(times['max'], elapsed)
+            if result == None:
+                self.timed_out[name] = self.timed_out.get(name, 0) + 1
+        return result
+
+    def wait_for_tiles(self, driver):
+        return self.wait(driver, 'tiles', EC.presence_of_element_located(Readiness.TILES))
+
+    def wait_for_tile_growth(self, driver, previous_count):
+        def tiles_grown(driver):
+            return len(driver.find_elements(*Readiness.TILES)) > previous_count
+        return self.wait(driver, 'tile_growth', tiles_grown)
+
+    def wait_for_load_more(self, driver):
+        return self.wait(driver, 'load_more', EC.element_to_be_clickable(Readiness.LOAD_MORE))
+
+    def wait_for_cookie_banner(self, driver):
+        return self.wait(driver, 'cookie_banner', EC.element_to_be_clickable(Readiness.COOKIE_BANNER))
+
+    def wait_for_cookie_banner_closed(self, driver):
+        return self.wait(driver, 'cookie_banner_closed', EC.invisibility_of_element_located(Readiness.COOKIE_BANNER))
+
+    def wait_for_score_board(self, driver):
+        return self.wait(driver, 'score_board', EC.presence_of_element_located(Readiness.SCORE_BOARD))
+
+    def wait_for_poster(self, driver):
+        return self.wait(driver, 'poster', EC.presence_of_element_located(Readiness.POSTER))
+
+    def summary(self):
+        summary = {}
+        with self._lock:
+            for name, times in self.wait_times.items():
+                summary[name] = {
+                    'count': times['count'],
+                    'mean': times['total'] / times['count'],
+                    'max': times['max'],
+                    'total': times['total'],
+                    'timed_out': self.timed_out.get(name, 0)
+                }
+        return summary
+
+    def merge(self, wait_times, timed_out):
+        with self._lock:
+            for name, times in wait_times.items():
+                merged = self.wait_times.setdefault(name, {'count': 0, 'total': 0, 'max': 0})
+                merged['count'] += times['count']
+                merged['total'] += times['total']
+                merged['max'] = max(merged['max'], times['max'])
+            for name, count in timed_out.items():
+                self.timed_out[name] = self.timed_out.get(name, 0) + count
+
+    def state(self):
+        with self._lock:
+            return {name: dict(times) for name, times in self.wait_times.items()}, dict(self.timed_out)
+
+    def print_summary(self):
+        for name, stats in self.summary().items():
+            print(f"{name}: {stats['count']} waits, {stats['mean']:.2f}s mean, {stats['max']:.2f}s max, {stats['timed_out']} timed out")
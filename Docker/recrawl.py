@@ -0,0 +1,110 @@
+from urllib.parse import urlsplit, urlunsplit
+from datetime import datetime
+import threading
+import hashlib
+import uuid
+import json
+import os
+
+
+def canonical_url(url):
+    '''
+    Returns the url of a TV show page in one consistent form, with https, a lower case host,
+    and no query string, fragment or trailing slash
+    '''
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https', parts.netloc.lower(), path, '', ''))
+
+
+def stable_id(url):
+    '''
+    Returns an ID derived from the canonical url, so the same show gets the same ID on every run
+    '''
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, canonical_url(url)))
+
+
+def content_hash(item_dict):
+    '''
+    Returns a hash of the fields of an item dictionary that come from the page, ignoring the Timestamp and ID
+    '''
+    content = {key: value for key, value in item_dict.items() if key not in ('Timestamp', 'ID')}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+class RecrawlManifest:
+    '''
+    This class keeps a persistent record of each show's last content hash and fetch time,
+    so a re-crawl can tell which shows have changed since they were last saved
+
+    Parameters:
+    ----------
+    path: str
+        The location of the JSON file the manifest is stored in
+    read_only: bool
+        If True, save() does nothing, for worker processes that only check the manifest while the coordinator records it
+
+
+    Attributes:
+    ----------
+    entries: dict
+        The url, content hash and last fetch time of each show, keyed by ID
+    changed: int
+        Number of shows recorded this run whose content had changed, or that had not been seen before
+    unchanged: int
+        Number of shows recorded this run whose content was the same as last time
+
+
+    Methods:
+    -------
+    load()
+        Reads the manifest file if it exists
+    is_unchanged()
+        Returns True if an item dictionary has the same content hash as the last time its show was saved
+    record()
+        Stores the content hash and fetch time of an item dictionary
+    save()
+        Writes the manifest to a temporary file and renames it into place, so a crash never leaves it half written
+    '''
+
+    def __init__(self, path='../raw_data/recrawl_manifest.json', read_only=False):
+        self.path = os.path.abspath(path)
+        self.read_only = read_only
+        self.entries = {}
+        self.changed = 0
+        self.unchanged = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if os.path.isfile(self.path):
+            with open(self.path) as fp:
+                self.entries = json.load(fp)
+
+    def is_unchanged(self, item_dict):
+        with self._lock:
+            entry = self.entries.get(item_dict['ID'])
+        return entry != None and entry['hash'] == content_hash(item_dict)
+
+    def record(self, item_dict):
+        item_hash = content_hash(item_dict)
+        with self._lock:
+            entry = self.entries.get(item_dict['ID'])
+            if entry != None and entry['hash'] == item_hash:
+                self.unchanged += 1
+            else:
+                self.changed += 1
+            self.entries[item_dict['ID']] = {
+                'url': item_dict.get('URL'),
+                'hash': item_hash,
+                'fetched': datetime.now().isoformat()
+            }
+
+    def save(self):
+        if self.read_only:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            with open(f'{self.path}.tmp', 'w') as fp:
+                json.dump(obj=self.entries, indent=4, fp=fp)
+        os.replace(f'{self.path}.tmp', self.path)
@@ -0,0 +1,137 @@
+import threading
+import math
+import time
+import json
+import os
+import sys
+sys.path.append('../scraper')
+from recrawl import canonical_url
+from fields import parse_timestamp, parse_premiere_date
+
+
+class FreshnessScheduler:
+    '''
+    This class decides which show pages are worth scraping in a run, from when each show was last fetched and how often its scores have changed.
+    Each show's scores are assumed to change at a steady rate, estimated from the number of changes seen over the time it has been watched,
+    starting from one change per default_interval, so the chance that the saved copy is out of date is 1 - exp(-rate * age).
+    Shows that have never been fetched come first, then the most likely to be out of date, and a run scrapes no more than its page budget
+
+    Parameters:
+    ----------
+    path: str
+        The location of the JSON file each show's fetch and change history is stored in
+    budget: int
+        The most show pages scraped in a run, every discovered page is scraped in order of staleness if None
+    default_interval: float
+        The number of seconds between score changes assumed for a show before any have been seen
+    recent_days: int
+        Number of days after its premiere a show is treated as newly premiered
+    recent_boost: float
+        How many times faster the scores of a newly premiered show are assumed to change
+    read_only: bool
+        If True, save() does nothing
+
+
+    Attributes:
+    ----------
+    entries: dict
+        The last fetch time, scores, premiere date, number of checks and changes, and seconds watched of each show, keyed by canonical url
+
+
+    Methods:
+    -------
+    load()
+        Reads the history file if it exists
+    record()
+        Adds a scraped item dictionary to its show's history, counting a change if its scores differ from the last fetch
+    change_rate()
+        Returns the estimated number of score changes per second of a show
+    staleness()
+        Returns the chance that a show's saved copy is out of date, 1 for a show that has never been fetched
+    order()
+        Returns the urls in order of staleness, cut to the page budget
+    save()
+        Merges the history with the file, keeping the latest fetch of each show, then writes it to a temporary file and renames it into place
+    '''
+
+    def __init__(self, path='../raw_data/freshness.json', budget=None, default_interval=7 * 24 * 3600, recent_days=60, recent_boost=4, read_only=False):
+        self.path = os.path.abspath(path)
+        self.budget = budget
+        self.default_interval = default_interval
+        self.recent_days = recent_days
+        self.recent_boost = recent_boost
+        self.read_only = read_only
+        self.entries = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if os.path.isfile(self.path):
+            with open(self.path) as fp:
+                self.entries = json.load(fp)
+
+    def record(self, item_dict):
+        url = canonical_url(item_dict['URL'])
+        fetched = parse_timestamp(item_dict.get('Timestamp'))
+        fetched = fetched.timestamp() if fetched != None else time.time()
+        scores = [item_dict.get('Tomatometer'), item_dict.get('Audience Score')]
+        with self._lock:
+            entry = self.entries.get(url)
+            if entry == None:
+                entry = {'fetched': fetched, 'scores': scores, 'checks': 0, 'changes': 0, 'observed': 0}
+                self.entries[url] = entry
+            elif fetched > entry['fetched']:
+                entry['observed'] += fetched - entry['fetched']
+                entry['checks'] += 1
+                if scores != entry['scores']:
+                    entry['changes'] += 1
+                entry['fetched'] = fetched
+                entry['scores'] = scores
+            entry['premiere'] = item_dict.get('Premiere Date')
+
+    def change_rate(self, entry, now=None):
+        now = now or time.time()
+        rate = (entry['changes'] + 1) / (entry['observed'] + self.default_interval)
+        premiere = parse_premiere_date(entry.get('premiere'))
+        if premiere == None:
+            return rate
+        if 0 <= now - premiere.timestamp() <= self.recent_days * 24 * 3600:
+            rate *= self.recent_boost
+        return rate
+
+    def staleness(self, url, now=None):
+        now = now or time.time()
+        with self._lock:
+            entry = self.entries.get(canonical_url(url))
+        if entry == None:
+            return 1
+        age = max(now - entry['fetched'], 0)
+        return 1 - math.exp(-FreshnessScheduler.change_rate(self, entry, now) * age)
+
+    def order(self, urls, budget=None):
+        if budget == None:
+            budget = self.budget
+        now = time.time()
+        staleness = {url: FreshnessScheduler.staleness(self, url, now) for url in urls}
+        ordered = sorted(urls, key=lambda url: (self.entries.get(canonical_url(url)) != None, -staleness[url]))
+        if budget != None:
+            ordered = ordered[:budget]
+        print(f'{len(ordered)} of {len(urls)} show pages scheduled, {sum(canonical_url(url) not in self.entries for url in ordered)} never fetched before')
+        return ordered
+
+    def save(self):
+        if self.read_only:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            entries = dict(self.entries)
+            if os.path.isfile(self.path):
+                with open(self.path) as fp:
+                    saved = json.load(fp)
+                for url, entry in saved.items():
+                    if url not in entries or entry['fetched'] > entries[url]['fetched']:
+                        entries[url] = entry
+            with open(f'{self.path}.{os.getpid()}.tmp', 'w') as fp:
+                json.dump(obj=entries, indent=4, fp=fp)
+            os.replace(f'{self.path}.{os.getpid()}.tmp', self.path)
+            self.entries = entries
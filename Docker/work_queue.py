@@ -0,0 +1,249 @@
+import threading
+import sqlite3
+import time
+import os
+
+
+class WorkQueue:
+    '''
+    This class is a queue of show urls in a SQLite file on a shared volume, so several scraper containers can work through one crawl.
+    One process enqueues the urls as they are discovered, and any number of workers lease batches of them.
+    A lease expires after the visibility timeout unless its worker sends a heartbeat, and an expired lease is issued to the next worker that asks,
+    so a worker that dies only delays the urls it was holding
+
+    Parameters:
+    ----------
+    path: str
+        The location of the SQLite file
+    visibility_timeout: float
+        Number of seconds a leased url stays hidden from other workers without a heartbeat
+    max_attempts: int
+        Number of times a url is leased before a failure is treated as final
+
+
+    Methods:
+    -------
+    connect()
+        Opens the SQLite file in WAL mode, waiting for other processes' locks instead of failing
+    create_tables()
+        Creates the urls and meta tables if they do not exist
+    enqueue()
+        Adds urls to the queue as pending, ignoring any already in it, and returns the number added
+    complete_enqueue()
+        Records that every url of the crawl has been enqueued
+    is_enqueue_complete()
+        Returns True once every url of the crawl has been enqueued
+    lease()
+        Leases up to batch_size urls that are pending, or whose lease has expired, to a worker and returns them
+    heartbeat()
+        Extends every lease held by a worker by the visibility timeout
+    mark()
+        Records a leased url as 'done', 'omitted' or 'failed', failed urls are returned to the queue until max_attempts is reached
+    state()
+        Returns the state of a url, or None if it is not in the queue
+    is_finished()
+        Returns True if a url has already been scraped or omitted
+    remaining()
+        Returns the number of urls still pending or leased
+    counts()
+        Returns the number of urls in each state
+    close()
+        Closes the connection
+    '''
+
+    STATES = ('pending', 'leased', 'done', 'omitted', 'failed')
+
+    def __init__(self, path='../raw_data/work_queue.db', visibility_timeout=300, max_attempts=3):
+        self.path = os.path.abspath(path)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.connection = self.connect()
+        self.create_tables()
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def create_tables(self):
+        with self._lock:
+            self.connection.executescript('''
+                CREATE TABLE IF NOT EXISTS urls (
+                    url TEXT PRIMARY KEY,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    updated REAL
+                );
+                CREATE INDEX IF NOT EXISTS urls_state ON urls (state, lease_expires);
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            ''')
+
+    def enqueue(self, urls):
+        now = time.time()
+        with self._lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                before = self.connection.total_changes
+                self.connection.executemany(
+                    'INSERT OR IGNORE INTO urls (url, state, updated) VALUES (?, ?, ?)',
+                    [(url, 'pending', now) for url in urls]
+                )
+                added = self.connection.total_changes - before
+                self.connection.execute('COMMIT')
+            except:
+                self.connection.execute('ROLLBACK')
+                raise
+        return added
+
+    def complete_enqueue(self):
+        with self._lock:
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('enqueue_complete', '1')")
+
+    def is_enqueue_complete(self):
+        with self._lock:
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'enqueue_complete'").fetchone()
+        return row != None and row[0] == '1'
+
+    def lease(self, owner, batch_size=10):
+        now = time.time()
+        with self._lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                urls = [row[0] for row in self.connection.execute(
+                    "SELECT url FROM urls WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) ORDER BY updated LIMIT ?",
+                    (now, batch_size)
+                )]
+                self.connection.executemany(
+                    "UPDATE urls SET state = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated = ? WHERE url = ?",
+                    [(owner, now + self.visibility_timeout, now, url) for url in urls]
+                )
+                self.connection.execute('COMMIT')
+            except:
+                self.connection.execute('ROLLBACK')
+                raise
+        return urls
+
+    def heartbeat(self, owner):
+        with self._lock:
+            cursor = self.connection.execute(
+                "UPDATE urls SET lease_expires = ? WHERE state = 'leased' AND lease_owner = ?",
+                (time.time() + self.visibility_timeout, owner)
+            )
+        return cursor.rowcount
+
+    def mark(self, url, state, owner):
+        if state not in ('done', 'omitted', 'failed'):
+            raise ValueError(f'Unknown work queue state: {state}')
+        with self._lock:
+            if state == 'failed':
+                cursor = self.connection.execute(
+                    "UPDATE urls SET state = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, lease_owner = NULL, lease_expires = NULL, updated = ? WHERE url = ? AND state = 'leased' AND lease_owner = ?",
+                    (self.max_attempts, time.time(), url, owner)
+                )
+            else:
+                cursor = self.connection.execute(
+                    'UPDATE urls SET state = ?, lease_owner = NULL, lease_expires = NULL, updated = ? WHERE url = ? AND lease_owner = ?',
+                    (state, time.time(), url, owner)
+                )
+        return cursor.rowcount == 1
+
+    def state(self, url):
+        with self._lock:
+            row = self.connection.execute('SELECT state FROM urls WHERE url = ?', (url,)).fetchone()
+        return row[0] if row != None else None
+
+    def is_finished(self, url):
+        return WorkQueue.state(self, url) in ('done', 'omitted')
+
+    def remaining(self):
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM urls WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def counts(self):
+        with self._lock:
+            rows = self.connection.execute('SELECT state, COUNT(*) FROM urls GROUP BY state').fetchall()
+        counts = {state: 0 for state in WorkQueue.STATES}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+class WorkQueueJournal:
+    '''
+    This class lets a Scraper use a WorkQueue in place of its CrawlJournal.
+    When enqueuing, every discovered url is added to the queue, and when working, every finished url is marked in the queue under the worker's lease
+
+    Parameters:
+    ----------
+    work_queue: WorkQueue
+        The shared queue of urls
+    owner: str
+        The name the worker leases urls under
+
+
+    Attributes:
+    ----------
+    discovery_complete: bool
+        True once every url of the crawl has been enqueued
+
+
+    Methods:
+    -------
+    discovered()
+        Adds a url to the queue
+    claim()
+        Adds a url to the queue, returning True if it was not already in it
+    is_claimed()
+        Returns True if a url is already in the queue
+    mark()
+        Records a new state for a url leased by the owner
+    complete_discovery()
+        Records in the queue that every url has been enqueued
+    is_finished()
+        Returns True if a url has already been scraped or omitted
+    outstanding()
+        Returns an empty list, as unfinished urls stay in the queue for the workers
+    close()
+        Does nothing, the queue is closed by its owner
+    '''
+
+    def __init__(self, work_queue, owner):
+        self.work_queue = work_queue
+        self.owner = owner
+        self.discovery_complete = work_queue.is_enqueue_complete()
+
+    def discovered(self, url):
+        self.work_queue.enqueue([url])
+
+    def claim(self, url):
+        return self.work_queue.enqueue([url]) == 1
+
+    def is_claimed(self, url):
+        return self.work_queue.state(url) != None
+
+    def mark(self, url, state):
+        self.work_queue.mark(url, state, self.owner)
+
+    def complete_discovery(self):
+        self.work_queue.complete_enqueue()
+        self.discovery_complete = True
+
+    def is_finished(self, url):
+        return self.work_queue.is_finished(url)
+
+    def outstanding(self, claimed=True):
+        return []
+
+    def close(self):
+        pass
@@ -0,0 +1,433 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit, urlunsplit, parse_qs
+import threading
+import tempfile
+import resource
+import uuid
+import json
+import time
+import io
+import sys
+sys.path.append('../scraper')
+from scraper import Scraper
+from initialiser import Initialiser
+from items import Items
+from readiness import Readiness
+from http_items import HttpItems
+from http_session import create_session
+from http_cache import HttpCache, CachingProxy
+from driver_factory import DriverFactory
+from rate_limit import RateLimiter, RetryPolicy
+from storage import ShardedStorage, SQLiteStorage
+from metrics import Metrics
+import argparse
+
+
+GENRES = ('Drama', 'Comedy', 'Action', 'Crime', 'Documentary', 'Sci-Fi', 'Horror', 'Fantasy')
+NETWORKS = ('HBO', 'Netflix', 'BBC One', 'Hulu', 'FX', 'AMC', 'Apple TV+', 'Prime Video')
+
+
+class FixtureSite:
+    '''
+    This class generates a synthetic copy of the rotten tomatoes TV pages the scraper reads,
+    with the same markup, selectors, cookie banner and browse listing as the real site, for any number of shows.
+    Every page is built from the number of its show, so the same shows are served on every run without being stored.
+    Like the real listing, each page of the browse listing gives an opaque cursor for the next page,
+    so a client that builds its own cursors instead of following the ones it is given gets an error
+
+    Parameters:
+    ----------
+    shows: int
+        Number of shows on the site
+
+
+    Attributes:
+    ----------
+    cursors: dict
+        The offset of the first show of the page each cursor handed out so far points to
+
+
+    Methods:
+    -------
+    cursor()
+        Returns a new opaque cursor for the page starting at an offset
+    show_page()
+        Returns the html of a show's page
+    listing_page()
+        Returns the browse listing JSON for the page starting at a cursor, raising a KeyError for a cursor the site never gave out
+    browse_page()
+        Returns the html of the "TV SHOWS" page with the first page of tiles, and a "Load more" button that loads the next page with its cursor
+    poster()
+        Returns the bytes of the poster img, a small JPG made once with Pillow if it is installed
+    '''
+
+    COOKIE_BANNER = '<div id="onetrust-banner-sdk"><button id="onetrust-accept-btn-handler" onclick="this.parentNode.style.display = \'none\'">Accept cookies</button></div>'
+
+    def __init__(self, shows=10000):
+        self.shows = shows
+        self.cursors = {}
+        self._poster = None
+        self._lock = threading.Lock()
+
+    def cursor(self, offset):
+        cursor = uuid.uuid4().hex
+        with self._lock:
+            self.cursors[cursor] = offset
+        return cursor
+
+    def show_page(self, n):
+        title = f'Synthetic Show {n}'
+        return f'''<html><head><title>{title}</title></head><body>
+{FixtureSite.COOKIE_BANNER}
+<score-board data-qa="score-panel" tomatometerscore="{(n * 37) % 101}" audiencescore="{(n * 53) % 101}"></score-board>
+<h1 class="title">{title}</h1>
+<p data-qa="series-info-description">{title} follows a synthetic cast through {n % 9 + 1} seasons of benchmark fixtures.</p>
+<ul>
+    <li><b>TV Network:</b> <span class="info-item-value">{NETWORKS[n % len(NETWORKS)]}</span></li>
+</ul>
+<span data-qa="series-details-premiere-date">Jan {n % 28 + 1}, {2000 + n % 24}</span>
+<span data-qa="series-details-genre">{GENRES[n % len(GENRES)]}</span>
+<img data-qa="poster-image" src="https://resizing.flixster.com/posters/{n}.jpg">
+</body></html>'''
+
+    def listing_page(self, after=None):
+        with self._lock:
+            start = self.cursors[after] if after else 0
+        shows = range(start, min(start + Initialiser.PAGE_SIZE, self.shows))
+        return {
+            'grid': {'list': [{'mediaUrl': f'/tv/synthetic_show_{n}'} for n in shows]},
+            'pageInfo': {'endCursor': self.cursor(start + len(shows)), 'hasNextPage': start + len(shows) < self.shows}
+        }
+
+    def browse_page(self):
+        shows = range(min(Initialiser.PAGE_SIZE, self.shows))
+        tiles = ''.join(f'<a class="js-tile-link" href="/tv/synthetic_show_{n}">Synthetic Show {n}</a>' for n in shows)
+        button = f'<button id="load-more" data-cursor="{self.cursor(len(shows))}" onclick="loadMore(this)">Load more</button>' if len(shows) < self.shows else ''
+        listing_path = urlsplit(Initialiser.LISTING_URL).path
+        return f'''<html><body>
+{FixtureSite.COOKIE_BANNER}
+<div id="tiles">{tiles}</div>
+{button}
+<script>
+function loadMore(button) {{
+    fetch('{listing_path}?after=' + encodeURIComponent(button.dataset.cursor)).then(function (response) {{
+        return response.json();
+    }}).then(function (listing) {{
+        var tiles = document.getElementById('tiles');
+        listing.grid.list.forEach(function (show) {{
+            var tile = document.createElement('a');
+            tile.className = 'js-tile-link';
+            tile.href = show.mediaUrl;
+            tile.textContent = show.mediaUrl;
+            tiles.appendChild(tile);
+        }});
+        if (listing.pageInfo.hasNextPage) {{
+            button.dataset.cursor = listing.pageInfo.endCursor;
+        }} else {{
+            button.remove();
+        }}
+    }});
+}}
+</script>
+</body></html>'''
+
+    def poster(self):
+        if self._poster == None:
+            try:
+                from PIL import Image
+                image = io.BytesIO()
+                Image.new('RGB', (206, 305), (200, 30, 30)).save(image, format='JPEG')
+                self._poster = image.getvalue()
+            except ImportError:
+                self._poster = b'\xff\xd8\xff\xe0' + bytes(range(256)) * 8 + b'\xff\xd9'
+        return self._poster
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    '''
+    Serves the pages of the server's FixtureSite
+    '''
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    wbufsize = -1
+
+    def do_GET(self):
+        site = self.server.site
+        parts = urlsplit(self.path)
+        if parts.path == urlsplit(Initialiser.LISTING_URL).path:
+            after = parse_qs(parts.query).get('after', [None])[0]
+            try:
+                self.send(200, 'application/json', json.dumps(site.listing_page(after)).encode())
+            except KeyError:
+                self.send(400, 'text/plain', b'Unknown cursor')
+        elif parts.path == urlsplit(Initialiser.BROWSE_URL).path:
+            self.send(200, 'text/html', site.browse_page().encode())
+        elif parts.path.startswith('/tv/synthetic_show_'):
+            n = int(parts.path.rsplit('_', 1)[-1])
+            if n < site.shows:
+                self.send(200, 'text/html', site.show_page(n).encode())
+            else:
+                self.send(404, 'text/plain', b'Not found')
+        elif parts.path.startswith('/posters/'):
+            self.send(200, 'image/jpeg', site.poster())
+        else:
+            self.send(404, 'text/plain', b'Not found')
+
+    def send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    '''
+    This class serves a FixtureSite from a local HTTP server in a background thread
+
+    Parameters:
+    ----------
+    site: FixtureSite
+        The synthetic site that is served
+
+
+    Attributes:
+    ----------
+    origin: str
+        The scheme, host and port of the server
+
+
+    Methods:
+    -------
+    start()
+        Starts the server on a free port
+    stop()
+        Stops the server
+    '''
+
+    def __init__(self, site):
+        self.site = site
+        self.server = None
+        self.thread = None
+        self.origin = None
+
+    def start(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+        self.server.daemon_threads = True
+        self.server.site = self.site
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.origin = f'http://127.0.0.1:{self.server.server_port}'
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FixtureAdapter(HTTPAdapter):
+    '''
+    This class is a connection pool adapter that sends requests for the real site's hosts to the fixture server instead,
+    so the scraper requests the same urls it would in production
+    '''
+
+    def __init__(self, origin, **kwargs):
+        self.origin = urlsplit(origin)
+        HTTPAdapter.__init__(self, **kwargs)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = urlunsplit((self.origin.scheme, self.origin.netloc, parts.path, parts.query, ''))
+        return HTTPAdapter.send(self, request, **kwargs)
+
+
+def fixture_session_factory(origin):
+    '''
+    Returns a session factory for the Scraper whose sessions send every request for rottentomatoes.com or flixster.com to the fixture server.
+    An http_cache is accepted so the Scraper starts its CachingProxy for the webdrivers, the fixture hosts are never cached
+    '''
+    def create_fixture_session(pool_size=10, retry_policy=None, http_cache=None):
+        session = create_session(pool_size=pool_size, retry_policy=retry_policy, http_cache=http_cache)
+        adapter = FixtureAdapter(origin, pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://www.rottentomatoes.com', adapter)
+        session.mount('https://resizing.flixster.com', adapter)
+        return session
+    return create_fixture_session
+
+
+def peak_rss_mb():
+    '''
+    Returns the peak resident memory of the process in MB
+    '''
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def create_backend(storage, temp_dir):
+    '''
+    Returns a new storage backend of the given kind in a temporary folder
+    '''
+    if storage == 'sqlite':
+        return SQLiteStorage(f'{temp_dir}/shows.db')
+    return ShardedStorage(f'{temp_dir}/shards', format=storage)
+
+
+def run_selenium_benchmark(session_factory, max_workers, storage, pages, items_sample, retry_policy):
+    '''
+    Benchmarks the selenium engine against the fixture server, with the webdrivers loading its pages through a CachingProxy
+    and blocked from every other host. Times browser discovery of the given number of "Load more" pages and
+    page parsing with Items on their own, then a full Scraper crawl with browser discovery
+    '''
+    results = {'pages': pages}
+    driver_factory = DriverFactory(allowed_hosts=())
+    readiness = Readiness()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        proxy = CachingProxy(session_factory(pool_size=max_workers)).start()
+        discovery = None
+        try:
+            start = time.perf_counter()
+            discovery = Initialiser(number_of_pages_to_scrape=pages, readiness=readiness, discovery='browser', driver_factory=driver_factory, proxy=proxy)
+            urls = list(discovery.iter_urls())
+            elapsed = time.perf_counter() - start
+            results['discovery'] = {'urls': len(urls), 'seconds': elapsed, 'urls_per_second': len(urls) / elapsed}
+
+            metrics = Metrics()
+            for url in urls[:items_sample]:
+                with metrics.time('items'):
+                    discovery.driver.get(proxy.url_for(url))
+                    readiness.wait_for_score_board(discovery.driver)
+                    Items(discovery.driver, readiness=readiness, url=url).get_items()
+            results['items'] = metrics.summary()['stages'].get('items')
+        finally:
+            if discovery != None:
+                discovery.driver.quit()
+            proxy.stop()
+            proxy.session.close()
+
+        scrape = Scraper(
+            max_workers=max_workers,
+            engine='selenium',
+            discovery='browser',
+            pages_to_scrape=pages,
+            storage=create_backend(storage, temp_dir),
+            retry_policy=retry_policy,
+            session_factory=session_factory,
+            http_cache=HttpCache(f'{temp_dir}/http_cache', mode='passthrough'),
+            driver_factory=driver_factory,
+            journal_path=f'{temp_dir}/crawl_journal.jsonl',
+            report_path=f'{temp_dir}/crawl_report.json'
+        )
+        results['scrape'] = time_scrape(scrape)
+    return results
+
+
+def time_scrape(scrape):
+    '''
+    Runs a full crawl and returns its pages per second, counters and per-stage timings
+    '''
+    start = time.perf_counter()
+    scrape.perform_scrape()
+    elapsed = time.perf_counter() - start
+    summary = scrape.metrics.summary()
+    return {
+        'seconds': elapsed,
+        'pages_per_second': summary['counters'].get('urls', 0) / elapsed,
+        'counters': summary['counters'],
+        'stages': summary['stages']
+    }
+
+
+def run_benchmark(shows=1000, max_workers=8, storage='sqlite', items_sample=200, output=None, engines=('http', 'selenium'), selenium_pages=2):
+    '''
+    Serves a FixtureSite with the given number of shows and benchmarks the scraper against it.
+    For the http engine, times url discovery with the Initialiser and page parsing with HttpItems on their own, then a full Scraper crawl.
+    For the selenium engine, does the same with browser discovery of selenium_pages "Load more" pages and Items, served to Firefox through a CachingProxy.
+    Returns the pages per second, latency percentiles, peak RSS and per-stage timings of each, the selenium results under 'selenium'
+    '''
+    server = FixtureServer(FixtureSite(shows)).start()
+    session_factory = fixture_session_factory(server.origin)
+    retry_policy = RetryPolicy(RateLimiter(rate=1e9))
+    results = {'shows': shows, 'max_workers': max_workers, 'storage': storage, 'engines': list(engines)}
+    try:
+        if 'selenium' in engines:
+            results['selenium'] = run_selenium_benchmark(session_factory, max_workers, storage, selenium_pages, items_sample, retry_policy)
+        if 'http' not in engines:
+            return results
+        with tempfile.TemporaryDirectory() as temp_dir:
+            session = session_factory(pool_size=max_workers)
+            start = time.perf_counter()
+            discovery = Initialiser(number_of_pages_to_scrape=None, discovery='http', session=session, max_workers=max_workers)
+            urls = list(discovery.iter_urls_http())
+            elapsed = time.perf_counter() - start
+            results['discovery'] = {'urls': len(urls), 'seconds': elapsed, 'urls_per_second': len(urls) / elapsed}
+
+            metrics = Metrics()
+            for url in urls[:items_sample]:
+                with metrics.time('items'):
+                    HttpItems(url, session).get_items()
+            results['items'] = metrics.summary()['stages'].get('items')
+            session.close()
+
+            scrape = Scraper(
+                max_workers=max_workers,
+                engine='http',
+                discovery='http',
+                pages_to_scrape=None,
+                storage=create_backend(storage, temp_dir),
+                retry_policy=retry_policy,
+                session_factory=session_factory,
+                journal_path=f'{temp_dir}/crawl_journal.jsonl',
+                report_path=f'{temp_dir}/crawl_report.json'
+            )
+            results['scrape'] = time_scrape(scrape)
+    finally:
+        server.stop()
+        results['peak_rss_mb'] = peak_rss_mb()
+        if output != None:
+            with open(output, 'w') as fp:
+                json.dump(obj=results, indent=4, fp=fp)
+    return results
+
+
+def print_results(results):
+    '''
+    Prints the headline numbers of a benchmark
+    '''
+    print(f"Benchmark of {results['shows']} shows with {results['max_workers']} workers and {results['storage']} storage")
+    if 'http' in results['engines']:
+        print('http engine')
+        print_engine_results(results)
+    if 'selenium' in results['engines']:
+        print(f"selenium engine, {results['selenium']['pages']} pages of browser discovery")
+        print_engine_results(results['selenium'])
+    print(f"Peak RSS: {results['peak_rss_mb']:.0f}MB")
+
+
+def print_engine_results(results):
+    '''
+    Prints the discovery, Items and scrape numbers of one engine
+    '''
+    print(f"Discovery: {results['discovery']['urls']} urls, {results['discovery']['urls_per_second']:.0f} urls/s")
+    if results['items'] != None:
+        print(f"Items: {results['items']['p50'] * 1000:.1f}ms p50, {results['items']['p95'] * 1000:.1f}ms p95, {results['items']['p99'] * 1000:.1f}ms p99")
+    print(f"Scrape: {results['scrape']['pages_per_second']:.1f} pages/s over {results['scrape']['seconds']:.1f}s")
+    for stage, stats in results['scrape']['stages'].items():
+        print(f"    {stage}: {stats['count']} calls, {stats['p50'] * 1000:.1f}ms p50, {stats['p95'] * 1000:.1f}ms p95, {stats['p99'] * 1000:.1f}ms p99")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the scraper against a local synthetic copy of the rotten tomatoes TV pages')
+    parser.add_argument('--shows', type=int, default=10000, help='number of synthetic shows served')
+    parser.add_argument('--max-workers', type=int, default=8, help='number of threads scraping show pages')
+    parser.add_argument('--storage', choices=['sqlite', 'jsonl', 'parquet'], default='sqlite', help='storage backend the shows are saved with')
+    parser.add_argument('--items-sample', type=int, default=200, help='number of show pages parsed on their own to time HttpItems')
+    parser.add_argument('--output', help='file the results are saved to as JSON')
+    parser.add_argument('--engines', nargs='+', choices=['http', 'selenium'], default=['http', 'selenium'], help='engines benchmarked, selenium needs Firefox and geckodriver')
+    parser.add_argument('--selenium-pages', type=int, default=2, help='number of "Load more" pages browser discovery loads for the selenium engine')
+    args = parser.parse_args()
+    print_results(run_benchmark(shows=args.shows, max_workers=args.max_workers, storage=args.storage, items_sample=args.items_sample, output=args.output, engines=args.engines, selenium_pages=args.selenium_pages))
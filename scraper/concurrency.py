@@ -0,0 +1,145 @@
+import threading
+import psutil
+import time
+
+
+class ConcurrencyController:
+    '''
+    This class adjusts the number of show pages scraped at the same time while a crawl runs.
+    After every window of finished pages it looks at the median page latency, the error and omission rates and the host's memory use,
+    backs off when any of them look unhealthy, and otherwise lets one more page run at a time, always staying within the minimum and maximum
+
+    Parameters:
+    ----------
+    minimum: int
+        The fewest pages scraped at the same time
+    maximum: int
+        The most pages scraped at the same time, and the size the thread and driver pools are created with
+    initial: int
+        The number of pages scraped at the same time to begin with, the minimum is used if none is given
+    window: int
+        Number of finished pages between each decision
+    latency_tolerance: float
+        How many times slower than the fastest window so far the median latency can get before the limit is lowered
+    max_error_rate: float
+        The share of pages in a window that can raise an error before the limit is halved
+    max_omission_rate: float
+        The share of pages in a window that can be omitted before the limit is lowered
+    max_memory_percent: float
+        The share of the host's memory in use above which the limit is halved
+
+
+    Attributes:
+    ----------
+    limit: int
+        The number of pages currently allowed to be scraped at the same time
+    decisions: list
+        Every decision made, with the limit before and after it, the reason, and the window's statistics
+
+
+    Methods:
+    -------
+    acquire()
+        Waits until fewer pages than the limit are being scraped, then takes a place
+    release()
+        Gives a place back
+    run()
+        Calls a function in a place, timing it and recording whether it raised an error, returned None or returned a result
+    record()
+        Records the latency and outcome of a page, and makes a decision once the window is full
+    adjust()
+        Decides the new limit from the window's statistics and logs the decision
+    memory_percent()
+        Returns the share of the host's memory in use
+    '''
+
+    def __init__(self, minimum=1, maximum=16, initial=None, window=20, latency_tolerance=1.5, max_error_rate=0.2, max_omission_rate=0.3, max_memory_percent=85):
+        if minimum < 1 or maximum < minimum:
+            raise ValueError('Concurrency bounds must satisfy 1 <= minimum <= maximum')
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = min(max(initial or minimum, minimum), maximum)
+        self.window = window
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.max_omission_rate = max_omission_rate
+        self.max_memory_percent = max_memory_percent
+        self.decisions = []
+        self.in_flight = 0
+        self._results = []
+        self._best_latency = None
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def run(self, function, *args):
+        self.acquire()
+        start = time.perf_counter()
+        try:
+            result = function(*args)
+        except:
+            self.record(time.perf_counter() - start, 'error')
+            raise
+        finally:
+            self.release()
+        self.record(time.perf_counter() - start, 'omitted' if result == None else 'ok')
+        return result
+
+    def record(self, latency, outcome):
+        with self._condition:
+            self._results.append((latency, outcome))
+            if len(self._results) < self.window:
+                return
+            results = self._results
+            self._results = []
+            self.adjust(results)
+            self._condition.notify_all()
+
+    def adjust(self, results):
+        latencies = sorted(latency for latency, outcome in results)
+        median_latency = latencies[len(latencies) // 2]
+        error_rate = sum(outcome == 'error' for latency, outcome in results) / len(results)
+        omission_rate = sum(outcome == 'omitted' for latency, outcome in results) / len(results)
+        memory_percent = self.memory_percent()
+        previous = self.limit
+        if memory_percent > self.max_memory_percent:
+            self.limit = max(self.minimum, self.limit // 2)
+            reason = 'memory'
+        elif error_rate > self.max_error_rate:
+            self.limit = max(self.minimum, self.limit // 2)
+            reason = 'errors'
+        elif omission_rate > self.max_omission_rate:
+            self.limit = max(self.minimum, self.limit - 1)
+            reason = 'omissions'
+        elif self._best_latency != None and median_latency > self._best_latency * self.latency_tolerance:
+            self.limit = max(self.minimum, self.limit - 1)
+            reason = 'latency'
+        else:
+            self.limit = min(self.maximum, self.limit + 1)
+            reason = 'healthy'
+        if self._best_latency == None or median_latency < self._best_latency:
+            self._best_latency = median_latency
+        decision = {
+            'from': previous,
+            'to': self.limit,
+            'reason': reason,
+            'median_latency': median_latency,
+            'error_rate': error_rate,
+            'omission_rate': omission_rate,
+            'memory_percent': memory_percent
+        }
+        self.decisions.append(decision)
+        print(f"Concurrency {previous} -> {self.limit} ({reason}: {median_latency:.2f}s median latency, {error_rate:.0%} errors, {omission_rate:.0%} omitted, {memory_percent:.0f}% memory)")
+        return decision
+
+    def memory_percent(self):
+        return psutil.virtual_memory().percent
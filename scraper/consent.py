@@ -0,0 +1,112 @@
+from urllib.parse import urlsplit
+import time
+import json
+import os
+
+
+class ConsentJar:
+    '''
+    This class keeps the cookies the site sets when its cookies pop-up is accepted, so the pop-up only has to be accepted once.
+    The cookies are captured from a webdriver that accepted the pop-up, saved to a file, and installed into every new webdriver and http session,
+    so no page load waits on the pop-up again.
+    Nothing is saved unless the pop-up was actually accepted, so if it never appeared or did not close,
+    the scraper keeps accepting it on each page as it would without a ConsentJar
+
+    Parameters:
+    ----------
+    path: str
+        The location of the JSON file the cookies are stored in
+    origin: str
+        The scheme and host of the site the cookies belong to
+    max_age: float
+        Number of seconds after capture the cookies are used for before they are captured again
+
+
+    Attributes:
+    ----------
+    cookies: list
+        The consent cookies, each a dictionary of the name, value, path and expiry webdrivers use
+    captured: float
+        The time the cookies were captured, None if they never have been or have expired
+
+
+    Methods:
+    -------
+    load()
+        Reads the cookies file if it exists, ignoring it if it is older than max_age
+    is_ready()
+        Returns True if consent has been captured and has not expired
+    capture()
+        Accepts the cookies pop-up in a webdriver that has a page of the site open, then saves the cookies the site set.
+        Returns False without saving anything if the pop-up did not appear or did not close
+    save()
+        Writes the cookies to a temporary file and renames it into place
+    install()
+        Adds the cookies to a webdriver, loading a small page of the origin first so they are set for its host
+    install_session()
+        Adds the cookies to a requests session
+    '''
+
+    COOKIE_NAMES = ('OptanonAlertBoxClosed', 'OptanonConsent', 'eupubconsent-v2', 'usprivacy')
+    INSTALL_PATH = '/robots.txt'
+
+    def __init__(self, path='../raw_data/consent_cookies.json', origin='https://www.rottentomatoes.com', max_age=30 * 24 * 3600):
+        self.path = os.path.abspath(path)
+        self.origin = origin
+        self.max_age = max_age
+        self.cookies = []
+        self.captured = None
+        self.load()
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path) as fp:
+            saved = json.load(fp)
+        if time.time() - saved['captured'] > self.max_age:
+            return
+        self.cookies = saved['cookies']
+        self.captured = saved['captured']
+
+    def is_ready(self):
+        return self.captured != None and time.time() - self.captured <= self.max_age
+
+    def capture(self, driver, readiness):
+        button = readiness.wait_for_cookie_banner(driver)
+        if button == None:
+            print('No cookies pop-up to accept, consent cookies not captured')
+            return False
+        button.click()
+        if readiness.wait_for_cookie_banner_closed(driver) == None:
+            print('The cookies pop-up did not close, consent cookies not captured')
+            return False
+        self.cookies = []
+        for cookie in driver.get_cookies():
+            if cookie['name'] in ConsentJar.COOKIE_NAMES:
+                self.cookies.append({key: cookie[key] for key in ('name', 'value', 'path', 'expiry', 'secure') if key in cookie})
+        self.captured = time.time()
+        ConsentJar.save(self)
+        print(f'{len(self.cookies)} consent cookies captured')
+        return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f'{self.path}.tmp', 'w') as fp:
+            json.dump(obj={'captured': self.captured, 'cookies': self.cookies}, indent=4, fp=fp)
+        os.replace(f'{self.path}.tmp', self.path)
+
+    def install(self, driver, origin=None):
+        if len(self.cookies) == 0:
+            return
+        origin = origin or self.origin
+        driver.get(origin + ConsentJar.INSTALL_PATH)
+        for cookie in self.cookies:
+            cookie = dict(cookie)
+            if urlsplit(origin).scheme != 'https':
+                cookie['secure'] = False
+            driver.add_cookie(cookie)
+
+    def install_session(self, session):
+        host = urlsplit(self.origin).hostname
+        for cookie in self.cookies:
+            session.cookies.set(cookie['name'], cookie['value'], domain=host, path=cookie.get('path', '/'))
@@ -0,0 +1,146 @@
+from selenium import webdriver
+from urllib.parse import quote
+import json
+
+
+class DriverFactory:
+    '''
+    This class creates the headless Firefox webdrivers used by the DriverPool, the Initialiser and the tests, all from the same settings.
+    The lean profile only loads what the scraper reads: images, stylesheets, web fonts and media are not loaded,
+    requests to known ad and tracking hosts are sent to a dead proxy by a PAC script, and pages are returned as soon as the DOM is ready
+
+    Parameters:
+    ----------
+    lean: bool
+        If True, the lean profile is used, otherwise the browser loads the full page as a normal Firefox would
+    headless: bool
+        If True, Firefox is run without a window
+    window_size: tuple
+        The width and height of the browser window
+    page_load_strategy: str
+        'eager' returns from driver.get() once the DOM is ready, 'normal' waits for every resource, the lean profile uses 'eager'
+    blocked_hosts: tuple
+        Host names whose requests, and their subdomains', are blocked by the lean profile
+    allowed_hosts: tuple
+        If given, every host that is not one of these or their subdomains is blocked, with the full profile as well as the lean one,
+        an empty tuple only lets the browser reach the local machine
+    block_stylesheets: bool
+        If True, the lean profile does not apply stylesheets
+
+
+    Methods:
+    -------
+    options()
+        Returns the FirefoxOptions for the chosen profile
+    proxy_autoconfig()
+        Returns the PAC script that blocks the blocked hosts, and every host that is not allowed if there are allowed hosts
+    create_driver()
+        Launches a new webdriver with the options, also called by calling the factory itself
+    '''
+
+    BLOCKED_HOSTS = (
+        'doubleclick.net',
+        'googlesyndication.com',
+        'googletagservices.com',
+        'googletagmanager.com',
+        'google-analytics.com',
+        'adservice.google.com',
+        'amazon-adsystem.com',
+        'adnxs.com',
+        'adsrvr.org',
+        'rubiconproject.com',
+        'pubmatic.com',
+        'openx.net',
+        'casalemedia.com',
+        'criteo.com',
+        'taboola.com',
+        'outbrain.com',
+        'scorecardresearch.com',
+        'chartbeat.com',
+        'chartbeat.net',
+        'quantserve.com',
+        'moatads.com',
+        'krxd.net',
+        'facebook.net',
+        'connect.facebook.net',
+        'platform.twitter.com',
+        'jwpcdn.com',
+        'jwplayer.com',
+        'imasdk.googleapis.com',
+        'fonts.googleapis.com',
+        'fonts.gstatic.com',
+        'use.typekit.net'
+    )
+    LEAN_PREFERENCES = {
+        'permissions.default.image': 2,
+        'gfx.downloadable_fonts.enabled': False,
+        'browser.display.use_document_fonts': 0,
+        'media.autoplay.default': 5,
+        'media.autoplay.blocking_policy': 2,
+        'media.mediasource.enabled': False,
+        'media.hls.enabled': False,
+        'network.prefetch-next': False,
+        'network.dns.disablePrefetch': True,
+        'network.http.speculative-parallel-limit': 0,
+        'browser.cache.disk.enable': False,
+        'browser.sessionhistory.max_total_viewers': 0,
+        'dom.ipc.processCount': 1,
+        'toolkit.telemetry.enabled': False,
+        'datareporting.healthreport.uploadEnabled': False
+    }
+    # Requests for blocked hosts are sent to the discard port of the local machine, which refuses them straight away
+    BLACKHOLE = 'PROXY 127.0.0.1:9'
+
+    def __init__(self, lean=True, headless=True, window_size=(1920, 1080), page_load_strategy=None, blocked_hosts=None, allowed_hosts=None, block_stylesheets=True):
+        self.lean = lean
+        self.headless = headless
+        self.window_size = window_size
+        self.page_load_strategy = page_load_strategy or ('eager' if lean else 'normal')
+        self.blocked_hosts = DriverFactory.BLOCKED_HOSTS if blocked_hosts == None else blocked_hosts
+        self.allowed_hosts = allowed_hosts
+        self.block_stylesheets = block_stylesheets
+
+    def options(self):
+        firefox_options = webdriver.FirefoxOptions()
+        firefox_options.add_argument(f'--window-size={self.window_size[0]},{self.window_size[1]}')
+        if self.headless:
+            firefox_options.add_argument('--headless')
+        firefox_options.page_load_strategy = self.page_load_strategy
+        if self.lean:
+            for name, value in DriverFactory.LEAN_PREFERENCES.items():
+                firefox_options.set_preference(name, value)
+            if self.block_stylesheets:
+                firefox_options.set_preference('permissions.default.stylesheet', 2)
+        if self.lean or self.allowed_hosts != None:
+            firefox_options.set_preference('network.proxy.type', 2)
+            firefox_options.set_preference('network.proxy.autoconfig_url', 'data:application/x-ns-proxy-autoconfig,' + quote(self.proxy_autoconfig()))
+        return firefox_options
+
+    def proxy_autoconfig(self):
+        blocked = json.dumps(list(self.blocked_hosts))
+        allowed = json.dumps(list(self.allowed_hosts)) if self.allowed_hosts != None else 'null'
+        return f'''function FindProxyForURL(url, host) {{
+    var blocked = {blocked};
+    var allowed = {allowed};
+    function matches(hosts) {{
+        for (var i = 0; i < hosts.length; i++) {{
+            if (host == hosts[i] || dnsDomainIs(host, '.' + hosts[i])) {{
+                return true;
+            }}
+        }}
+        return false;
+    }}
+    if (isPlainHostName(host) || host == '127.0.0.1' || host == 'localhost') {{
+        return 'DIRECT';
+    }}
+    if (matches(blocked) || (allowed !== null && !matches(allowed))) {{
+        return '{DriverFactory.BLACKHOLE}';
+    }}
+    return 'DIRECT';
+}}'''
+
+    def create_driver(self):
+        return webdriver.Firefox(options=self.options())
+
+    def __call__(self):
+        return self.create_driver()
@@ -0,0 +1,276 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from collections import OrderedDict
+from urllib.parse import urljoin
+import threading
+import requests
+import hashlib
+import json
+import time
+import io
+import os
+
+
+class HttpCache:
+    '''
+    This class stores http responses on disk keyed by url, so pages and poster imgs can be read back at disk speed instead of being fetched again.
+    The cache is kept under a size limit by removing the least recently used responses first.
+    A shared cache, as each worker process opens, reads any response on disk, including those other processes store, but only evicts the ones it stores itself,
+    so the workers' shares of the limit never remove each other's responses, and the coordinator trims the whole cache once they finish
+
+    Parameters:
+    ----------
+    root: str
+        The folder the responses are stored in
+    mode: str
+        'record' reads responses from the cache and fetches and stores any that are missing
+        'replay' only reads responses from the cache, a missing response is an error, so no request reaches the network
+        'passthrough' always fetches and never reads or stores, as if there were no cache
+    max_bytes: int
+        The most bytes the stored responses can take up before the least recently used are removed
+    shared: bool
+        If True, responses stored by other processes are read from disk but never evicted, and max_bytes only limits the responses this cache stores
+
+
+    Attributes:
+    ----------
+    size: int
+        Number of bytes the stored responses take up, or only the ones this cache stored if it is shared
+    hits: int
+        Number of responses read from the cache
+    misses: int
+        Number of responses that were not in the cache
+    evicted: int
+        Number of responses removed to keep the cache under max_bytes
+
+
+    Methods:
+    -------
+    key()
+        Returns the hash of a url that its response is stored under
+    paths()
+        Returns the paths of the metadata and body files of a key
+    load()
+        Rebuilds the least recently used order from the modification times of the stored responses
+    get()
+        Returns the status, headers and body stored for a url, or None if it is not in the cache
+    put()
+        Stores the status, headers and body of a url's response, then removes the least recently used responses until the cache fits in max_bytes
+    evict()
+        Removes the least recently used responses until the cache fits in max_bytes
+    trim()
+        Reloads every response on disk, including those stored by other processes, and evicts until the whole cache fits in max_bytes
+    '''
+
+    MODES = ('record', 'replay', 'passthrough')
+
+    def __init__(self, root='../raw_data/http_cache', mode='record', max_bytes=1024 ** 3, shared=False):
+        if mode not in HttpCache.MODES:
+            raise ValueError(f"mode must be 'record', 'replay' or 'passthrough', not '{mode}'")
+        self.root = os.path.abspath(root)
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        if not shared:
+            self.load()
+
+    def key(self, url):
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def paths(self, key):
+        folder = os.path.join(self.root, key[:2])
+        return os.path.join(folder, f'{key}.json'), os.path.join(folder, f'{key}.body')
+
+    def load(self):
+        found = []
+        for folder in os.listdir(self.root):
+            folder_path = os.path.join(self.root, folder)
+            if not os.path.isdir(folder_path):
+                continue
+            for name in os.listdir(folder_path):
+                if not name.endswith('.json'):
+                    continue
+                key = name[:-len('.json')]
+                meta_path, body_path = self.paths(key)
+                try:
+                    size = os.path.getsize(meta_path) + os.path.getsize(body_path)
+                    found.append((os.path.getmtime(meta_path), key, size))
+                except OSError:
+                    continue
+        for modified, key, size in sorted(found):
+            self.entries[key] = size
+            self.size += size
+
+    def get(self, url):
+        key = self.key(url)
+        meta_path, body_path = self.paths(key)
+        with self._lock:
+            if key not in self.entries and not self.shared:
+                self.misses += 1
+                return None
+            if key in self.entries:
+                self.entries.move_to_end(key)
+        try:
+            with open(meta_path) as fp:
+                meta = json.load(fp)
+            with open(body_path, 'rb') as fp:
+                body = fp.read()
+            os.utime(meta_path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return meta['status'], meta['headers'], body
+
+    def put(self, url, status, headers, body):
+        key = self.key(url)
+        meta_path, body_path = self.paths(key)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        meta = json.dumps({'url': url, 'status': status, 'headers': headers, 'stored': time.time()})
+        temp = f'{threading.get_ident()}.tmp'
+        with open(f'{body_path}.{temp}', 'wb') as fp:
+            fp.write(body)
+        os.replace(f'{body_path}.{temp}', body_path)
+        with open(f'{meta_path}.{temp}', 'w') as fp:
+            fp.write(meta)
+        os.replace(f'{meta_path}.{temp}', meta_path)
+        with self._lock:
+            self.size += len(body) + len(meta) - self.entries.pop(key, 0)
+            self.entries[key] = len(body) + len(meta)
+            self.evict()
+
+    def evict(self):
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            key, size = self.entries.popitem(last=False)
+            self.size -= size
+            self.evicted += 1
+            for path in self.paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def trim(self):
+        with self._lock:
+            self.entries = OrderedDict()
+            self.size = 0
+            self.load()
+            self.evict()
+
+
+def cached_response(request, status, headers, body):
+    '''
+    Builds a requests Response for a request from a stored status, headers and body,
+    with the body already read so streaming it with iter_content works the same as for a live response
+    '''
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.raw = io.BytesIO(body)
+    response._content = body
+    response._content_consumed = True
+    response.url = request.url
+    response.request = request
+    response.reason = 'OK' if status < 400 else 'Cached error'
+    return response
+
+
+class CachingProxy:
+    '''
+    This class runs a local reverse proxy in front of the site, so a webdriver can load its pages through the HttpCache.
+    A page is opened at the proxy's url for it, and the page's own requests for scripts, styles and images on the same site go through the proxy as well.
+    Every request is made with a session whose adapter uses the cache
+
+    Parameters:
+    ----------
+    session: requests.Session
+        The caching session the proxy fetches with
+    origin: str
+        The scheme and host of the site behind the proxy
+
+
+    Attributes:
+    ----------
+    address: str
+        The scheme, host and port of the proxy
+
+
+    Methods:
+    -------
+    start()
+        Starts the proxy on a free local port in a background thread
+    url_for()
+        Returns the proxy url that serves a page of the site
+    site_url()
+        Returns the url on the site of a page served by the proxy, the reverse of url_for()
+    stop()
+        Stops the proxy
+    '''
+
+    def __init__(self, session, origin='https://www.rottentomatoes.com'):
+        self.session = session
+        self.origin = origin
+        self.server = None
+        self.address = None
+
+    def start(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), CachingProxyHandler)
+        self.server.daemon_threads = True
+        self.server.proxy = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.address = f'http://127.0.0.1:{self.server.server_port}'
+        return self
+
+    def url_for(self, url):
+        if not url.startswith(self.origin):
+            return url
+        return self.address + url[len(self.origin):]
+
+    def site_url(self, url):
+        if not url.startswith(self.address):
+            return url
+        return self.origin + url[len(self.address):]
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class CachingProxyHandler(BaseHTTPRequestHandler):
+    '''
+    Fetches each requested path from the proxy's origin with its caching session and returns the response
+    '''
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    wbufsize = -1
+    HOP_HEADERS = ('connection', 'keep-alive', 'transfer-encoding', 'content-encoding', 'content-length')
+
+    def do_GET(self):
+        proxy = self.server.proxy
+        try:
+            response = proxy.session.get(urljoin(proxy.origin, self.path), timeout=30)
+            status, headers, body = response.status_code, response.headers, response.content
+        except requests.RequestException as error:
+            status, headers, body = 504, {'Content-Type': 'text/plain'}, str(error).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            if name.lower() not in CachingProxyHandler.HOP_HEADERS:
+                self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
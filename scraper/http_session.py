@@ -0,0 +1,107 @@
+import requests
+from requests.adapters import HTTPAdapter
+import sys
+sys.path.append('../scraper')
+from http_cache import cached_response
+
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/110.0',
+    'Accept-Language': 'en-GB,en;q=0.9'
+}
+
+
+class RetryAdapter(HTTPAdapter):
+    '''
+    This class is a connection pool adapter that sends every request through a RetryPolicy,
+    so each request made with the session is rate limited per host and retried on timeouts and 429/5xx responses
+
+    Parameters:
+    ----------
+    retry_policy: RetryPolicy
+        The rate limiter and retry rules every request goes through, requests are sent once without a rate limit if None
+    '''
+
+    def __init__(self, retry_policy, **kwargs):
+        self.retry_policy = retry_policy
+        HTTPAdapter.__init__(self, **kwargs)
+
+    def send(self, request, **kwargs):
+        if self.retry_policy == None:
+            return HTTPAdapter.send(self, request, **kwargs)
+        return self.retry_policy.call(request.url, HTTPAdapter.send, self, request, **kwargs)
+
+
+class CachingAdapter(RetryAdapter):
+    '''
+    This class is a RetryAdapter that answers GET requests from an HttpCache before anything reaches the rate limiter or the network.
+    In 'record' mode a missing response is fetched and stored if it succeeded, in 'replay' mode a missing response raises a ConnectionError,
+    and in 'passthrough' mode the cache is not used
+
+    Parameters:
+    ----------
+    http_cache: HttpCache
+        The on-disk cache responses are read from and stored in
+    retry_policy: RetryPolicy
+        The rate limiter and retry rules the requests that miss the cache go through
+    '''
+
+    def __init__(self, http_cache, retry_policy=None, **kwargs):
+        self.http_cache = http_cache
+        RetryAdapter.__init__(self, retry_policy, **kwargs)
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET' or self.http_cache.mode == 'passthrough':
+            return RetryAdapter.send(self, request, **kwargs)
+        cached = self.http_cache.get(request.url)
+        if cached != None:
+            return cached_response(request, *cached)
+        if self.http_cache.mode == 'replay':
+            raise requests.ConnectionError(f'{request.url} is not in the HTTP cache', request=request)
+        response = RetryAdapter.send(self, request, **kwargs)
+        if response.status_code == 200:
+            self.http_cache.put(request.url, response.status_code, dict(response.headers), response.content)
+        return response
+
+
+def session_retry_policy(session, url):
+    '''
+    Returns the RetryPolicy the session already sends requests for a url through, or None if they are sent once,
+    so a caller with its own retry loop can leave the retries to the session instead of multiplying them
+    '''
+    try:
+        adapter = session.get_adapter(url)
+    except:
+        return None
+    return getattr(adapter, 'retry_policy', None)
+
+
+def create_session(pool_size=10, retry_policy=None, http_cache=None):
+    '''
+    Creates a requests session that keeps up to pool_size connections alive per host,
+    so the threads sharing it reuse connections instead of opening a new one for every request
+
+    Parameters:
+    ----------
+    pool_size: int
+        The number of connections kept open per host, normally the thread pool's max_workers
+    retry_policy: RetryPolicy
+        If given, every request made with the session is rate limited and retried by it
+    http_cache: HttpCache
+        If given, GET requests are recorded to or replayed from it
+
+    Returns:
+    -------
+    requests.Session
+    '''
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    if http_cache != None:
+        adapter = CachingAdapter(http_cache, retry_policy, pool_connections=pool_size, pool_maxsize=pool_size)
+    elif retry_policy != None:
+        adapter = RetryAdapter(retry_policy, pool_connections=pool_size, pool_maxsize=pool_size)
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
@@ -0,0 +1,97 @@
+import concurrent.futures
+import threading
+import requests
+import time
+import os
+import sys
+sys.path.append('../scraper')
+from http_session import create_session, session_retry_policy
+from metrics import timed
+
+
+class ImageDownloader:
+    '''
+    This class downloads poster images in a pool of background threads, so saving an item never waits on the image host.
+    Every thread shares one keep-alive connection pool, and each image is streamed to disk in chunks instead of being held in memory
+
+    Parameters:
+    ----------
+    max_workers: int
+        Maximum number of images downloaded at the same time
+    session: requests.Session
+        The session used for the downloads, a new pooled session sized to max_workers is created if none is given
+    timeout: float
+        Number of seconds to wait to connect to, or to read from, the image host
+    retries: int
+        Number of times a failed download is retried before it is given up,
+        not used for an image the session already retries with a RetryPolicy, so each request is only retried by one of them
+    chunk_size: int
+        Number of bytes written to disk at a time
+    retry_policy: RetryPolicy
+        If given, the session created here rate limits and retries every request with it
+    metrics: Metrics
+        If given, the time taken by each download attempt is recorded as the 'image_download' stage
+
+
+    Attributes:
+    ----------
+    downloaded: int
+        Number of images saved successfully
+    failed: int
+        Number of images given up after every retry
+
+
+    Methods:
+    -------
+    submit()
+        Queues an image url to be saved at a particular path and returns its future
+    download()
+        Streams an image to a temporary file next to the path, retrying with a growing delay unless the session retries it, then renames it into place
+    shutdown()
+        Waits for every queued image to finish downloading, then closes the threads, and the session if it was created here
+    '''
+
+    def __init__(self, max_workers=4, session=None, timeout=10, retries=3, chunk_size=65536, retry_policy=None, metrics=None):
+        self.metrics = metrics
+        self._owns_session = session == None
+        self.session = session or create_session(pool_size=max_workers, retry_policy=retry_policy)
+        self.timeout = timeout
+        self.retries = retries
+        self.chunk_size = chunk_size
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.downloaded = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def submit(self, url, path):
+        return self.executor.submit(self.download, url, path)
+
+    def download(self, url, path):
+        temp_path = f'{path}.part'
+        retries = 0 if session_retry_policy(self.session, url) != None else self.retries
+        for attempt in range(retries + 1):
+            try:
+                with timed(self.metrics, 'image_download'):
+                    with self.session.get(url, timeout=self.timeout, stream=True) as response:
+                        response.raise_for_status()
+                        with open(temp_path, 'wb') as handler:
+                            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                                handler.write(chunk)
+                os.replace(temp_path, path)
+                with self._lock:
+                    self.downloaded += 1
+                return path
+            except requests.RequestException as error:
+                if attempt == retries:
+                    print(f'{url}: image download failed ({error})')
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    with self._lock:
+                        self.failed += 1
+                    return None
+                time.sleep(0.5 * 2 ** attempt)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+        if self._owns_session:
+            self.session.close()
@@ -1,8 +1,11 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
+from bs4 import BeautifulSoup
+from urllib.parse import urljoin, urlencode
+import sys
+sys.path.append('../scraper')
+from readiness import Readiness
+from http_session import create_session
+from driver_factory import DriverFactory
 
 class Initialiser:
     '''
@@ -11,77 +14,233 @@ class Initialiser:
 
     Parameters:
     ----------
-    url: str
-        url for the "TV SHOWS" page on the rotten tomatoes website
+    number_of_pages_to_scrape: int
+        Number of extra pages of results to load after the first, None loads every page when discovery is 'http'
+    readiness: Readiness
+        Waits on the page's DOM instead of sleeping for a fixed time, shared with the Scraper when given
+    discovery: str
+        'browser' clicks the "Load more" button in a webdriver
+        'http' requests the pages of the browse listing directly, without a browser
+    session: requests.Session
+        The session used to request the listing pages when discovery is 'http', a new pooled session is created if none is given,
+        and closed once iter_urls_http() finishes
+    max_workers: int
+        Number of connections kept open by the session created when discovery is 'http'
+    retry_policy: RetryPolicy
+        If given, loading the "TV SHOWS" page and each page of results is rate limited, and retried on timeouts and 429/5xx responses
+    driver_factory: callable
+        Creates the webdriver when discovery is 'browser', a DriverFactory with the lean profile is used if none is given
+    consent: ConsentJar
+        If given, its cookies are installed in the webdriver so the cookies pop-up is skipped, or captured from it the first time the pop-up is accepted
+    proxy: CachingProxy
+        If given, the webdriver loads the "TV SHOWS" page through it, so browser discovery records to or replays from its HttpCache,
+        and the show urls read from the page are turned back into urls on the site
+    keep_urls: bool
+        If False, discovered urls are only yielded by iter_urls(), not kept in the url_list or checked for repeats,
+        for a caller that keeps track of them itself
 
 
     Attributes:
     ----------
     number_of_pages_to_scrape: int
         Number of pages of results loaded on the "TV SHOWS" page
+    readiness: Readiness
+        Waits on the page's DOM instead of sleeping for a fixed time, shared with the Scraper when given
+    driver: webdriver
+        The webdriver used when discovery is 'browser', None when discovery is 'http'
 
+    tiles_scanned: int
+        Number of TV show tiles on the "TV SHOWS" page whose urls have already been read
     url_list: list
         List of urls to each TV show page
 
     Methods:
     -------
     open_url()
-        Opens the "TV SHOWS" page on the rotten tomatoes website 
+        Opens the "TV SHOWS" page on the rotten tomatoes website, through the proxy if there is one
     accept_cookies()
-        Accepts the cookies pop-up
+        Accepts the cookies pop-up, capturing the consent cookies if there is a ConsentJar without them
     load_pages()
-        Loads the desired amount of results by clicking the "Load More" button
+        Clicks the "Load More" button and waits for more results to appear, returns False if no more results loaded
     get_urls()
-        Locates each TV show, gets the href link to it's rotten tomatoes page, and stores it in the url_list
+        Locates each TV show not yet scanned, gets the href link to it's rotten tomatoes page, stores it in the url_list, and returns the new urls
+    get_listing_url()
+        Returns the url of the page of the browse listing that starts at a cursor, or of the first page if there is no cursor
+    parse_listing()
+        Returns the show urls in a listing response, read from its JSON or from the tile links in its html,
+        and the cursor of the next page, None if the response says there is no next page or gives no cursor
+    get_page_urls()
+        Requests the page of the browse listing that starts at a cursor and returns its show urls and the next cursor,
+        raising the error if the page could not be loaded
+    iter_urls_http()
+        Requests the listing pages one after another, following the cursor each response returns,
+        until the depth is reached, a page comes back empty or there is no next page, yielding each new url, then closes the session if it created it
+    iter_urls_browser()
+        Opens the "TV SHOWS" page and loads each page of results with the "Load More" button, yielding the new urls after every page
+    iter_urls()
+        Yields each url as soon as it is discovered, using the chosen discovery
     scrape()
-        Calls the other methods and returns the populated href_list
+        Runs iter_urls() to the end and returns the populated url_list
     '''
 
-    def __init__(self, number_of_pages_to_scrape=4):
-        firefox_options = webdriver.FirefoxOptions()
-        firefox_options.add_argument('--window-size=1920,1080')
-        firefox_options.add_argument('--headless')
-        self.driver = webdriver.Firefox(options=firefox_options)
+    BROWSE_URL = 'https://www.rottentomatoes.com/browse/tv_series_browse/sort:popular'
+    LISTING_URL = 'https://www.rottentomatoes.com/napi/browse/tv_series_browse/sort:popular'
+    PAGE_SIZE = 30
+
+    def __init__(self, number_of_pages_to_scrape=4, readiness=None, discovery='browser', session=None, max_workers=4, retry_policy=None, driver_factory=None, consent=None, proxy=None, keep_urls=True):
+        if discovery not in ('browser', 'http'):
+            raise ValueError(f"discovery must be 'browser' or 'http', not '{discovery}'")
+        self.discovery = discovery
+        self.driver = None
+        self.session = session
+        self._owns_session = discovery == 'http' and session == None
+        self.retry_policy = retry_policy
+        self.consent = consent
+        self.proxy = proxy
+        self.keep_urls = keep_urls
+        if discovery == 'browser':
+            self.driver = (driver_factory or DriverFactory())()
+        elif session == None:
+            self.session = create_session(pool_size=max_workers, retry_policy=retry_policy)
+        self.max_workers = max_workers
         self.number_of_pages_to_scrape = number_of_pages_to_scrape
+        self.readiness = readiness or Readiness()
+        self.tiles_scanned = 0
         self.url_list = []
 
     def open_url(self):
-        self.driver.get('https://www.rottentomatoes.com/browse/tv_series_browse/sort:popular')
-        time.sleep(2)
+        url = self.proxy.url_for(self.BROWSE_URL) if self.proxy != None else self.BROWSE_URL
+        if self.retry_policy != None:
+            self.retry_policy.call(self.BROWSE_URL, self.driver.get, url)
+        else:
+            self.driver.get(url)
+        self.readiness.wait_for_tiles(self.driver)
 
     def accept_cookies(self):
+        if self.consent != None and self.consent.is_ready():
+            return
         try:
-            self.driver.find_element(By.XPATH, '//*[@id="onetrust-accept-btn-handler"]').click()
-            time.sleep(2)
+            if self.consent != None:
+                self.consent.capture(self.driver, self.readiness)
+                return
+            button = self.readiness.wait_for_cookie_banner(self.driver)
+            if button != None:
+                button.click()
+                self.readiness.wait_for_cookie_banner_closed(self.driver)
         except:
             pass
             
     def load_pages(self):
-        WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.XPATH, '//button[contains(text(), "Load more")]')))
-        button = self.driver.find_element(By.XPATH, '//button[contains(text(), "Load more")]')
+        tile_count = len(self.driver.find_elements(By.CLASS_NAME, 'js-tile-link'))
+        button = self.readiness.wait_for_load_more(self.driver)
+        if button == None:
+            return False
+        if self.retry_policy != None:
+            self.retry_policy.limiter.wait(self.LISTING_URL)
         button.click()
-        time.sleep(2)
+        return self.readiness.wait_for_tile_growth(self.driver, tile_count) != None
 
     def get_urls(self):
+        new_urls = []
         title_cards = self.driver.find_elements(By.CLASS_NAME, 'js-tile-link')
-        for title in title_cards:
+        for title in title_cards[self.tiles_scanned:]:
             url = title.get_attribute('href')
             if url == None:
                 url = title.find_element(By.XPATH, './/a[@data-qa= "discovery-media-list-item-caption"]').get_attribute('href')
+            if self.proxy != None:
+                url = self.proxy.site_url(url)
 
             print(url)
-            self.url_list.append(url)
+            if self.keep_urls:
+                self.url_list.append(url)
+            new_urls.append(url)
+        self.tiles_scanned = len(title_cards)
+        return new_urls
 
-    def scrape(self):
+    def get_listing_url(self, cursor=None):
+        if cursor == None:
+            return self.LISTING_URL
+        return f'{self.LISTING_URL}?{urlencode({"after": cursor})}'
+
+    def parse_listing(self, response):
+        urls = []
+        if 'json' in response.headers.get('Content-Type', ''):
+            listing = response.json()
+            for show in listing.get('grid', {}).get('list', []):
+                if show.get('mediaUrl'):
+                    urls.append(urljoin(self.BROWSE_URL, show['mediaUrl']))
+            page_info = listing.get('pageInfo') or {}
+            if page_info.get('hasNextPage') == False:
+                return urls, None
+            return urls, page_info.get('endCursor')
+        soup = BeautifulSoup(response.text, 'html.parser')
+        for tile in soup.select('.js-tile-link'):
+            url = tile.get('href')
+            if url == None:
+                caption = tile.select_one('a[data-qa="discovery-media-list-item-caption"]')
+                url = caption.get('href') if caption != None else None
+            if url != None:
+                urls.append(urljoin(self.BROWSE_URL, url))
+        return urls, None
+
+    def get_page_urls(self, cursor=None):
+        try:
+            response = self.session.get(self.get_listing_url(cursor), timeout=10)
+            response.raise_for_status()
+            return self.parse_listing(response)
+        except Exception as error:
+            print(f'Listing page after cursor {cursor} could not be loaded ({error})')
+            raise
+
+    def iter_urls_http(self):
+        seen = set()
+        cursor = None
+        pages_loaded = 0
+        depth = None if self.number_of_pages_to_scrape == None else self.number_of_pages_to_scrape + 1
+        try:
+            while depth == None or pages_loaded < depth:
+                page_urls, cursor = self.get_page_urls(cursor)
+                if len(page_urls) == 0:
+                    break
+                pages_loaded += 1
+                for url in page_urls:
+                    if not self.keep_urls:
+                        yield url
+                    elif url not in seen:
+                        seen.add(url)
+                        self.url_list.append(url)
+                        yield url
+                if cursor == None:
+                    break
+        finally:
+            if self._owns_session:
+                self.session.close()
+        print(f'{pages_loaded} pages loaded')
+
+    def iter_urls_browser(self):
+        if self.consent != None and self.consent.is_ready():
+            self.consent.install(self.driver, self.proxy.address if self.proxy != None else None)
         Initialiser.open_url(self)
         Initialiser.accept_cookies(self)
+        yield from Initialiser.get_urls(self)
         n = 1
-        for number in range(self.number_of_pages_to_scrape):
-            Initialiser.load_pages(self)
+        while self.number_of_pages_to_scrape == None or n <= self.number_of_pages_to_scrape:
+            if not Initialiser.load_pages(self):
+                print('No more results to load')
+                break
             n += 1
-            time.sleep(2)
+            yield from Initialiser.get_urls(self)
         print(f'{n} pages loaded')
-        Initialiser.get_urls(self)
+
+    def iter_urls(self):
+        if self.discovery == 'http':
+            yield from Initialiser.iter_urls_http(self)
+        else:
+            yield from Initialiser.iter_urls_browser(self)
+
+    def scrape(self):
+        for url in Initialiser.iter_urls(self):
+            pass
         print(f'{len(self.url_list)} urls successfully scraped')
         return self.url_list
 
@@ -90,4 +249,5 @@ if __name__ == '__main__':
     initialise = Initialiser()
     initialise.scrape()
     #print(initialise.url_list)
-    initialise.driver.quit()
\ No newline at end of file
+    if initialise.driver != None:
+        initialise.driver.quit()
\ No newline at end of file
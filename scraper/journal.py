@@ -0,0 +1,297 @@
+from datetime import datetime
+import threading
+import sqlite3
+import json
+import os
+
+
+class CrawlJournal:
+    '''
+    This class keeps an append-only log of every url discovered in a crawl and what happened to it,
+    so a crawl that dies partway through can be resumed without re-scraping the urls it already finished.
+    Each line of the file is a JSON event, and the latest event for a url is its state
+
+    Parameters:
+    ----------
+    path: str
+        The location of the journal file
+    resume: bool
+        If True, the existing journal is read and added to, otherwise a new journal is started
+    fsync: bool
+        If True, every event is forced to disk as well as flushed, so it survives the machine going down
+    on_disk: bool
+        If True, the latest state of each url is kept in a JournalIndex next to the journal file instead of a dict,
+        so the memory of a long crawl does not grow with the number of urls
+
+
+    Attributes:
+    ----------
+    states: dict
+        The latest state of each url, keyed by url, in the order the urls were discovered, a JournalIndex when on_disk is True
+    claimed: set
+        The urls claimed by this crawl, kept in the JournalIndex instead when on_disk is True
+    discovery_complete: bool
+        True once every url of the crawl has been discovered
+
+
+    Methods:
+    -------
+    load()
+        Replays the events in the journal file to rebuild the state of each url
+    write()
+        Appends an event to the journal file and flushes it
+    discovered()
+        Records a url as pending, unless it is already in the journal
+    claim()
+        Records a url as pending unless it is already in the journal, and returns True if it is not finished and this crawl has not claimed it before
+    is_claimed()
+        Returns True if this crawl has already claimed a url
+    mark()
+        Records a new state for a url: 'done', 'omitted' or 'failed'
+    complete_discovery()
+        Records that every url of the crawl has been discovered
+    is_finished()
+        Returns True if a url has already been scraped or omitted
+    outstanding()
+        Returns the urls still pending or that failed, in the order they were discovered, optionally only those this crawl has not claimed
+    close()
+        Closes the journal file, and removes the JournalIndex
+    '''
+
+    STATES = ('pending', 'done', 'omitted', 'failed')
+
+    def __init__(self, path='../raw_data/crawl_journal.jsonl', resume=False, fsync=False, on_disk=False):
+        self.path = os.path.abspath(path)
+        self.fsync = fsync
+        self.on_disk = on_disk
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.states = JournalIndex(f'{os.path.splitext(self.path)[0]}.index.db') if on_disk else {}
+        self.claimed = set()
+        self.discovery_complete = False
+        self._lock = threading.Lock()
+        if resume:
+            self.load()
+        self._file = open(self.path, 'a' if resume else 'w')
+        if resume and self._file.tell() > 0:
+            with open(self.path, 'rb') as fp:
+                fp.seek(-1, os.SEEK_END)
+                if fp.read(1) != b'\n':
+                    self._file.write('\n')
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path) as fp:
+            for line in fp:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if event.get('event') == 'discovery_complete':
+                    self.discovery_complete = True
+                elif event.get('state') in CrawlJournal.STATES:
+                    self.states[event['url']] = event['state']
+
+    def write(self, event):
+        event['time'] = datetime.now().isoformat()
+        self._file.write(json.dumps(event) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def discovered(self, url):
+        with self._lock:
+            if url in self.states:
+                return
+            self.states[url] = 'pending'
+            self.write({'url': url, 'state': 'pending'})
+
+    def claim(self, url):
+        with self._lock:
+            if self.states.get(url) in ('done', 'omitted'):
+                return False
+            if url not in self.states:
+                self.states[url] = 'pending'
+                self.write({'url': url, 'state': 'pending'})
+            if self.on_disk:
+                return self.states.claim(url)
+            if url in self.claimed:
+                return False
+            self.claimed.add(url)
+            return True
+
+    def is_claimed(self, url):
+        if self.on_disk:
+            return self.states.is_claimed(url)
+        return url in self.claimed
+
+    def mark(self, url, state):
+        if state not in CrawlJournal.STATES:
+            raise ValueError(f'Unknown journal state: {state}')
+        with self._lock:
+            self.states[url] = state
+            self.write({'url': url, 'state': state})
+
+    def complete_discovery(self):
+        with self._lock:
+            self.discovery_complete = True
+            self.write({'event': 'discovery_complete'})
+
+    def is_finished(self, url):
+        return self.states.get(url) in ('done', 'omitted')
+
+    def outstanding(self, claimed=True):
+        if self.on_disk:
+            return self.states.outstanding(claimed)
+        with self._lock:
+            return [url for url, state in self.states.items() if state in ('pending', 'failed') and (claimed or url not in self.claimed)]
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            if self.on_disk:
+                self.states.close()
+
+
+class JournalIndex:
+    '''
+    This class keeps the latest state of each url of a CrawlJournal in a SQLite table instead of a dict,
+    so a crawl of any size can check whether a url is finished or already claimed without holding every url in memory.
+    The index is rebuilt from the journal file whenever the journal is opened, so it is never synced to disk and is removed when the journal closes.
+    It answers the same lookups as the dict it replaces, and keeps urls in the order they were discovered
+
+    Parameters:
+    ----------
+    path: str
+        The location of the database file
+
+
+    Methods:
+    -------
+    get()
+        Returns the state of a url, or a default if it is not in the index
+    claim()
+        Marks a url as claimed by this crawl, returning False if it already was
+    is_claimed()
+        Returns True if a url has been claimed by this crawl
+    select()
+        Yields each url matching a condition and its state, in the order they were discovered, reading a page of rows at a time
+    items()
+        Yields each url and its state, in the order they were discovered
+    outstanding()
+        Yields the urls still pending or that failed, optionally only those not claimed by this crawl
+    close()
+        Closes and removes the database
+    '''
+
+    PAGE_SIZE = 1000
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+        self.connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=OFF')
+        self.connection.execute('PRAGMA synchronous=OFF')
+        self.connection.execute('CREATE TABLE states (url TEXT PRIMARY KEY, state TEXT NOT NULL, claimed INTEGER NOT NULL DEFAULT 0)')
+        self._lock = threading.Lock()
+
+    def execute(self, sql, parameters=()):
+        with self._lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def get(self, url, default=None):
+        rows = JournalIndex.execute(self, 'SELECT state FROM states WHERE url = ?', (url,))
+        return rows[0][0] if len(rows) > 0 else default
+
+    def __getitem__(self, url):
+        state = JournalIndex.get(self, url)
+        if state == None:
+            raise KeyError(url)
+        return state
+
+    def __setitem__(self, url, state):
+        JournalIndex.execute(self, 'INSERT INTO states (url, state) VALUES (?, ?) ON CONFLICT(url) DO UPDATE SET state = excluded.state', (url, state))
+
+    def __contains__(self, url):
+        return JournalIndex.get(self, url) != None
+
+    def __len__(self):
+        return JournalIndex.execute(self, 'SELECT COUNT(*) FROM states')[0][0]
+
+    def claim(self, url):
+        with self._lock:
+            return self.connection.execute('UPDATE states SET claimed = 1 WHERE url = ? AND claimed = 0', (url,)).rowcount == 1
+
+    def is_claimed(self, url):
+        return len(JournalIndex.execute(self, 'SELECT 1 FROM states WHERE url = ? AND claimed = 1', (url,))) > 0
+
+    def select(self, condition):
+        last = 0
+        while True:
+            rows = JournalIndex.execute(self, f'SELECT rowid, url, state FROM states WHERE rowid > ? AND {condition} ORDER BY rowid LIMIT ?', (last, JournalIndex.PAGE_SIZE))
+            for row in rows:
+                yield row[1], row[2]
+            if len(rows) < JournalIndex.PAGE_SIZE:
+                return
+            last = rows[-1][0]
+
+    def items(self):
+        return JournalIndex.select(self, '1')
+
+    def __iter__(self):
+        return (url for url, state in JournalIndex.items(self))
+
+    def values(self):
+        return (state for url, state in JournalIndex.items(self))
+
+    def outstanding(self, claimed=True):
+        condition = "state IN ('pending', 'failed')" if claimed else "state IN ('pending', 'failed') AND claimed = 0"
+        return (url for url, state in JournalIndex.select(self, condition))
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+class QueueJournal:
+    '''
+    This class stands in for a CrawlJournal in a worker process of a multi-process crawl.
+    Instead of writing to the journal file itself, it sends each state change to the coordinator, which owns the journal
+
+    Parameters:
+    ----------
+    events: multiprocessing.Queue
+        The queue the coordinator reads the state changes from
+
+
+    Methods:
+    -------
+    discovered()
+        Does nothing, as urls are discovered by the coordinator
+    mark()
+        Sends a new state for a url to the coordinator
+    is_finished()
+        Returns False, as the coordinator only hands out unfinished urls
+    close()
+        Does nothing, as there is no file to close
+    '''
+
+    def __init__(self, events):
+        self.events = events
+
+    def discovered(self, url):
+        pass
+
+    def mark(self, url, state):
+        if state not in CrawlJournal.STATES:
+            raise ValueError(f'Unknown journal state: {state}')
+        self.events.put(('state', url, state))
+
+    def is_finished(self, url):
+        return False
+
+    def close(self):
+        pass
@@ -0,0 +1,253 @@
+from contextlib import contextmanager, nullcontext
+import threading
+import bisect
+import json
+import time
+import os
+
+
+def timed(metrics, stage):
+    '''
+    Returns a context manager that times a stage with metrics, or does nothing if metrics is None
+    '''
+    if metrics == None:
+        return nullcontext()
+    return metrics.time(stage)
+
+
+class Histogram:
+    '''
+    This class counts latencies in fixed buckets, so memory use does not grow with the length of a crawl,
+    and estimates percentiles by interpolating within the bucket they fall in
+
+    Parameters:
+    ----------
+    bounds: list
+        The upper bound in seconds of each bucket, in ascending order
+
+
+    Attributes:
+    ----------
+    counts: list
+        The number of latencies in each bucket, with one more bucket for latencies above the last bound
+    count: int
+        The number of latencies observed
+    total: float
+        The sum of the latencies observed
+    minimum: float
+        The smallest latency observed
+    maximum: float
+        The largest latency observed
+
+
+    Methods:
+    -------
+    observe()
+        Adds a latency to its bucket
+    percentile()
+        Returns an estimate of the latency below which a given share of the observations fall
+    merge()
+        Adds the counts of another histogram's state
+    state()
+        Returns the histogram as a dictionary that can be sent between processes or saved as JSON
+    '''
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.minimum = seconds if self.minimum == None else min(self.minimum, seconds)
+        self.maximum = seconds if self.maximum == None else max(self.maximum, seconds)
+
+    def percentile(self, q):
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for n, count in enumerate(self.counts):
+            if count == 0:
+                continue
+            if seen + count >= rank:
+                lower = self.bounds[n - 1] if n > 0 else 0
+                upper = self.bounds[n] if n < len(self.bounds) else self.maximum
+                lower = max(lower, self.minimum)
+                upper = min(upper, self.maximum)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.maximum
+
+    def merge(self, state):
+        for n, count in enumerate(state['counts']):
+            self.counts[n] += count
+        self.count += state['count']
+        self.total += state['total']
+        for key, pick in (('minimum', min), ('maximum', max)):
+            if state[key] != None:
+                value = getattr(self, key)
+                setattr(self, key, state[key] if value == None else pick(value, state[key]))
+
+    def state(self):
+        return {
+            'counts': list(self.counts),
+            'count': self.count,
+            'total': self.total,
+            'minimum': self.minimum,
+            'maximum': self.maximum
+        }
+
+
+class Metrics:
+    '''
+    This class records counters and a latency histogram for each stage of a crawl,
+    such as starting a webdriver, loading a page, reading each field, writing the JSON and downloading the poster img.
+    The same data is printed as the crawl summary, saved as a JSON report, and written in the Prometheus text format
+
+    Parameters:
+    ----------
+    bounds: list
+        The upper bound in seconds of each histogram bucket, geometric buckets from 1ms to 5 minutes are used if none are given
+
+
+    Attributes:
+    ----------
+    counters: dict
+        The value of each counter, keyed by name
+    stages: dict
+        The Histogram of each stage's latencies, keyed by stage
+    started: float
+        The time the Metrics were created, used for the elapsed time of the report
+
+
+    Methods:
+    -------
+    increment()
+        Adds to a counter
+    observe()
+        Records the latency of a stage
+    time()
+        Context manager that records how long its block takes as the latency of a stage, and counts the stage's errors
+    summary()
+        Returns the counters, and the count, mean, min, max, p50, p95 and p99 latency of each stage
+    state()
+        Returns the raw counters and histograms, to be merged into the Metrics of another process
+    merge()
+        Adds the raw counters and histograms of another process's Metrics
+    report()
+        Returns the summary with the elapsed time, the crawl rate and any extra information given
+    write_report()
+        Saves the report as JSON, writing to a temporary file and renaming it into place
+    prometheus()
+        Returns the counters and histograms in the Prometheus text exposition format
+    write_prometheus()
+        Saves the Prometheus text to a file, writing to a temporary file and renaming it into place
+    '''
+
+    BOUNDS = [round(0.001 * 1.25 ** n, 6) for n in range(57)]
+    PERCENTILES = (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))
+
+    def __init__(self, bounds=None):
+        self.bounds = bounds or Metrics.BOUNDS
+        self.counters = {}
+        self.stages = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            if stage not in self.stages:
+                self.stages[stage] = Histogram(self.bounds)
+            self.stages[stage].observe(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        except:
+            self.increment(f'{stage}_errors')
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def summary(self):
+        with self._lock:
+            stages = {}
+            for stage, histogram in sorted(self.stages.items()):
+                stages[stage] = {
+                    'count': histogram.count,
+                    'mean': histogram.total / histogram.count,
+                    'min': histogram.minimum,
+                    'max': histogram.maximum,
+                    'total': histogram.total
+                }
+                for name, q in Metrics.PERCENTILES:
+                    stages[stage][name] = histogram.percentile(q)
+            return {'counters': dict(self.counters), 'stages': stages}
+
+    def state(self):
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'stages': {stage: histogram.state() for stage, histogram in self.stages.items()}
+            }
+
+    def merge(self, state):
+        with self._lock:
+            for name, value in state['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for stage, histogram_state in state['stages'].items():
+                if stage not in self.stages:
+                    self.stages[stage] = Histogram(self.bounds)
+                self.stages[stage].merge(histogram_state)
+
+    def report(self, **extra):
+        report = self.summary()
+        elapsed = time.time() - self.started
+        report['elapsed_seconds'] = elapsed
+        report['pages_per_second'] = report['counters'].get('urls', 0) / elapsed if elapsed > 0 else 0
+        report.update(extra)
+        return report
+
+    def write_report(self, path, **extra):
+        path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f'{path}.tmp', 'w') as fp:
+            json.dump(obj=self.report(**extra), indent=4, fp=fp)
+        os.replace(f'{path}.tmp', path)
+
+    def prometheus(self, prefix='scraper'):
+        lines = []
+        state = self.state()
+        for name, value in sorted(state['counters'].items()):
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            lines.append(f'{prefix}_{name}_total {value}')
+        if state['stages']:
+            lines.append(f'# TYPE {prefix}_stage_seconds histogram')
+        for stage, histogram in sorted(state['stages'].items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds, histogram['counts']):
+                cumulative += count
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram["count"]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram["total"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f'{path}.tmp', 'w') as fp:
+            fp.write(self.prometheus())
+        os.replace(f'{path}.tmp', path)
@@ -0,0 +1,111 @@
+import queue
+import threading
+
+
+class StreamingPipeline:
+    '''
+    This class connects a producer, a pool of worker threads and a consumer with bounded queues,
+    so each item is processed as soon as it is produced and every result is consumed as soon as it is ready.
+    A full queue blocks the stage feeding it, which keeps memory flat however many items are produced
+
+    Parameters:
+    ----------
+    producer: callable
+        Function returning an iterable of the items to process, e.g. a generator of urls
+    worker: callable
+        Function called with each item in one of the worker threads, returning a result or None
+    consumer: callable
+        Function called with each result that is not None, in a single downstream thread
+    workers: int
+        Number of worker threads
+    queue_size: int
+        Maximum number of items, and of results, waiting in each queue
+
+
+    Attributes:
+    ----------
+    produced: int
+        Number of items the producer has yielded
+    consumed: int
+        Number of results passed to the consumer
+    errors: list
+        Exceptions raised by the workers and the consumer
+
+
+    Methods:
+    -------
+    produce()
+        Puts every item from the producer on the item queue, followed by one stop signal per worker
+    work()
+        Takes items off the item queue, calls the worker and puts its result on the result queue until a stop signal is received
+    consume()
+        Takes results off the result queue and calls the consumer until every worker has stopped
+    run()
+        Starts the producer and workers in threads, consumes the results, and waits for every stage to finish
+    '''
+
+    _STOP = object()
+
+    def __init__(self, producer, worker, consumer, workers=4, queue_size=None):
+        self.producer = producer
+        self.worker = worker
+        self.consumer = consumer
+        self.workers = workers
+        self.queue_size = queue_size or workers * 2
+        self.item_queue = queue.Queue(maxsize=self.queue_size)
+        self.result_queue = queue.Queue(maxsize=self.queue_size)
+        self.produced = 0
+        self.consumed = 0
+        self.errors = []
+        self._producer_error = None
+
+    def produce(self):
+        try:
+            for item in self.producer():
+                self.item_queue.put(item)
+                self.produced += 1
+        except Exception as error:
+            self._producer_error = error
+        finally:
+            for worker in range(self.workers):
+                self.item_queue.put(StreamingPipeline._STOP)
+
+    def work(self):
+        while True:
+            item = self.item_queue.get()
+            if item is StreamingPipeline._STOP:
+                break
+            try:
+                result = self.worker(item)
+            except Exception as error:
+                print(f'{item}: {error}')
+                self.errors.append(error)
+                continue
+            if result != None:
+                self.result_queue.put(result)
+        self.result_queue.put(StreamingPipeline._STOP)
+
+    def consume(self):
+        stopped = 0
+        while stopped < self.workers:
+            result = self.result_queue.get()
+            if result is StreamingPipeline._STOP:
+                stopped += 1
+                continue
+            try:
+                self.consumer(result)
+                self.consumed += 1
+            except Exception as error:
+                print(f'{error}')
+                self.errors.append(error)
+
+    def run(self):
+        threads = [threading.Thread(target=self.produce, daemon=True)]
+        threads += [threading.Thread(target=self.work, daemon=True) for worker in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        self.consume()
+        for thread in threads:
+            thread.join()
+        if self._producer_error != None:
+            raise self._producer_error
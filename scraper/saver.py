@@ -1,6 +1,11 @@
 import os
-import json
 import requests
+import sys
+sys.path.append('../scraper')
+from storage import FolderStorage
+from http_session import session_retry_policy
+from metrics import timed
+from corpus import CorpusIndex
 
 class Saver:
     '''
@@ -10,6 +15,20 @@ class Saver:
     ----------
     item_dict: dict
         The dictionary used to store all of the information for a particular TV show
+    downloader: ImageDownloader
+        If given, the poster img is queued on it instead of being downloaded before save() returns
+    storage: FolderStorage, ShardedStorage or SQLiteStorage
+        The backend the dictionary and poster img are saved with, a FolderStorage is used if none is given
+    image_store: ImageStore
+        If given, the poster img is saved once by content hash and linked to the storage backend's img path
+    retry_policy: RetryPolicy
+        If given, the poster img is rate limited and retried by it when it is downloaded here, unless the session already sends it through a retry policy
+    metrics: Metrics
+        If given, the time taken to write the dictionary is recorded as the 'json_write' stage, and a direct img download as 'image_download'
+    session: requests.Session
+        If given, the poster img is requested with it when it is downloaded here, so a session with an HttpCache can record or replay it
+    corpus: CorpusIndex
+        If given, the dictionary is also appended to its packed corpus, so it can be loaded without opening the TV show's folder
 
     
     Attributes:
@@ -27,28 +46,48 @@ class Saver:
     Methods:
     -------
     save_item_dict()
-        Creates the folder for the TV show if it does not already exist and saves the dictionary in the folder as a JSON file
+        Saves the dictionary with the storage backend, by default in a folder for the TV show as a JSON file, and adds it to the corpus index if there is one
     save_img()
-        Reads the content of the poster img url and saves it in the folder as a JPG file
+        Queues the poster img url on the image store or the downloader, or streams it to the storage backend's img path as a JPG file if there is neither
     save()
         Calls the other methods 
     '''
-    def __init__(self, item_dict):
+    def __init__(self, item_dict, downloader=None, storage=None, image_store=None, retry_policy=None, metrics=None, session=None, corpus=None):
         self.item_dict = item_dict
+        self.corpus = corpus
+        self.session = session
+        self.metrics = metrics
+        self.retry_policy = retry_policy
+        self.downloader = downloader
+        self.image_store = image_store
+        self.storage = storage or FolderStorage()
         self.img = self.item_dict['Img']
         self.title = self.item_dict['Title']
         self.file_path = os.path.abspath(f'../raw_data/{self.title}')
 
     def save_item_dict(self):
-        if not os.path.exists(self.file_path):
-            os.makedirs(self.file_path)
-        with open(f'{self.file_path}/data.json', 'w') as fp:
-            json.dump(obj=self.item_dict, indent=4, fp=fp)
+        with timed(self.metrics, 'json_write'):
+            self.storage.write(self.item_dict, self.file_path)
+            if self.corpus != None:
+                self.corpus.add(self.item_dict, self.file_path)
 
     def save_img(self):
-        img_data = requests.get(self.img).content
-        with open(f'{self.file_path}/{self.item_dict["Title"]}.jpg', 'wb') as handler:
-            handler.write(img_data)
+        img_path = self.storage.image_path(self.item_dict, self.file_path)
+        os.makedirs(os.path.dirname(img_path), exist_ok=True)
+        if self.image_store != None:
+            return self.image_store.submit(self.img, link_path=img_path)
+        if self.downloader != None:
+            return self.downloader.submit(self.img, img_path)
+        get = self.session.get if self.session != None else requests.get
+        with timed(self.metrics, 'image_download'):
+            if self.retry_policy != None and (self.session == None or session_retry_policy(self.session, self.img) == None):
+                response = self.retry_policy.call(self.img, get, self.img, timeout=10, stream=True)
+            else:
+                response = get(self.img, timeout=10, stream=True)
+            with response:
+                with open(img_path, 'wb') as handler:
+                    for chunk in response.iter_content(chunk_size=65536):
+                        handler.write(chunk)
 
     def save(self):
         Saver.save_item_dict(self)
@@ -58,5 +97,5 @@ class Saver:
 
 if __name__ == '__main__':
     test_item = {'Title': 'THE_LAST_OF_US', 'Tomatometer': '96%', 'Audience Score': '90%', 'Synopsis': 'Joel and Ellie must survive ruthless killers and monsters on a trek across America after an outbreak.', 'TV Network': 'HBO', 'Premiere Date': 'Jan 15, 2023', 'Genre': 'Action', 'Img': 'https://resizing.flixster.com/T-YbkLxt3WvVPB2ZLnHUT8nYb68=/206x305/v2/https://resizing.flixster.com/2TwYzc7hklVW2s4fN1ypuyYWMj0=/ems.cHJkLWVtcy1hc3NldHMvdHZzZXJpZXMvYjBiZTZiODMtODQ1OC00MDY3LTkzNTItZjZlMzQ5ZGM1MzEwLmpwZw==', 'Timestamp': '02-Mar-2023 (13:40:22.150968)', 'ID': 'cf5a5ea2-cae7-4f91-9968-677821b80ff7'}
-    save = Saver(test_item)
+    save = Saver(test_item, corpus=CorpusIndex())
     save.save()
\ No newline at end of file
@@ -1,11 +1,38 @@
-from selenium import webdriver
 import concurrent.futures
+import multiprocessing
+import copy
+import threading
+import socket
+import queue
+import psutil
 import time
 import sys
+import os
 sys.path.append('../scraper')
 from initialiser import Initialiser
 from items import Items
 from saver import Saver
+from driver_pool import DriverPool
+from driver_factory import DriverFactory
+from http_items import HttpItems
+from http_session import create_session
+from readiness import Readiness
+from pipeline import StreamingPipeline
+from image_downloader import ImageDownloader
+from recrawl import RecrawlManifest, canonical_url
+from journal import CrawlJournal, QueueJournal
+from storage import FolderStorage, ShardedStorage, SQLiteStorage
+from image_store import ImageStore
+from work_queue import WorkQueue, WorkQueueJournal
+from concurrency import ConcurrencyController
+from rate_limit import RateLimiter, RetryPolicy
+from metrics import Metrics
+from http_cache import HttpCache, CachingProxy
+from consent import ConsentJar
+from scheduler import FreshnessScheduler
+from analytics import ScoreHistory
+from corpus import CorpusIndex
+import argparse
 
 
 class Scraper:
@@ -16,76 +43,852 @@ class Scraper:
 
     Parameters:
     ----------
-    None
+    max_workers: int
+        Number of threads used to scrape the urls, and the number of webdrivers kept in the driver pool
+    engine: str
+        'selenium' renders every page in a webdriver
+        'http' fetches pages with a pooled requests session and only uses a webdriver for pages with missing fields
+    discovery: str
+        'browser' finds the show urls by clicking "Load more" in a webdriver
+        'http' requests the pages of the browse listing directly
+    readiness: Readiness
+        Waits on each page's DOM instead of sleeping for a fixed time, a Readiness with the default timeouts is used if none is given
+    streaming: bool
+        If True, show pages are scraped as soon as their urls are discovered and saved as soon as they are scraped
+    queue_size: int
+        Maximum number of urls, and of scraped items, waiting between the stages of a streaming scrape
+    recrawl: bool
+        If True, shows whose content has not changed since the last run are not written again
+    recrawl_images: bool
+        If True, the poster img of an unchanged show is still downloaded during a re-crawl
+    manifest_path: str
+        The location of the re-crawl manifest file
+    journal_path: str
+        The location of the crawl journal file
+    resume: bool
+        If True, the crawl carries on from the journal of a previous crawl, only scraping the urls it did not finish
+    storage: FolderStorage, ShardedStorage or SQLiteStorage
+        The backend every item is saved with, a FolderStorage is used if none is given
+    image_store: bool
+        If True, poster imgs are saved once by content hash with thumbnails, instead of once per show
+    processes: int
+        Number of worker processes the show pages are split between, each with its own threads, webdrivers and storage writer
+    work_queue: WorkQueue
+        A queue shared with other scraper containers, urls are enqueued into it by perform_enqueue() and leased from it by perform_scrape()
+    worker_name: str
+        The name urls are leased from the work queue under, the host name and process id are used if none is given
+    lease_size: int
+        Number of urls leased from the work queue at a time
+    concurrency: ConcurrencyController
+        Adjusts how many show pages are scraped at the same time, the thread and driver pools are sized to its maximum instead of max_workers
+    retry_policy: RetryPolicy
+        The per-host rate limiter and retry rules shared by every page load, listing load and img download, a RetryPolicy with the default rate is used if none is given
+    pages_to_scrape: int
+        Number of extra pages of the browse listing to discover urls from, None discovers every page when discovery is 'http'
+    session_factory: callable
+        Creates each pooled http session, given its pool size and retry policy, create_session() is used if none is given
+    http_cache: HttpCache
+        If given, every page, listing and img request is recorded to or replayed from it,
+        and the webdrivers load show pages and the browser discovery page through a local CachingProxy in front of it.
+        In 'replay' mode the DriverFactory's browsers are only allowed to reach the local machine, so nothing is loaded from the live site
+    driver_factory: DriverFactory
+        Creates every webdriver of the driver pool and of browser discovery, a DriverFactory with the lean profile is used if none is given
+    long_crawl: bool
+        If True, the scrape is streamed and saved items are only counted, not kept in item_dict_list, so memory use does not grow with the number of shows.
+        Discovered urls are not kept in the url_list either, and the journal keeps the state of each url on disk, where urls are checked for repeats
+    max_driver_pages: int
+        Number of show pages a pooled webdriver loads before it is replaced with a fresh browser
+    max_driver_rss_mb: float
+        The resident memory in MB of a pooled webdriver's browser processes above which it is replaced
+    consent: ConsentJar
+        If given, the consent cookies are captured once and installed in every new webdriver and http session, so no page waits on the cookies pop-up
+    scheduler: FreshnessScheduler
+        If given, every url is discovered before any is scraped, then they are scraped in order of staleness up to the scheduler's page budget,
+        and every saved item is added to the scheduler's history
+    score_history: ScoreHistory
+        If given, the typed scores of every saved item are added to it, and written as a snapshot of the run when the scrape finishes
+    corpus_index: CorpusIndex
+        If given, every saved item is also appended to its packed corpus, so the saved shows can be loaded with a CorpusLoader without opening each folder
+    report_path: str
+        The location of the JSON crawl report, the Prometheus metrics are saved next to it with a .prom extension
+        A work queue worker adds its name to both file names
 
 
     Attributes:
     ----------
+    max_workers: int
+        Number of threads used to scrape the urls
+    driver_pool: DriverPool
+        The pool of reusable webdrivers shared by the threads, created when the scrape starts
+    session: requests.Session
+        The pooled http session shared by the threads when the 'http' engine or discovery is used
+    image_downloader: ImageDownloader
+        Downloads the poster images in the background, created when the scrape starts
+    proxy: CachingProxy
+        The local proxy the webdrivers load show pages through when there is an http_cache, created when the scrape starts
+    image_store: ImageStore
+        The content-addressed poster img store, created when the scrape starts if image_store is True
+    manifest: RecrawlManifest
+        The content hash and fetch time of every show saved so far, loaded when recrawl is True
+    journal: CrawlJournal
+        The state of every url discovered in the crawl, written as each url is finished, opened when the scrape starts
+    readiness: Readiness
+        Shared by the Initialiser and every Items instance so the time spent in each wait is recorded in one place
     url_list: list
-        List of urls to each TV show page
+        List of urls to each TV show page, left empty in a long crawl unless it is split between worker processes
     item_dict_list: list
-        List of populated item dictionaries obtained from the Items class
+        List of populated item dictionaries obtained from the Items class, left empty in a long crawl
+    first_item_seconds: float
+        Seconds from the start of the scrape until the first item was saved
+    metrics: Metrics
+        The counters and per-stage latency histograms of the crawl, which the summary and the crawl report are built from
+    worker_stats: dict
+        The image, driver and failure counts of every worker process added together, after a multi-process scrape
 
 
     Methods:
     -------
     scrape_urls()
-        Instantiates the Initialiser class, calls its scrape() method
+        Calls the iter_urls() method until every url has been discovered
+    get_item_dict()
+        Gets the item dictionary for a particular url, in a place given out by the concurrency controller if there is one
+    get_item_dict_with_engine()
+        Gets the item dictionary for a particular url with the chosen engine
+        If the 'http' engine leaves any field missing, the page is scraped again with selenium
+        Records the url in the journal as omitted if no dictionary is returned, or as failed if an error is raised
     scrape_items()
-        Creates a webdriver instance and visit a particular url from the url_list
-        Instantiates the Items class and calls its get_items() method
+        Calls the get_item_dict() method for a particular url from the url_list
         If a dictionary is returned, calls the save_data() method
         If None is returned, exits the script and the incomplete data is not saved
+    get_items_with_http()
+        Instantiates the HttpItems class and calls its get_items() method
+    get_items_with_driver()
+        Checks a webdriver out of the driver pool, visits the url, waits for the score-board, and calls the get_items() method of the Items class
+        Returns the webdriver to the pool for the next url
     save_data()
-        Instantiates the Saver class and calls its save() method
+        During a re-crawl, skips the write for a show whose content has not changed and only records its fetch time
+        Otherwise instantiates the Saver class with the image downloader, storage backend and image store, and calls its save() method
+        An unchanged show's url is recorded in the journal as done straight away, a saved show's once the storage backend has it on disk
         Adds each item dictionary to the item_dict_list
     perform_scrape()
         Calls the scrape_urls() method 
+        Creates the driver pool, sized to the thread pool's max_workers, and shuts it down once every url is scraped
         Uses a thread pool executor to call the scrape_items() method multiple times in parallel, with the items in the url_list as the methods 'url' parameter
-        Prints some scraper performance information
+        Prints some scraper performance information, including how long was spent waiting on each page condition
+    scrape_url_list()
+        Scrapes and saves a given list of urls without discovering any, as each worker process of a multi-process scrape does
+    perform_enqueue()
+        Discovers the urls and adds them to the work queue, without scraping them
+    perform_queue_scrape()
+        Leases batches of urls from the work queue and scrapes them until the queue is empty, sending heartbeats so the leases do not expire
+    perform_multiprocess_scrape()
+        Discovers the urls, then splits them between worker processes that scrape them in parallel
+        Records the journal events and items sent back by the workers, and merges their statistics
+        Each worker gets its own concurrency controller with the same settings if there is one
+    handle_worker_event()
+        Records a journal event or item sent by a worker, or merges its statistics, returning True for statistics
+    stop_workers()
+        After a finished scrape, reads the events still queued until every worker has exited, otherwise terminates the workers, then joins them
+    iter_urls()
+        Instantiates the Initialiser class with the chosen discovery and yields each url as it is discovered, adding it to the url_list and the journal
+        Skips urls the journal shows were already finished or already claimed by this crawl, then yields any outstanding urls from a resumed journal that discovery did not find again
+        With a scheduler, discovery is finished first, then the urls are yielded in the scheduler's order up to its page budget
+        With an http_cache, browser discovery loads its page through the scraper's proxy, or a proxy started just for discovery
+        When resuming a crawl whose discovery had completed, only the journal's outstanding urls are yielded
+        Quits the Initialiser's webdriver once discovery has finished
+    add_url()
+        Counts a url about to be scraped and adds it to the url_list, unless a single process long crawl is streaming it
+    open_journal()
+        Opens the crawl journal, or uses the work queue as the journal if there is one, keeping the journal's url states on disk in a long crawl
+    start()
+        Opens the journal, the http session, the driver pool, the image downloader and the image store, and has the storage backend report saved items to mark_saved()
+    mark_saved()
+        Records the urls of items the storage backend has written to disk in the journal as done
+    finish()
+        Waits for the image downloads, then closes everything opened by start(), writes any items the storage backend is holding, and saves the manifest
+    perform_streaming_scrape()
+        Runs url discovery, item scraping and saving as overlapping stages of a StreamingPipeline, connected by bounded queues
+    write_report()
+        Saves the metrics as a JSON crawl report and in the Prometheus text format
+    open_session()
+        Creates a pooled http session with the session factory, recording to or replaying from the http_cache if there is one, with the consent cookies installed
+    create_driver()
+        Creates a webdriver with the driver factory and installs the consent cookies in it
+    prepare_consent()
+        Captures the consent cookies with a new webdriver if there is a ConsentJar without them and show pages are scraped with selenium
+    print_summary()
+        Prints some scraper performance information from the metrics
     '''
 
-    def __init__(self):
+    def __init__(self, max_workers=4, engine='selenium', discovery='browser', readiness=None, streaming=False, queue_size=None, recrawl=False, recrawl_images=False, manifest_path='../raw_data/recrawl_manifest.json', journal_path='../raw_data/crawl_journal.jsonl', resume=False, storage=None, image_store=False, processes=1, work_queue=None, worker_name=None, lease_size=None, concurrency=None, retry_policy=None, report_path='../raw_data/crawl_report.json', pages_to_scrape=4, session_factory=None, http_cache=None, driver_factory=None, long_crawl=False, max_driver_pages=None, max_driver_rss_mb=None, consent=None, scheduler=None, score_history=None, corpus_index=None):
+        if engine not in ('selenium', 'http'):
+            raise ValueError(f"engine must be 'selenium' or 'http', not '{engine}'")
+        self.concurrency = concurrency
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.report_path = report_path
+        self.pages_to_scrape = pages_to_scrape
+        self.session_factory = session_factory or create_session
+        self.http_cache = http_cache
+        self.driver_factory = driver_factory or DriverFactory()
+        if http_cache != None and http_cache.mode == 'replay' and hasattr(self.driver_factory, 'allowed_hosts'):
+            self.driver_factory = copy.copy(self.driver_factory)
+            self.driver_factory.allowed_hosts = ()
+        self.proxy = None
+        self.metrics = Metrics()
+        self.max_workers = concurrency.maximum if concurrency != None else max_workers
+        self.engine = engine
+        self.discovery = discovery
+        self.readiness = readiness or Readiness()
+        self.consent = consent
+        self.scheduler = scheduler
+        self.score_history = score_history
+        self.corpus_index = corpus_index
+        self.long_crawl = long_crawl
+        self.max_driver_pages = max_driver_pages
+        self.max_driver_rss_mb = max_driver_rss_mb
+        self.streaming = streaming or long_crawl
+        self.queue_size = queue_size
+        self.recrawl = recrawl
+        self.recrawl_images = recrawl_images
+        self.manifest = RecrawlManifest(manifest_path) if recrawl else None
+        self.journal_path = journal_path
+        self.resume = resume
+        self.journal = None
+        self.storage = storage or FolderStorage()
+        self.use_image_store = image_store
+        self.image_store = None
+        self.driver_pool = None
+        self.session = None
+        self.image_downloader = None
+        self.processes = processes
+        self.work_queue = work_queue
+        self.worker_name = worker_name or f'{socket.gethostname()}-{os.getpid()}'
+        self.lease_size = lease_size or self.max_workers * 2
         self.url_list = []
         self.item_dict_list = []
+        self.first_item_seconds = None
+        self.worker_stats = None
+        self._start_time = None
+        self._lock = threading.Lock()
 
     def scrape_urls(self):
-        print('Scraping urls')
-        scrape_urls = Initialiser()
-        self.url_list = scrape_urls.scrape()
+        for url in Scraper.iter_urls(self):
+            pass
+        print(f"{self.metrics.counters.get('urls', 0)} urls successfully scraped")
     
+    def get_item_dict(self, url):
+        if self.concurrency == None:
+            return self.get_item_dict_with_engine(url)
+        item_dict = self.concurrency.run(self.get_item_dict_with_engine, url)
+        if self.driver_pool != None:
+            self.driver_pool.trim(self.concurrency.limit)
+        return item_dict
+
+    def get_item_dict_with_engine(self, url):
+        item_dict = None
+        try:
+            with self.metrics.time('page'):
+                if self.engine == 'http':
+                    item_dict = self.get_items_with_http(url)
+                if item_dict == None:
+                    item_dict = self.get_items_with_driver(url)
+        except:
+            self.metrics.increment('items_failed')
+            self.journal.mark(url, 'failed')
+            raise
+        if item_dict == None:
+            self.metrics.increment('items_omitted')
+            self.journal.mark(url, 'omitted')
+        return item_dict
+
     def scrape_items(self, url):
-        firefox_options = webdriver.FirefoxOptions()
-        firefox_options.add_argument('--window-size=1920,1080')
-        firefox_options.add_argument('--headless')
-        driver = webdriver.Firefox(options=firefox_options)
-        driver.get(url)
-        time.sleep(1)
-        items = Items(driver)
-        self.item_dict = items.get_items()  
-        driver.quit()
-        time.sleep(1)
-        if self.item_dict == None:
+        item_dict = self.get_item_dict(url)
+        if item_dict == None:
             pass
         else:
-            self.save_data(self.item_dict)
+            self.save_data(item_dict)
+
+    def get_items_with_http(self, url):
+        items = HttpItems(url, self.session, metrics=self.metrics)
+        return items.get_items()
+
+    def get_items_with_driver(self, url):
+        with self.driver_pool.driver() as driver:
+            with self.metrics.time('driver_get'):
+                if self.proxy != None:
+                    driver.get(self.proxy.url_for(url))
+                else:
+                    self.retry_policy.call(url, driver.get, url)
+            self.readiness.wait_for_score_board(driver)
+            cookie_banner = self.consent == None or not self.consent.is_ready()
+            items = Items(driver, readiness=self.readiness, url=url, metrics=self.metrics, cookie_banner=cookie_banner)
+            return items.get_items()
 
     def save_data(self, item_dict):
-        save = Saver(item_dict)
-        save.save()
-        self.item_dict_list.append(item_dict)
+        save = Saver(item_dict, downloader=self.image_downloader, storage=self.storage, image_store=self.image_store, retry_policy=self.retry_policy, metrics=self.metrics, corpus=self.corpus_index)
+        try:
+            if self.manifest != None and self.manifest.is_unchanged(item_dict):
+                if self.recrawl_images:
+                    save.save_img()
+                self.metrics.increment('items_unchanged')
+                print(f'{save.title}: unchanged, not saved again')
+                self.journal.mark(item_dict['URL'], 'done')
+            else:
+                save.save()
+        except:
+            self.metrics.increment('items_failed')
+            self.journal.mark(item_dict['URL'], 'failed')
+            raise
+        self.metrics.increment('items_saved')
+        if self.manifest != None:
+            self.manifest.record(item_dict)
+        if self.scheduler != None:
+            self.scheduler.record(item_dict)
+        if self.score_history != None:
+            self.score_history.record(item_dict)
+        with self._lock:
+            if self.first_item_seconds == None and self._start_time != None:
+                self.first_item_seconds = time.perf_counter() - self._start_time
+            if not self.long_crawl:
+                self.item_dict_list.append(item_dict)
 
     def perform_scrape(self):
-        Scraper.scrape_urls(self)
-        print('Scraping show data')
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            executor.map(self.scrape_items, self.url_list)
+        if self.work_queue != None:
+            return Scraper.perform_queue_scrape(self)
+        if self.processes > 1:
+            return Scraper.perform_multiprocess_scrape(self)
+        if self.streaming:
+            return Scraper.perform_streaming_scrape(self)
+        Scraper.start(self)
+        try:
+            Scraper.scrape_urls(self)
+            print('Scraping show data')
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                executor.map(self.scrape_items, self.url_list)
+        finally:
+            Scraper.finish(self)
+        Scraper.write_report(self)
+        Scraper.print_summary(self)
+
+    def scrape_url_list(self, urls):
+        self.start()
+        try:
+            self.url_list = list(urls)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                executor.map(self.scrape_items, self.url_list)
+        finally:
+            self.finish()
+
+    def perform_enqueue(self):
+        Scraper.open_journal(self)
+        if self.discovery == 'http':
+            self.session = Scraper.open_session(self)
+        try:
+            Scraper.scrape_urls(self)
+        finally:
+            if self.session != None:
+                self.session.close()
+        print(f'{self.work_queue.remaining()} urls waiting in the work queue')
+
+    def perform_queue_scrape(self, poll_interval=5):
+        Scraper.start(self)
+        stop_heartbeat = threading.Event()
+        def send_heartbeats():
+            while not stop_heartbeat.wait(self.work_queue.visibility_timeout / 3):
+                self.work_queue.heartbeat(self.worker_name)
+        heartbeat = threading.Thread(target=send_heartbeats, daemon=True)
+        heartbeat.start()
+        print(f'Scraping show data from the work queue as {self.worker_name}')
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while True:
+                    urls = self.work_queue.lease(self.worker_name, self.lease_size)
+                    if len(urls) == 0:
+                        if self.work_queue.is_enqueue_complete() and self.work_queue.remaining() == 0:
+                            break
+                        time.sleep(poll_interval)
+                        continue
+                    if not self.long_crawl:
+                        self.url_list.extend(urls)
+                    self.metrics.increment('urls', len(urls))
+                    concurrent.futures.wait([executor.submit(self.scrape_items, url) for url in urls])
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+            Scraper.finish(self)
+        Scraper.write_report(self)
+        Scraper.print_summary(self)
+
+    def perform_multiprocess_scrape(self):
+        self._start_time = time.perf_counter()
+        Scraper.open_journal(self)
+        if self.discovery == 'http':
+            self.session = Scraper.open_session(self)
+        try:
+            Scraper.scrape_urls(self)
+        finally:
+            if self.session != None:
+                self.session.close()
+                self.session = None
+        Scraper.prepare_consent(self)
+        print(f'Scraping show data in {self.processes} processes')
+        context = multiprocessing.get_context()
+        events = context.Queue()
+        options = {
+            'max_workers': self.max_workers,
+            'engine': self.engine,
+            'recrawl': self.recrawl,
+            'recrawl_images': self.recrawl_images,
+            'manifest_path': self.manifest.path if self.manifest != None else None,
+            'image_store': self.use_image_store,
+            'driver_factory': self.driver_factory,
+            'consent_path': self.consent.path if self.consent != None else None,
+            'corpus_index': (self.corpus_index.root, self.corpus_index.name) if self.corpus_index != None else None,
+            'long_crawl': self.long_crawl,
+            'max_driver_pages': self.max_driver_pages,
+            'max_driver_rss_mb': self.max_driver_rss_mb,
+            'http_cache': (self.http_cache.root, self.http_cache.mode, self.http_cache.max_bytes // self.processes) if self.http_cache != None else None,
+            'concurrency': {
+                'minimum': self.concurrency.minimum,
+                'maximum': self.concurrency.maximum,
+                'initial': self.concurrency.limit,
+                'window': self.concurrency.window,
+                'latency_tolerance': self.concurrency.latency_tolerance,
+                'max_error_rate': self.concurrency.max_error_rate,
+                'max_omission_rate': self.concurrency.max_omission_rate,
+                'max_memory_percent': self.concurrency.max_memory_percent
+            } if self.concurrency != None else None,
+            'readiness': (self.readiness.timeout, self.readiness.poll_frequency, self.readiness.timeouts),
+            'rate_limit': (
+                self.retry_policy.limiter.rate / self.processes,
+                {host: rate / self.processes for host, rate in self.retry_policy.limiter.rates.items()},
+                self.retry_policy.retries
+            )
+        }
+        workers = []
+        for worker_id in range(self.processes):
+            urls = self.url_list[worker_id::self.processes]
+            if len(urls) == 0:
+                continue
+            worker = context.Process(target=run_scraper_worker, args=(worker_id, urls, options, self.storage.worker_spec(worker_id), events))
+            worker.start()
+            workers.append(worker)
+        self.worker_stats = {}
+        finished = 0
+        completed = False
+        try:
+            while finished < len(workers):
+                try:
+                    event = events.get(timeout=1)
+                except queue.Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        print(f'{len(workers) - finished} worker processes exited without reporting')
+                        break
+                    continue
+                if Scraper.handle_worker_event(self, event):
+                    finished += 1
+            completed = True
+        finally:
+            Scraper.stop_workers(self, workers, events, completed)
+            self.storage.close()
+            if self.manifest != None:
+                self.manifest.save()
+            if self.scheduler != None:
+                self.scheduler.save()
+            if self.score_history != None:
+                self.score_history.commit()
+            if self.http_cache != None and self.http_cache.mode == 'record':
+                self.http_cache.trim()
+            self.journal.close()
+        Scraper.write_report(self)
+        Scraper.print_summary(self)
+
+    def handle_worker_event(self, event):
+        if event[0] == 'state':
+            self.journal.mark(event[1], event[2])
+        elif event[0] == 'item':
+            item_dict = event[2]
+            if self.manifest != None:
+                self.manifest.record(item_dict)
+            if self.scheduler != None:
+                self.scheduler.record(item_dict)
+            if self.score_history != None:
+                self.score_history.record(item_dict)
+            if self.first_item_seconds == None:
+                self.first_item_seconds = time.perf_counter() - self._start_time
+            if not self.long_crawl:
+                self.item_dict_list.append(item_dict)
+        elif event[0] == 'stats':
+            stats = event[2]
+            self.readiness.merge(stats.pop('wait_times'), stats.pop('timed_out'))
+            self.retry_policy.retried += stats.pop('retried', 0)
+            self.retry_policy.gave_up += stats.pop('gave_up', 0)
+            self.metrics.merge(stats.pop('metrics'))
+            decisions = stats.pop('concurrency_decisions', [])
+            if self.concurrency != None:
+                self.concurrency.decisions.extend(decisions)
+            for key, value in stats.items():
+                self.worker_stats[key] = self.worker_stats.get(key, 0) + value
+            return True
+        return False
+
+    def stop_workers(self, workers, events, completed):
+        if not completed:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+        while completed and any(worker.is_alive() for worker in workers):
+            try:
+                Scraper.handle_worker_event(self, events.get(timeout=0.1))
+            except queue.Empty:
+                pass
+        for worker in workers:
+            worker.join()
+
+    def iter_urls(self):
+        if self.resume and self.journal.discovery_complete:
+            print('Resuming from the crawl journal')
+            for url in self.journal.outstanding():
+                Scraper.add_url(self, url)
+                yield url
+            return
+        print('Scraping urls')
+        proxy = self.proxy
+        if proxy == None and self.http_cache != None and self.discovery == 'browser':
+            proxy = CachingProxy(Scraper.open_session(self)).start()
+        scrape_urls = None
+        candidates = {}
+        try:
+            scrape_urls = Initialiser(number_of_pages_to_scrape=self.pages_to_scrape, readiness=self.readiness, discovery=self.discovery, session=self.session, max_workers=self.max_workers, retry_policy=self.retry_policy, driver_factory=self.driver_factory, consent=self.consent, proxy=proxy, keep_urls=not self.long_crawl)
+            for url in scrape_urls.iter_urls():
+                url = canonical_url(url)
+                if self.scheduler != None:
+                    if not self.journal.is_finished(url) and not self.journal.is_claimed(url):
+                        candidates[url] = None
+                    continue
+                if self.journal.claim(url):
+                    Scraper.add_url(self, url)
+                    yield url
+        finally:
+            if scrape_urls != None and scrape_urls.driver != None:
+                scrape_urls.driver.quit()
+            if proxy != None and proxy is not self.proxy:
+                proxy.stop()
+                proxy.session.close()
+        if self.scheduler != None:
+            for url in self.scheduler.order(list(candidates)):
+                if self.journal.claim(url):
+                    Scraper.add_url(self, url)
+                    yield url
+        self.journal.complete_discovery()
+        for url in self.journal.outstanding(claimed=False):
+            if url not in candidates and self.journal.claim(url):
+                Scraper.add_url(self, url)
+                yield url
+
+    def add_url(self, url):
+        self.metrics.increment('urls')
+        if not self.long_crawl or self.processes > 1:
+            self.url_list.append(url)
+
+    def perform_streaming_scrape(self):
+        Scraper.start(self)
+        print('Scraping urls and show data')
+        pipeline = StreamingPipeline(self.iter_urls, self.get_item_dict, self.save_data, workers=self.max_workers, queue_size=self.queue_size)
+        try:
+            pipeline.run()
+        finally:
+            Scraper.finish(self)
+        Scraper.write_report(self)
+        Scraper.print_summary(self)
+
+    def open_journal(self):
+        if self.work_queue != None:
+            self.journal = WorkQueueJournal(self.work_queue, self.worker_name)
+        else:
+            self.journal = CrawlJournal(self.journal_path, resume=self.resume, on_disk=self.long_crawl)
+
+    def start(self):
+        self._start_time = time.perf_counter()
+        self.open_journal()
+        self.storage.on_saved = self.mark_saved
+        self.prepare_consent()
+        if 'http' in (self.engine, self.discovery):
+            self.session = Scraper.open_session(self)
+        self.driver_pool = DriverPool(size=self.max_workers, driver_factory=self.create_driver, metrics=self.metrics, max_pages=self.max_driver_pages, max_rss_mb=self.max_driver_rss_mb)
+        self.image_downloader = ImageDownloader(max_workers=self.max_workers, session=Scraper.open_session(self), metrics=self.metrics)
+        if self.use_image_store:
+            self.image_store = ImageStore(downloader=self.image_downloader)
+        if self.http_cache != None:
+            self.proxy = CachingProxy(Scraper.open_session(self)).start()
+
+    def mark_saved(self, item_dicts):
+        for item_dict in item_dicts:
+            self.journal.mark(item_dict['URL'], 'done')
+
+    def open_session(self):
+        if self.http_cache == None:
+            session = self.session_factory(pool_size=self.max_workers, retry_policy=self.retry_policy)
+        else:
+            session = self.session_factory(pool_size=self.max_workers, retry_policy=self.retry_policy, http_cache=self.http_cache)
+        if self.consent != None and self.consent.is_ready():
+            self.consent.install_session(session)
+        return session
+
+    def create_driver(self):
+        driver = self.driver_factory()
+        if self.consent != None and self.consent.is_ready():
+            try:
+                self.consent.install(driver, self.proxy.address if self.proxy != None else None)
+            except:
+                driver.quit()
+                raise
+        return driver
+
+    def prepare_consent(self):
+        if self.consent == None or self.consent.is_ready() or self.engine != 'selenium':
+            return
+        if self.http_cache != None and self.http_cache.mode == 'replay':
+            return
+        driver = self.driver_factory()
+        try:
+            driver.get(Initialiser.BROWSE_URL)
+            self.consent.capture(driver, self.readiness)
+        except Exception as error:
+            print(f'Consent cookies could not be captured: {error}')
+        finally:
+            driver.quit()
 
-        print(f'{len(self.url_list)} urls scraped')
-        print(f'{len(self.item_dict_list)} items saved')
-        print(f'{len(self.url_list) - len(self.item_dict_list)} results omitted')
-        print(f'{int((len(self.item_dict_list) / len(self.url_list)) * 100)}% scrape success rate')
+    def finish(self):
+        self.driver_pool.shutdown()
+        if self.proxy != None:
+            self.proxy.stop()
+            self.proxy.session.close()
+        self.image_downloader.shutdown()
+        self.image_downloader.session.close()
+        if self.image_store != None:
+            self.image_store.close()
+        self.storage.close()
+        if self.manifest != None:
+            self.manifest.save()
+        if self.scheduler != None:
+            self.scheduler.save()
+        if self.score_history != None:
+            self.score_history.commit(self.worker_name if self.work_queue != None else None)
+        if self.session != None:
+            self.session.close()
+        self.journal.close()
+
+    def write_report(self):
+        report = {
+            'engine': self.engine,
+            'discovery': self.discovery,
+            'max_workers': self.max_workers,
+            'processes': self.processes,
+            'first_item_seconds': self.first_item_seconds,
+            'rss_mb': psutil.Process().memory_info().rss / 1024 ** 2,
+            'waits': self.readiness.summary()
+        }
+        path, extension = os.path.splitext(self.report_path)
+        if self.work_queue != None:
+            path = f'{path}-{self.worker_name}'
+        self.metrics.write_report(f'{path}{extension}', **report)
+        self.metrics.write_prometheus(f'{path}.prom')
+
+    def print_summary(self):
+        summary = self.metrics.summary()
+        urls = summary['counters'].get('urls', 0)
+        saved = summary['counters'].get('items_saved', 0)
+        if urls == 0:
+            print('No urls scraped')
+            return
+        print(f'{urls} urls scraped')
+        print(f'{saved} items saved')
+        print(f'{urls - saved} results omitted')
+        print(f'{int((saved / urls) * 100)}% scrape success rate')
+        if self.manifest != None:
+            print(f'{self.manifest.unchanged} items unchanged since the last run, {self.manifest.changed} new or changed')
+        if self.image_downloader != None:
+            print(f'{self.image_downloader.downloaded} images downloaded, {self.image_downloader.failed} failed')
+        if self.image_store != None:
+            print(f'{self.image_store.stored} new images stored, {self.image_store.deduplicated} duplicates skipped')
+        if self.worker_stats:
+            print(f"{self.worker_stats.get('downloaded', 0)} images downloaded, {self.worker_stats.get('failed', 0)} failed")
+            if self.use_image_store:
+                print(f"{self.worker_stats.get('stored', 0)} new images stored, {self.worker_stats.get('deduplicated', 0)} duplicates skipped")
+            print(f"{self.worker_stats.get('drivers_launched', 0)} browsers launched in {self.processes} processes, {self.worker_stats.get('drivers_recycled', 0)} recycled")
+            if self.worker_stats.get('errors', 0):
+                print(f"{self.worker_stats['errors']} worker processes stopped with an error")
+        if self.concurrency != None and len(self.concurrency.decisions) > 0:
+            if self.worker_stats:
+                print(f"Concurrency ended at {self.worker_stats.get('concurrency_limit', 0)} pages across {self.processes} processes after {len(self.concurrency.decisions)} adjustments")
+            else:
+                print(f'Concurrency ended at {self.concurrency.limit} after {len(self.concurrency.decisions)} adjustments')
+        if self.retry_policy.retried > 0:
+            print(f'{self.retry_policy.retried} requests retried, {self.retry_policy.gave_up} given up, {self.retry_policy.limiter.waited:.1f}s held back by the rate limit')
+        if self.http_cache != None:
+            print(f'{self.http_cache.hits} responses read from the HTTP cache, {self.http_cache.misses} missed, {self.http_cache.evicted} evicted')
+        if self.first_item_seconds != None:
+            print(f'First item saved after {self.first_item_seconds:.1f}s')
+        for stage, stats in summary['stages'].items():
+            print(f"{stage}: {stats['count']} calls, {stats['p50']:.2f}s p50, {stats['p95']:.2f}s p95, {stats['p99']:.2f}s p99")
+        self.readiness.print_summary()
+
+
+class WorkerScraper(Scraper):
+    '''
+    This class is the Scraper run in each worker process of a multi-process scrape.
+    It scrapes its slice of the urls with its own threads, webdrivers and storage writer,
+    and sends every journal event and saved item back to the coordinating Scraper through a queue
+
+    Parameters:
+    ----------
+    worker_id: int
+        The number of the worker process
+    events: multiprocessing.Queue
+        The queue the coordinator reads the journal events, items and statistics from
+    readiness: tuple
+        The timeout, poll frequency and named timeouts of the coordinator's Readiness
+    manifest_path: str
+        The location of the re-crawl manifest, read but never written by the worker
+    rate_limit: tuple
+        The worker's share of the coordinator's per-host request rates, and the number of retries
+    http_cache: tuple
+        The root, mode and the worker's equal share of the size limit of the coordinator's HttpCache, opened again in the worker as a shared cache
+    consent_path: str
+        The location of the coordinator's consent cookies, loaded again in the worker
+    concurrency: dict
+        The settings of the coordinator's ConcurrencyController, used to create the worker's own
+    corpus_index: tuple
+        The root and name of the coordinator's CorpusIndex, which the worker appends to under the same lock
+
+
+    Methods:
+    -------
+    open_journal()
+        Uses a QueueJournal, so the journal file is only written by the coordinator
+    save_data()
+        Saves an item dictionary as the Scraper does, then sends it to the coordinator
+    get_stats()
+        Returns the worker's image, driver and wait statistics
+    '''
+
+    def __init__(self, worker_id, events, readiness, manifest_path=None, rate_limit=None, http_cache=None, consent_path=None, corpus_index=None, concurrency=None, **options):
+        timeout, poll_frequency, timeouts = readiness
+        if manifest_path != None:
+            options['manifest_path'] = manifest_path
+        if rate_limit != None:
+            rate, rates, retries = rate_limit
+            options['retry_policy'] = RetryPolicy(RateLimiter(rate, rates=rates), retries=retries)
+        if http_cache != None:
+            root, mode, max_bytes = http_cache
+            options['http_cache'] = HttpCache(root, mode=mode, max_bytes=max_bytes, shared=True)
+        if consent_path != None:
+            options['consent'] = ConsentJar(consent_path)
+        if concurrency != None:
+            options['concurrency'] = ConcurrencyController(**concurrency)
+        if corpus_index != None:
+            root, name = corpus_index
+            options['corpus_index'] = CorpusIndex(root, name)
+        Scraper.__init__(self, readiness=Readiness(timeout, poll_frequency, timeouts), **options)
+        self.worker_id = worker_id
+        self.events = events
+        if self.manifest != None:
+            self.manifest.read_only = True
+
+    def open_journal(self):
+        self.journal = QueueJournal(self.events)
+
+    def save_data(self, item_dict):
+        Scraper.save_data(self, item_dict)
+        self.events.put(('item', self.worker_id, item_dict))
+
+    def get_stats(self):
+        stats = {
+            'downloaded': self.image_downloader.downloaded if self.image_downloader != None else 0,
+            'failed': self.image_downloader.failed if self.image_downloader != None else 0,
+            'stored': self.image_store.stored if self.image_store != None else 0,
+            'deduplicated': self.image_store.deduplicated if self.image_store != None else 0,
+            'drivers_launched': self.driver_pool.drivers_launched if self.driver_pool != None else 0,
+            'drivers_recycled': self.driver_pool.drivers_recycled if self.driver_pool != None else 0,
+            'processes_killed': self.driver_pool.processes_killed if self.driver_pool != None else 0,
+            'retried': self.retry_policy.retried,
+            'gave_up': self.retry_policy.gave_up,
+            'concurrency_limit': self.concurrency.limit if self.concurrency != None else 0,
+            'concurrency_decisions': self.concurrency.decisions if self.concurrency != None else [],
+            'metrics': self.metrics.state()
+        }
+        stats['wait_times'], stats['timed_out'] = self.readiness.state()
+        return stats
+
+
+def run_scraper_worker(worker_id, urls, options, storage_spec, events):
+    '''
+    The target of each worker process of a multi-process scrape.
+    Creates the worker's own storage backend and WorkerScraper, scrapes its slice of the urls,
+    and always finishes by sending its statistics to the coordinator
+    '''
+    storage_class, storage_options = storage_spec
+    scraper = None
+    errors = 0
+    try:
+        scraper = WorkerScraper(worker_id, events, storage=storage_class(**storage_options), **options)
+        scraper.scrape_url_list(urls)
+    except Exception as error:
+        print(f'Worker {worker_id} stopped: {error}')
+        errors = 1
+    stats = scraper.get_stats() if scraper != None else {'wait_times': {}, 'timed_out': {}, 'metrics': {'counters': {}, 'stages': {}}}
+    stats['errors'] = errors
+    events.put(('stats', worker_id, stats))
 
 if __name__ == '__main__':
-    scrape = Scraper()
-    scrape.perform_scrape()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Scrapes TV show data from the rotten tomatoes website')
+    parser.add_argument('--max-workers', type=int, default=4, help='number of threads scraping show pages')
+    parser.add_argument('--adaptive', action='store_true', help='adjust the number of pages scraped at the same time between --min-workers and --max-workers')
+    parser.add_argument('--min-workers', type=int, default=1, help='fewest pages scraped at the same time with --adaptive')
+    parser.add_argument('--rate', type=float, default=5, help='requests per second allowed to each host')
+    parser.add_argument('--pages', type=int, default=4, help='extra pages of the browse listing to discover urls from')
+    parser.add_argument('--engine', choices=['selenium', 'http'], default='selenium', help='how show pages are scraped')
+    parser.add_argument('--discovery', choices=['browser', 'http'], default='browser', help='how show urls are discovered')
+    parser.add_argument('--streaming', action='store_true', help='scrape show pages while their urls are still being discovered')
+    parser.add_argument('--recrawl', action='store_true', help='skip writing shows that have not changed since the last run')
+    parser.add_argument('--resume', action='store_true', help='carry on from the crawl journal, only scraping unfinished urls')
+    parser.add_argument('--image-store', action='store_true', help='save each poster once by content hash, with thumbnails')
+    parser.add_argument('--processes', type=int, default=1, help='number of worker processes the show pages are split between')
+    parser.add_argument('--work-queue', help='SQLite file of a work queue shared with other scraper containers')
+    parser.add_argument('--role', choices=['enqueue', 'worker'], default='worker', help='with --work-queue, whether to discover and enqueue the urls or to lease and scrape them')
+    parser.add_argument('--http-cache', choices=['record', 'replay', 'passthrough'], help='record responses to the HTTP cache, replay them from it without the network, or pass every request through')
+    parser.add_argument('--http-cache-dir', default='../raw_data/http_cache', help='folder of the HTTP cache')
+    parser.add_argument('--http-cache-size', type=int, default=1024, help='size limit of the HTTP cache in MB, least recently used responses are evicted above it; with --processes, each worker evicts the responses it stores above an equal share of it, so the cache stays within twice the limit during the run, and is trimmed back to it when the workers finish')
+    parser.add_argument('--full-browser', action='store_true', help='load every image, stylesheet, font and third-party script instead of using the lean browser profile')
+    parser.add_argument('--long-crawl', action='store_true', help='stream the scrape and only count saved shows, so memory stays flat however many shows are crawled')
+    parser.add_argument('--recycle-pages', type=int, help='replace each browser after it has loaded this many show pages')
+    parser.add_argument('--recycle-rss-mb', type=float, help='replace a browser once its processes use more than this many MB of memory')
+    parser.add_argument('--consent-cookies', default='../raw_data/consent_cookies.json', help='file the cookies pop-up consent is captured to once and installed from in every browser')
+    parser.add_argument('--no-consent-cookies', action='store_true', help='accept the cookies pop-up on every page instead')
+    parser.add_argument('--schedule', action='store_true', help='scrape the discovered shows in order of how likely their saved scores are out of date')
+    parser.add_argument('--budget', type=int, help='with --schedule, the most show pages scraped in the run')
+    parser.add_argument('--score-history', action='store_true', help='add the typed scores of the run to the Parquet score history used for ranking and top movers')
+    parser.add_argument('--no-corpus-index', action='store_true', help='with folder storage, do not append the saved shows to the packed corpus index in ../raw_data')
+    parser.add_argument('--storage', choices=['folder', 'jsonl', 'parquet', 'sqlite'], default='folder', help='save a folder per show, batches of shows in shard files, or a SQLite database')
+    args = parser.parse_args()
+    if args.storage == 'folder':
+        storage = FolderStorage()
+    elif args.storage == 'sqlite':
+        storage = SQLiteStorage()
+    else:
+        storage = ShardedStorage(format=args.storage)
+    work_queue = WorkQueue(args.work_queue) if args.work_queue != None else None
+    retry_policy = RetryPolicy(RateLimiter(rate=args.rate))
+    concurrency = ConcurrencyController(minimum=args.min_workers, maximum=args.max_workers) if args.adaptive else None
+    driver_factory = DriverFactory(lean=not args.full_browser)
+    score_history = ScoreHistory() if args.score_history else None
+    corpus_index = CorpusIndex() if args.storage == 'folder' and not args.no_corpus_index else None
+    scheduler = FreshnessScheduler(budget=args.budget) if args.schedule else None
+    consent = ConsentJar(args.consent_cookies) if not args.no_consent_cookies else None
+    http_cache = HttpCache(args.http_cache_dir, mode=args.http_cache, max_bytes=args.http_cache_size * 1024 ** 2) if args.http_cache != None else None
+    scrape = Scraper(max_workers=args.max_workers, engine=args.engine, discovery=args.discovery, streaming=args.streaming, recrawl=args.recrawl, resume=args.resume, storage=storage, image_store=args.image_store, processes=args.processes, work_queue=work_queue, concurrency=concurrency, retry_policy=retry_policy, pages_to_scrape=args.pages, http_cache=http_cache, driver_factory=driver_factory, long_crawl=args.long_crawl, max_driver_pages=args.recycle_pages, max_driver_rss_mb=args.recycle_rss_mb, consent=consent, scheduler=scheduler, score_history=score_history, corpus_index=corpus_index)
+    if work_queue != None and args.role == 'enqueue':
+        scrape.perform_enqueue()
+    else:
+        scrape.perform_scrape()
\ No newline at end of file
@@ -0,0 +1,400 @@
+import threading
+import sqlite3
+import queue
+import json
+import gzip
+import os
+import sys
+sys.path.append('../scraper')
+from fields import parse_score, parse_premiere_date, parse_timestamp
+
+
+class FolderStorage:
+    '''
+    This class is the default storage backend for the Saver class.
+    It creates a folder for each TV show and saves the dictionary inside as a JSON file, with the poster img next to it
+
+    Parameters:
+    ----------
+    None
+
+
+    Attributes:
+    ----------
+    on_saved: callable
+        If set, called with a list of the dictionaries that have just been written to disk, so a Scraper can journal their urls as done
+
+
+    Methods:
+    -------
+    write()
+        Creates the folder for the TV show if it does not already exist, saves the dictionary in the folder as a JSON file and passes it to on_saved
+    image_path()
+        Returns the path of the poster img inside the TV show's folder
+    close()
+        Does nothing, as every dictionary is written straight away
+    worker_spec()
+        Returns the class and options a worker process uses to create its own FolderStorage
+    '''
+
+    def __init__(self):
+        self.on_saved = None
+
+    def write(self, item_dict, file_path):
+        if not os.path.exists(file_path):
+            os.makedirs(file_path)
+        with open(f'{file_path}/data.json', 'w') as fp:
+            json.dump(obj=item_dict, indent=4, fp=fp)
+        if self.on_saved != None:
+            self.on_saved([item_dict])
+
+    def image_path(self, item_dict, file_path):
+        return f'{file_path}/{item_dict["Title"]}.jpg'
+
+    def close(self):
+        pass
+
+    def worker_spec(self, worker_id):
+        return FolderStorage, {}
+
+
+class ShardedStorage:
+    '''
+    This class is a storage backend for the Saver class that writes the dictionaries in batches to a few large shard files,
+    instead of creating a folder and a small file for every TV show.
+    Shards are JSON Lines files, gzip compressed by default, that rotate once they reach a maximum size,
+    or Parquet files of one batch each. A small index records each shard and the shard holding each ID
+
+    Parameters:
+    ----------
+    root: str
+        The folder the shards, index and poster imgs are saved in
+    format: str
+        'jsonl' or 'parquet'
+    compress: bool
+        If True, JSON Lines shards are gzip compressed
+    batch_size: int
+        Number of dictionaries buffered in memory before they are written to a shard
+    max_shard_bytes: int
+        Size at which a JSON Lines shard is closed and a new one started
+
+
+    Attributes:
+    ----------
+    index: dict
+        The file name, record count and size of each shard, and the shard holding each ID
+    on_saved: callable
+        If set, called with each batch of dictionaries once it has been written to a shard and the index saved,
+        so a Scraper only journals a url as done when its dictionary is no longer just in the buffer
+
+
+    Methods:
+    -------
+    write()
+        Adds a dictionary to the buffer, and writes the buffer out once it holds batch_size dictionaries
+    image_path()
+        Returns the path of the poster img in the shared images folder, named by ID
+    flush()
+        Writes the buffered dictionaries to the current shard, saves the index and passes the batch to on_saved
+    new_shard()
+        Adds a new, empty shard to the index and returns it
+    write_jsonl()
+        Appends a batch to the current JSON Lines shard, starting a new shard if it has reached the maximum size
+    write_parquet()
+        Writes a batch to a new Parquet shard
+    save_index()
+        Writes the index to a temporary file and renames it into place
+    read()
+        Yields every dictionary stored in the shards, in the order they were written
+    close()
+        Writes any buffered dictionaries
+    worker_spec()
+        Returns the class and options a worker process uses to create its own ShardedStorage, in a sub folder so no two processes share a shard or index
+    '''
+
+    def __init__(self, root='../raw_data/shards', format='jsonl', compress=True, batch_size=500, max_shard_bytes=64 * 1024 * 1024):
+        if format not in ('jsonl', 'parquet'):
+            raise ValueError(f"format must be 'jsonl' or 'parquet', not '{format}'")
+        self.root = os.path.abspath(root)
+        self.format = format
+        self.compress = compress
+        self.batch_size = batch_size
+        self.max_shard_bytes = max_shard_bytes
+        self.index_path = os.path.join(self.root, 'index.json')
+        self.index = {'shards': [], 'records': {}}
+        self.buffer = []
+        self.on_saved = None
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(self.root, 'images'), exist_ok=True)
+        if os.path.isfile(self.index_path):
+            with open(self.index_path) as fp:
+                self.index = json.load(fp)
+
+    def write(self, item_dict, file_path=None):
+        with self._lock:
+            self.buffer.append(item_dict)
+            if len(self.buffer) >= self.batch_size:
+                self._flush()
+
+    def image_path(self, item_dict, file_path=None):
+        return os.path.join(self.root, 'images', f'{item_dict["ID"]}.jpg')
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if len(self.buffer) == 0:
+            return
+        if self.format == 'parquet':
+            shard = self.write_parquet(self.buffer)
+        else:
+            shard = self.write_jsonl(self.buffer)
+        for item_dict in self.buffer:
+            self.index['records'][item_dict['ID']] = shard['file']
+        batch = self.buffer
+        self.buffer = []
+        self.save_index()
+        if self.on_saved != None:
+            self.on_saved(batch)
+
+    def new_shard(self, extension):
+        shard = {'file': f'shard-{len(self.index["shards"]):05d}.{extension}', 'records': 0, 'bytes': 0}
+        self.index['shards'].append(shard)
+        return shard
+
+    def write_jsonl(self, batch):
+        extension = 'jsonl.gz' if self.compress else 'jsonl'
+        shards = [shard for shard in self.index['shards'] if shard['file'].endswith(extension)]
+        if len(shards) == 0 or shards[-1]['bytes'] >= self.max_shard_bytes:
+            shard = self.new_shard(extension)
+        else:
+            shard = shards[-1]
+        path = os.path.join(self.root, shard['file'])
+        lines = ''.join(json.dumps(item_dict) + '\n' for item_dict in batch).encode()
+        if self.compress:
+            with gzip.open(path, 'ab') as fp:
+                fp.write(lines)
+        else:
+            with open(path, 'ab') as fp:
+                fp.write(lines)
+        shard['records'] += len(batch)
+        shard['bytes'] = os.path.getsize(path)
+        return shard
+
+    def write_parquet(self, batch):
+        import pandas as pd
+        shard = self.new_shard('parquet')
+        path = os.path.join(self.root, shard['file'])
+        pd.DataFrame(batch).to_parquet(path, index=False)
+        shard['records'] = len(batch)
+        shard['bytes'] = os.path.getsize(path)
+        return shard
+
+    def save_index(self):
+        with open(f'{self.index_path}.tmp', 'w') as fp:
+            json.dump(obj=self.index, fp=fp)
+        os.replace(f'{self.index_path}.tmp', self.index_path)
+
+    def read(self):
+        for shard in self.index['shards']:
+            path = os.path.join(self.root, shard['file'])
+            if shard['file'].endswith('.parquet'):
+                import pandas as pd
+                yield from pd.read_parquet(path).to_dict('records')
+                continue
+            opener = gzip.open if shard['file'].endswith('.gz') else open
+            with opener(path, 'rt') as fp:
+                for line in fp:
+                    yield json.loads(line)
+
+    def close(self):
+        self.flush()
+
+    def worker_spec(self, worker_id):
+        return ShardedStorage, {
+            'root': os.path.join(self.root, f'worker-{worker_id:02d}'),
+            'format': self.format,
+            'compress': self.compress,
+            'batch_size': self.batch_size,
+            'max_shard_bytes': self.max_shard_bytes
+        }
+
+
+class SQLiteStorage:
+    '''
+    This class is a storage backend for the Saver class that keeps every TV show in one SQLite table with typed columns.
+    Rows are upserted on the canonical url, so shows with the same title no longer overwrite each other.
+    A single writer thread commits the dictionaries in batches, in WAL mode so queries can run while a crawl is writing.
+    The constructor returns once the writer has opened its connection, so a worker process forked right after is not
+    copied from the middle of a connect, which would leave its own connect waiting forever on a lock nothing will release
+
+    Parameters:
+    ----------
+    path: str
+        The location of the database file, poster imgs are saved in an images folder next to it
+    batch_size: int
+        Maximum number of dictionaries committed in one transaction
+
+
+    Attributes:
+    ----------
+    written: int
+        Number of dictionaries committed so far
+    on_saved: callable
+        If set, called from the writer thread with each batch of dictionaries once its transaction has committed,
+        so a Scraper only journals a url as done when its row is in the database
+
+
+    Methods:
+    -------
+    connect()
+        Opens a connection to the database in WAL mode
+    create_table()
+        Creates the shows table and its indexes if they do not already exist
+    to_row()
+        Converts a dictionary to a row of typed values, with numeric scores and ISO formatted dates
+    write()
+        Queues a dictionary for the writer thread
+    image_path()
+        Returns the path of the poster img in the images folder, named by ID
+    run_writer()
+        Takes dictionaries off the queue and upserts them, committing up to batch_size in each transaction, then passes each committed batch to on_saved
+    top_ranked()
+        Returns the shows with the highest combined tomatometer and audience score, optionally for one genre or TV network
+    close()
+        Waits for the writer thread to commit every queued dictionary
+    worker_spec()
+        Returns the class and options a worker process uses to open the same database with its own writer thread
+    '''
+
+    COLUMNS = ('url', 'id', 'title', 'tomatometer', 'audience_score', 'synopsis', 'tv_network', 'premiere_date', 'genre', 'img', 'scraped_at')
+    _STOP = object()
+
+    def __init__(self, path='../raw_data/shows.db', batch_size=200):
+        self.path = os.path.abspath(path)
+        self.batch_size = batch_size
+        self.written = 0
+        self.on_saved = None
+        self.queue = queue.Queue()
+        os.makedirs(os.path.join(os.path.dirname(self.path), 'images'), exist_ok=True)
+        connection = self.connect()
+        self.create_table(connection)
+        connection.close()
+        self.connected = threading.Event()
+        self.writer = threading.Thread(target=self.run_writer, daemon=True)
+        self.writer.start()
+        self.connected.wait()
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def create_table(self, connection):
+        connection.executescript('''
+            CREATE TABLE IF NOT EXISTS shows (
+                url TEXT PRIMARY KEY,
+                id TEXT,
+                title TEXT,
+                tomatometer REAL,
+                audience_score REAL,
+                synopsis TEXT,
+                tv_network TEXT,
+                premiere_date TEXT,
+                genre TEXT,
+                img TEXT,
+                scraped_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS shows_tomatometer ON shows (tomatometer);
+            CREATE INDEX IF NOT EXISTS shows_audience_score ON shows (audience_score);
+            CREATE INDEX IF NOT EXISTS shows_combined_score ON shows ((tomatometer + audience_score));
+            CREATE INDEX IF NOT EXISTS shows_genre ON shows (genre);
+            CREATE INDEX IF NOT EXISTS shows_tv_network ON shows (tv_network);
+            CREATE INDEX IF NOT EXISTS shows_premiere_date ON shows (premiere_date);
+        ''')
+
+    def to_row(self, item_dict):
+        premiere_date = parse_premiere_date(item_dict.get('Premiere Date'))
+        scraped_at = parse_timestamp(item_dict.get('Timestamp'))
+        return (
+            item_dict.get('URL') or item_dict['ID'],
+            item_dict['ID'],
+            item_dict['Title'],
+            parse_score(item_dict.get('Tomatometer')),
+            parse_score(item_dict.get('Audience Score')),
+            item_dict.get('Synopsis'),
+            item_dict.get('TV Network'),
+            premiere_date.date().isoformat() if premiere_date != None else None,
+            item_dict.get('Genre'),
+            item_dict.get('Img'),
+            scraped_at.isoformat() if scraped_at != None else None
+        )
+
+    def write(self, item_dict, file_path=None):
+        self.queue.put(item_dict)
+
+    def image_path(self, item_dict, file_path=None):
+        return os.path.join(os.path.dirname(self.path), 'images', f'{item_dict["ID"]}.jpg')
+
+    def run_writer(self):
+        columns = ', '.join(SQLiteStorage.COLUMNS)
+        placeholders = ', '.join('?' for column in SQLiteStorage.COLUMNS)
+        updates = ', '.join(f'{column} = excluded.{column}' for column in SQLiteStorage.COLUMNS[1:])
+        upsert = f'INSERT INTO shows ({columns}) VALUES ({placeholders}) ON CONFLICT(url) DO UPDATE SET {updates}'
+        connection = self.connect()
+        self.connected.set()
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if SQLiteStorage._STOP in batch:
+                stopping = True
+                batch = [item_dict for item_dict in batch if item_dict is not SQLiteStorage._STOP]
+            if len(batch) == 0:
+                continue
+            try:
+                with connection:
+                    connection.executemany(upsert, [self.to_row(item_dict) for item_dict in batch])
+                self.written += len(batch)
+            except Exception as error:
+                print(f'{len(batch)} items could not be written to {self.path} ({error})')
+                continue
+            if self.on_saved != None:
+                try:
+                    self.on_saved(batch)
+                except Exception as error:
+                    print(f'{len(batch)} saved items could not be reported ({error})')
+        connection.close()
+
+    def top_ranked(self, limit=10, genre=None, tv_network=None):
+        conditions = ['tomatometer IS NOT NULL', 'audience_score IS NOT NULL']
+        parameters = []
+        if genre != None:
+            conditions.append('genre = ?')
+            parameters.append(genre)
+        if tv_network != None:
+            conditions.append('tv_network = ?')
+            parameters.append(tv_network)
+        connection = self.connect()
+        connection.row_factory = sqlite3.Row
+        rows = connection.execute(
+            f'''SELECT * FROM shows WHERE {' AND '.join(conditions)}
+            ORDER BY tomatometer + audience_score DESC LIMIT ?''',
+            parameters + [limit]
+        ).fetchall()
+        connection.close()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        if self.writer.is_alive():
+            self.queue.put(SQLiteStorage._STOP)
+            self.writer.join()
+
+    def worker_spec(self, worker_id):
+        return SQLiteStorage, {'path': self.path, 'batch_size': self.batch_size}
@@ -0,0 +1,25 @@
+FIELDS = ('Title', 'Tomatometer', 'Audience Score', 'Synopsis', 'TV Network', 'Premiere Date', 'Genre', 'Img', 'Timestamp', 'ID', 'URL')
+
+
+def item_dict(n=0, **fields):
+    '''
+    Returns a complete item dictionary for synthetic show n, as the Items class makes them.
+    Any field can be replaced by a keyword named after it in lower case with underscores, such as audience_score='85%'
+    '''
+    item_dict = {
+        'Title': f'SHOW_{n}',
+        'Tomatometer': '90%',
+        'Audience Score': '80%',
+        'Synopsis': 'A show.',
+        'TV Network': 'HBO',
+        'Premiere Date': 'Jan 15, 2023',
+        'Genre': 'Drama',
+        'Img': 'https://resizing.flixster.com/poster.jpg',
+        'Timestamp': '06-Mar-2023 (15:34:08.470630)',
+        'ID': f'id-{n}',
+        'URL': f'https://www.rottentomatoes.com/tv/show_{n}'
+    }
+    names = {field.lower().replace(' ', '_'): field for field in FIELDS}
+    for name, value in fields.items():
+        item_dict[names[name]] = value
+    return item_dict
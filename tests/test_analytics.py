@@ -0,0 +1,112 @@
+import unittest
+from unittest.mock import patch
+import importlib.util
+import tempfile
+import json
+import os
+import sys
+sys.path.append('../')
+from scraper.analytics import ScoreHistory
+from scraper.scraper import Scraper
+from scraper.storage import SQLiteStorage
+from helpers import item_dict
+
+
+class ScoreHistoryTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = f'{self.temp_dir.name}/score_history'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def scored(self, n, tomatometer, audience_score, day):
+        return item_dict(
+            n,
+            tomatometer=tomatometer,
+            audience_score=audience_score,
+            tv_network='HBO' if n % 2 == 0 else 'Netflix',
+            genre='Drama' if n % 2 == 0 else 'Comedy',
+            timestamp=f'{day:02d}-Mar-2023 (15:34:08.470630)'
+        )
+
+    def record_runs(self, history):
+        for n, (tomatometer, audience_score) in enumerate((('96%', '90%'), ('80%', '85%'), ('N/A', '70%'))):
+            history.record(self.scored(n, tomatometer, audience_score, 6))
+        first = history.commit()
+        for n, (tomatometer, audience_score) in enumerate((('90%', '91%'), ('88%', '86%'))):
+            history.record(self.scored(n, tomatometer, audience_score, 13))
+        second = history.commit()
+        return first, second
+
+    def test_rank_and_movers(self):
+        first, second = self.record_runs(ScoreHistory(self.root, format='pickle'))
+        history = ScoreHistory(self.root, format='pickle')
+        self.assertEqual(history.runs(), [first, second])
+        self.assertEqual(history.cache, {})
+        self.assertEqual(str(history.history()['tomatometer'].dtype), 'float32')
+        self.assertEqual(len(history.history()), 5)
+        self.assertEqual(len(history.cache), 2)
+        latest = history.latest()
+        self.assertEqual(sorted(latest['title']), ['SHOW_0', 'SHOW_1', 'SHOW_2'])
+        ranked = history.rank()
+        self.assertEqual(list(ranked['title']), ['SHOW_0', 'SHOW_1'])
+        self.assertEqual(list(ranked['rank']), [1, 2])
+        self.assertEqual(list(ranked['combined']), [90.5, 87.0])
+        self.assertEqual(list(history.rank(genre='Comedy')['title']), ['SHOW_1'])
+        movers = history.top_movers(limit=1)
+        self.assertEqual(list(movers['title']), ['SHOW_1'])
+        self.assertEqual(list(movers['tomatometer_delta']), [8.0])
+        self.assertEqual(list(movers['combined_delta']), [4.5])
+        deltas = history.deltas(first, second).set_index('title')
+        self.assertEqual(deltas.loc['SHOW_0', 'audience_score_delta'], 1.0)
+        self.assertEqual(history.commit(), None)
+
+    def test_batches(self):
+        history = ScoreHistory(self.root, format='pickle', batch_size=2)
+        for n in range(2):
+            history.record(self.scored(n, '90%', '80%', 6))
+        self.assertEqual(history.rows['url'], [])
+        self.assertEqual(len(history.parts), 1)
+        self.assertEqual(history.runs(), [])
+        history.record(self.scored(2, '90%', '80%', 6))
+        first = history.commit()
+        self.assertEqual(sorted(os.listdir(self.root)), [f'{first}.part00000.pkl', f'{first}.part00001.pkl'])
+        for n in range(2):
+            history.record(self.scored(n, '95%', '85%', 13))
+        second = history.commit()
+        self.assertEqual(os.path.exists(f'{self.root}/{second}.pkl'), True)
+        history = ScoreHistory(self.root, format='pickle')
+        self.assertEqual(history.runs(), [first, second])
+        self.assertEqual(len(history.snapshot(first)), 3)
+        self.assertEqual(set(history.snapshot(first)['run']), {first})
+        self.assertEqual(list(history.deltas(first, second)['tomatometer_delta']), [5.0, 5.0])
+
+    def test_import_folder(self):
+        for n in range(3):
+            os.makedirs(f'{self.temp_dir.name}/SHOW_{n}')
+            with open(f'{self.temp_dir.name}/SHOW_{n}/data.json', 'w') as fp:
+                json.dump(self.scored(n, '75%', '60%', 1), fp)
+        history = ScoreHistory(self.root, format='pickle')
+        run = history.import_folder(self.temp_dir.name)
+        self.assertTrue(run.endswith('-folder'))
+        self.assertEqual(len(history.snapshot(run)), 3)
+        with self.assertRaises(ValueError):
+            ScoreHistory(self.root, format='csv')
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_parquet(self):
+        self.record_runs(ScoreHistory(self.root))
+        self.assertEqual(len(ScoreHistory(self.root).history()), 5)
+
+    def test_scraper_commits_run(self):
+        urls = [f'https://www.rottentomatoes.com/tv/show_{n}' for n in range(3)]
+        history = ScoreHistory(self.root, format='pickle')
+        storage = SQLiteStorage(f'{self.temp_dir.name}/shows.db')
+        with patch.object(Scraper, 'get_items_with_driver', side_effect=lambda url: self.scored(int(url[-1]), '90%', '80%', 6)), \
+                patch('scraper.scraper.Saver.save_img', return_value=None):
+            scrape = Scraper(score_history=history, storage=storage, journal_path=f'{self.temp_dir.name}/crawl_journal.jsonl', report_path=f'{self.temp_dir.name}/crawl_report.json')
+            scrape.scrape_url_list(urls)
+        self.assertEqual(len(history.runs()), 1)
+        self.assertEqual(sorted(history.latest()['url']), urls)
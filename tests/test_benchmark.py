@@ -0,0 +1,49 @@
+import unittest
+import subprocess
+import tempfile
+import shutil
+import json
+import sys
+import os
+
+
+class BenchmarkTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dirs = tempfile.TemporaryDirectory()
+        self.scraper_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+    def tearDown(self):
+        self.temp_dirs.cleanup()
+
+    def test_benchmark(self):
+        output = f'{self.temp_dirs.name}/benchmark.json'
+        subprocess.run(
+            [sys.executable, 'benchmark.py', '--shows', '95', '--max-workers', '4', '--items-sample', '10', '--engines', 'http', '--output', output],
+            cwd=self.scraper_dir, check=True, capture_output=True, timeout=120
+        )
+        with open(output) as fp:
+            results = json.load(fp)
+        self.assertEqual(results['discovery']['urls'], 95)
+        self.assertEqual(results['items']['count'], 10)
+        self.assertEqual(results['scrape']['counters']['urls'], 95)
+        self.assertEqual(results['scrape']['counters']['items_saved'], 95)
+        self.assertIn('p99', results['scrape']['stages']['page'])
+        self.assertGreater(results['scrape']['pages_per_second'], 0)
+        self.assertGreater(results['peak_rss_mb'], 0)
+
+    @unittest.skipUnless(shutil.which('firefox') and shutil.which('geckodriver'), 'Firefox and geckodriver are not installed')
+    def test_selenium_benchmark(self):
+        output = f'{self.temp_dirs.name}/benchmark.json'
+        subprocess.run(
+            [sys.executable, 'benchmark.py', '--shows', '95', '--max-workers', '2', '--items-sample', '5', '--engines', 'selenium', '--selenium-pages', '1', '--output', output],
+            cwd=self.scraper_dir, check=True, capture_output=True, timeout=600
+        )
+        with open(output) as fp:
+            results = json.load(fp)
+        self.assertNotIn('discovery', results)
+        self.assertEqual(results['selenium']['discovery']['urls'], 60)
+        self.assertEqual(results['selenium']['items']['count'], 5)
+        self.assertEqual(results['selenium']['scrape']['counters']['urls'], 60)
+        self.assertEqual(results['selenium']['scrape']['counters']['items_saved'], 60)
+        self.assertGreater(results['selenium']['scrape']['pages_per_second'], 0)
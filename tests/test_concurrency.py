@@ -0,0 +1,56 @@
+import unittest
+from unittest.mock import patch
+import concurrent.futures
+import threading
+import time
+import sys
+sys.path.append('../')
+from scraper.concurrency import ConcurrencyController
+
+
+class ConcurrencyControllerTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = ConcurrencyController(minimum=2, maximum=6, initial=4, window=4)
+
+    def test_decisions(self):
+        with patch.object(ConcurrencyController, 'memory_percent', return_value=50):
+            for n in range(8):
+                self.controller.record(0.1, 'ok')
+            self.assertEqual(self.controller.limit, 6)
+            for n in range(4):
+                self.controller.record(0.1, 'ok')
+            self.assertEqual(self.controller.limit, 6)
+            for n in range(4):
+                self.controller.record(0.1, 'error')
+            self.assertEqual(self.controller.limit, 3)
+            for n in range(4):
+                self.controller.record(0.5, 'ok')
+            self.assertEqual(self.controller.limit, 2)
+        with patch.object(ConcurrencyController, 'memory_percent', return_value=95):
+            for n in range(4):
+                self.controller.record(0.1, 'ok')
+        self.assertEqual(self.controller.limit, 2)
+        self.assertEqual([decision['reason'] for decision in self.controller.decisions], ['healthy', 'healthy', 'healthy', 'errors', 'latency', 'memory'])
+
+    def test_run_stays_within_limit(self):
+        self.controller.limit = 3
+        self.controller.window = 1000
+        lock = threading.Lock()
+        running = []
+        peak = []
+        def scrape(url):
+            with lock:
+                running.append(url)
+                peak.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.remove(url)
+            return None if url % 5 == 0 else {'URL': url}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(lambda url: self.controller.run(scrape, url), range(30)))
+        self.assertLessEqual(max(peak), 3)
+        self.assertEqual(results.count(None), 6)
+        self.assertEqual([outcome for latency, outcome in self.controller._results].count('omitted'), 6)
+        with self.assertRaises(ValueError):
+            ConcurrencyController(minimum=4, maximum=2)
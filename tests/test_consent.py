@@ -0,0 +1,116 @@
+import unittest
+import tempfile
+import json
+import time
+import sys
+sys.path.append('../')
+from scraper.consent import ConsentJar
+from scraper.scraper import Scraper
+from scraper.http_session import create_session
+
+
+class FakeButton:
+
+    def __init__(self, closes=True):
+        self.clicked = False
+        self.closes = closes
+
+    def click(self):
+        self.clicked = True
+
+
+class FakeReadiness:
+
+    def __init__(self, button=None):
+        self.button = button
+
+    def wait_for_cookie_banner(self, driver):
+        return self.button
+
+    def wait_for_cookie_banner_closed(self, driver):
+        return True if self.button != None and self.button.closes else None
+
+
+class FakeDriver:
+
+    def __init__(self):
+        self.visited = []
+        self.cookies = []
+        self.quit_called = False
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def get_cookies(self):
+        return [
+            {'name': 'OptanonAlertBoxClosed', 'value': '2023-03-06T15:34:08.470Z', 'path': '/', 'domain': '.rottentomatoes.com', 'expiry': 1709739248, 'secure': True, 'httpOnly': False},
+            {'name': 'OptanonConsent', 'value': 'isGpcEnabled=0&groups=C0001:1', 'path': '/', 'domain': '.rottentomatoes.com', 'secure': True},
+            {'name': 'session_id', 'value': 'abc', 'path': '/', 'domain': 'www.rottentomatoes.com'}
+        ]
+
+    def add_cookie(self, cookie):
+        self.cookies.append(cookie)
+
+    def quit(self):
+        self.quit_called = True
+
+
+class ConsentJarTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = f'{self.temp_dir.name}/consent_cookies.json'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_capture_and_install(self):
+        jar = ConsentJar(self.path)
+        self.assertFalse(jar.is_ready())
+        button = FakeButton()
+        jar.capture(FakeDriver(), FakeReadiness(button))
+        self.assertTrue(button.clicked)
+        self.assertEqual([cookie['name'] for cookie in jar.cookies], ['OptanonAlertBoxClosed', 'OptanonConsent'])
+        self.assertNotIn('domain', jar.cookies[0])
+        jar = ConsentJar(self.path)
+        self.assertTrue(jar.is_ready())
+        driver = FakeDriver()
+        jar.install(driver)
+        self.assertEqual(driver.visited, ['https://www.rottentomatoes.com/robots.txt'])
+        self.assertTrue(driver.cookies[0]['secure'])
+        driver = FakeDriver()
+        jar.install(driver, 'http://127.0.0.1:8000')
+        self.assertEqual(driver.visited, ['http://127.0.0.1:8000/robots.txt'])
+        self.assertFalse(any(cookie['secure'] for cookie in driver.cookies))
+        session = create_session()
+        jar.install_session(session)
+        self.assertEqual(session.cookies.get('OptanonConsent', domain='www.rottentomatoes.com'), 'isGpcEnabled=0&groups=C0001:1')
+
+    def test_no_banner_and_expiry(self):
+        jar = ConsentJar(self.path)
+        self.assertFalse(jar.capture(FakeDriver(), FakeReadiness(None)))
+        self.assertFalse(jar.is_ready())
+        button = FakeButton(closes=False)
+        self.assertFalse(jar.capture(FakeDriver(), FakeReadiness(button)))
+        self.assertTrue(button.clicked)
+        self.assertFalse(jar.is_ready())
+        self.assertFalse(ConsentJar(self.path).is_ready())
+        with open(self.path, 'w') as fp:
+            json.dump({'captured': time.time() - 3600, 'cookies': []}, fp)
+        self.assertFalse(ConsentJar(self.path, max_age=60).is_ready())
+        self.assertTrue(ConsentJar(self.path, max_age=7200).is_ready())
+
+    def test_scraper_installs_consent(self):
+        jar = ConsentJar(self.path)
+        jar.capture(FakeDriver(), FakeReadiness(FakeButton()))
+        scrape = Scraper(consent=jar, driver_factory=FakeDriver, journal_path=f'{self.temp_dir.name}/crawl_journal.jsonl', report_path=f'{self.temp_dir.name}/crawl_report.json')
+        scrape.prepare_consent()
+        driver = scrape.create_driver()
+        self.assertEqual(len(driver.cookies), 2)
+        session = scrape.open_session()
+        self.assertEqual(len(session.cookies), 2)
+        session.close()
+        scrape = Scraper(consent=ConsentJar(f'{self.temp_dir.name}/other.json'), driver_factory=FakeDriver, readiness=FakeReadiness(), journal_path=f'{self.temp_dir.name}/crawl_journal.jsonl', report_path=f'{self.temp_dir.name}/crawl_report.json')
+        scrape.prepare_consent()
+        self.assertFalse(scrape.consent.is_ready())
+        self.assertEqual(len(scrape.create_driver().cookies), 0)
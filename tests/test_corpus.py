@@ -0,0 +1,66 @@
+import unittest
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+import tempfile
+import sys
+sys.path.append('../')
+from scraper.corpus import CorpusIndex, CorpusLoader
+from scraper.saver import Saver
+from helpers import item_dict
+
+
+class CorpusIndexTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = f'{self.temp_dir.name}/raw_data'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_add_and_load(self):
+        index = CorpusIndex(self.root)
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(lambda n: index.add(item_dict(n), f'{self.root}/SHOW_{n}'), range(50)))
+        index.add(item_dict(3, tomatometer='80%'), f'{self.root}/SHOW_3')
+        loader = CorpusLoader(self.root)
+        self.assertEqual(len(loader), 50)
+        self.assertEqual(loader.get('https://www.rottentomatoes.com/tv/show_3')['Tomatometer'], '80%')
+        self.assertEqual(loader.by_id('id-7'), item_dict(7))
+        self.assertEqual(loader.by_title('SHOW_8')['ID'], 'id-8')
+        self.assertEqual(loader.get('missing'), None)
+        self.assertEqual(loader.entries['https://www.rottentomatoes.com/tv/show_3']['folder'], 'SHOW_3')
+        self.assertEqual(sorted(show['ID'] for show in loader), sorted(f'id-{n}' for n in range(50)))
+        self.assertEqual(loader.verify(), [])
+        loader.close()
+        self.assertEqual(index.compact(), 50)
+        loader = CorpusLoader(self.root)
+        self.assertEqual(loader.entries['https://www.rottentomatoes.com/tv/show_0']['offset'], 0)
+        self.assertEqual(loader.by_id('id-3')['Tomatometer'], '80%')
+        self.assertEqual(loader.verify(), [])
+        loader.close()
+
+    def test_partial_write_is_skipped(self):
+        index = CorpusIndex(self.root)
+        index.add(item_dict(0))
+        index.add(item_dict(1))
+        with open(index.pack_path, 'r+b') as fp:
+            fp.truncate(fp.seek(0, 2) - 10)
+        with open(index.manifest_path, 'a') as fp:
+            fp.write('{"key": "https://www.rott')
+        loader = CorpusLoader(self.root)
+        self.assertEqual(list(loader.entries), ['https://www.rottentomatoes.com/tv/show_0'])
+        loader.close()
+        self.assertEqual(len(CorpusLoader(f'{self.temp_dir.name}/empty')), 0)
+
+    def test_saver_and_import_folder(self):
+        index = CorpusIndex(self.root)
+        with patch('scraper.saver.Saver.save_img', return_value=None):
+            for n in range(3):
+                save = Saver(item_dict(n), corpus=index)
+                save.file_path = f'{self.root}/SHOW_{n}'
+                save.save()
+        self.assertEqual(CorpusLoader(self.root).by_title('SHOW_2'), item_dict(2))
+        other = CorpusIndex(self.root, name='rebuilt')
+        self.assertEqual(other.import_folder(), 3)
+        self.assertEqual(len(CorpusLoader(self.root, name='rebuilt')), 3)
@@ -0,0 +1,38 @@
+import unittest
+from urllib.parse import unquote
+import sys
+sys.path.append('../')
+from scraper.driver_factory import DriverFactory
+
+
+class DriverFactoryTestcase(unittest.TestCase):
+
+    def test_lean_profile(self):
+        options = DriverFactory().options()
+        self.assertIn('--headless', options.arguments)
+        self.assertIn('--window-size=1920,1080', options.arguments)
+        self.assertEqual(options.page_load_strategy, 'eager')
+        self.assertEqual(options.preferences['permissions.default.image'], 2)
+        self.assertEqual(options.preferences['permissions.default.stylesheet'], 2)
+        self.assertFalse(options.preferences['gfx.downloadable_fonts.enabled'])
+        self.assertEqual(options.preferences['network.proxy.type'], 2)
+        pac = unquote(options.preferences['network.proxy.autoconfig_url'].split(',', 1)[1])
+        self.assertEqual(pac, DriverFactory().proxy_autoconfig())
+        self.assertIn('"doubleclick.net"', pac)
+        self.assertIn('var allowed = null;', pac)
+
+    def test_allowed_hosts(self):
+        factory = DriverFactory(blocked_hosts=(), allowed_hosts=('rottentomatoes.com',), block_stylesheets=False)
+        options = factory.options()
+        self.assertNotIn('permissions.default.stylesheet', options.preferences)
+        pac = factory.proxy_autoconfig()
+        self.assertIn('var blocked = [];', pac)
+        self.assertIn('var allowed = ["rottentomatoes.com"];', pac)
+        self.assertIn(DriverFactory.BLACKHOLE, pac)
+
+    def test_full_profile(self):
+        options = DriverFactory(lean=False, headless=False, window_size=(800, 600)).options()
+        self.assertEqual(options.arguments, ['--window-size=800,600'])
+        self.assertEqual(options.page_load_strategy, 'normal')
+        self.assertNotIn('permissions.default.image', options.preferences)
+        self.assertNotIn('network.proxy.type', options.preferences)
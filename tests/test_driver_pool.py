@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import patch
+import concurrent.futures
+import subprocess
+import time
+import sys
+sys.path.append('../')
+from scraper.driver_pool import DriverPool
+
+
+class FakeDriver:
+
+    def __init__(self):
+        self.healthy = True
+        self.quit_called = False
+
+    @property
+    def current_url(self):
+        if not self.healthy:
+            raise Exception('browser has crashed')
+        return 'about:blank'
+
+    def quit(self):
+        self.quit_called = True
+
+
+class HungDriver(FakeDriver):
+
+    def __init__(self):
+        FakeDriver.__init__(self)
+        self.service = type('Service', (), {})()
+        self.service.process = subprocess.Popen(['sleep', '60'])
+
+    def quit(self):
+        time.sleep(5)
+
+
+class DriverPoolTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.drivers = []
+        def factory():
+            driver = FakeDriver()
+            self.drivers.append(driver)
+            return driver
+        self.pool = DriverPool(size=2, driver_factory=factory)
+
+    def test_drivers_are_reused(self):
+        def checkout(n):
+            with self.pool.driver() as driver:
+                return driver
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(checkout, range(50)))
+        self.assertLessEqual(self.pool.drivers_launched, 2)
+        self.pool.shutdown()
+        self.assertTrue(all(driver.quit_called for driver in self.drivers))
+
+    def test_unhealthy_driver_is_replaced(self):
+        with self.pool.driver() as driver:
+            driver.healthy = False
+        self.assertTrue(driver.quit_called)
+        with self.pool.driver() as replacement:
+            self.assertIsNot(replacement, driver)
+        self.pool.shutdown()
+
+    def test_trim(self):
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        self.pool.release(first)
+        self.pool.trim(1)
+        self.assertTrue(first.quit_called)
+        self.assertFalse(second.quit_called)
+        self.pool.release(second)
+        self.pool.shutdown()
+
+    def test_recycle(self):
+        pool = DriverPool(size=1, driver_factory=FakeDriver, max_pages=3)
+        drivers = []
+        for n in range(7):
+            with pool.driver() as driver:
+                drivers.append(driver)
+        self.assertEqual(len(set(map(id, drivers[:3]))), 1)
+        self.assertIsNot(drivers[3], drivers[2])
+        self.assertTrue(drivers[0].quit_called)
+        self.assertEqual(pool.drivers_recycled, 2)
+        self.assertEqual(pool.drivers_launched, 3)
+        pool.shutdown()
+        pool = DriverPool(size=1, driver_factory=FakeDriver, max_rss_mb=500)
+        with patch.object(DriverPool, 'rss_mb', side_effect=[100, 600, 100]):
+            with pool.driver() as first:
+                pass
+            with pool.driver() as second:
+                pass
+            with pool.driver() as third:
+                pass
+        self.assertIs(first, second)
+        self.assertIsNot(second, third)
+        self.assertEqual(pool.drivers_recycled, 1)
+        pool.shutdown()
+
+    def test_hung_driver_is_killed(self):
+        pool = DriverPool(size=2, driver_factory=HungDriver, quit_timeout=0.1)
+        hung = pool.acquire()
+        leaked = pool.acquire()
+        hung.healthy = False
+        pool.release(hung)
+        self.assertEqual(hung.service.process.wait(timeout=5), -9)
+        pool.shutdown()
+        self.assertEqual(leaked.service.process.wait(timeout=5), -9)
+        self.assertEqual(pool.processes_killed, 2)
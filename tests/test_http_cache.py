@@ -0,0 +1,182 @@
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import threading
+import tempfile
+import requests
+import sys
+sys.path.append('../')
+from scraper.http_cache import HttpCache, CachingProxy
+from scraper.http_session import create_session
+from scraper.saver import Saver
+from scraper.storage import ShardedStorage
+from scraper.scraper import Scraper
+from scraper.driver_factory import DriverFactory
+
+
+class OriginHandler(BaseHTTPRequestHandler):
+    requests = []
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        OriginHandler.requests.append(self.path)
+        body = f'<html>{self.path}</html>'.encode() if self.path != '/missing' else b'Not found'
+        self.send_response(200 if self.path != '/missing' else 404)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeTile:
+
+    def __init__(self, href):
+        self.href = href
+
+    def get_attribute(self, name):
+        return self.href
+
+
+class FakeDiscoveryDriver:
+    instances = []
+
+    def __init__(self):
+        self.visited = []
+        self.tiles = []
+        FakeDiscoveryDriver.instances.append(self)
+
+    def get(self, url):
+        self.visited.append(url)
+        origin = url[:url.index('/', len('http://'))]
+        self.tiles = [FakeTile(f'{origin}/tv/show_{n}') for n in range(3)]
+
+    def find_elements(self, by, value):
+        return self.tiles
+
+    def quit(self):
+        pass
+
+
+class FakeReadiness:
+
+    def wait_for_tiles(self, driver):
+        return True
+
+    def wait_for_cookie_banner(self, driver):
+        return None
+
+    def wait_for_load_more(self, driver):
+        return None
+
+
+class HttpCacheTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = f'{self.temp_dir.name}/http_cache'
+        OriginHandler.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), OriginHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.origin = f'http://127.0.0.1:{self.server.server_port}'
+
+    def test_lru_eviction(self):
+        cache = HttpCache(self.root, max_bytes=1000)
+        for n in range(3):
+            cache.put(f'https://example.com/{n}', 200, {}, b'x' * 200)
+        self.assertEqual(cache.get('https://example.com/0')[2], b'x' * 200)
+        cache.put('https://example.com/3', 200, {}, b'x' * 200)
+        self.assertLessEqual(cache.size, 1000)
+        self.assertEqual(cache.get('https://example.com/1'), None)
+        self.assertNotEqual(cache.get('https://example.com/0'), None)
+        self.assertEqual(cache.evicted, 1)
+        reopened = HttpCache(self.root, max_bytes=1000)
+        self.assertEqual(sorted(reopened.entries), sorted(cache.entries))
+        self.assertEqual(reopened.size, cache.size)
+        self.assertEqual(reopened.get('https://example.com/3'), (200, {}, b'x' * 200))
+        with self.assertRaises(ValueError):
+            HttpCache(self.root, mode='offline')
+
+    def test_shared_workers(self):
+        cache = HttpCache(self.root, max_bytes=1000)
+        for n in range(3):
+            cache.put(f'https://example.com/{n}', 200, {}, b'x' * 200)
+        workers = [HttpCache(self.root, max_bytes=500, shared=True) for n in range(2)]
+        for n in range(3, 5):
+            workers[0].put(f'https://example.com/{n}', 200, {}, b'x' * 200)
+        workers[1].put('https://example.com/5', 200, {}, b'x' * 200)
+        self.assertEqual(workers[0].evicted, 1)
+        self.assertEqual(workers[0].get('https://example.com/3'), None)
+        for n in (0, 1, 2, 4):
+            self.assertEqual(workers[1].get(f'https://example.com/{n}'), (200, {}, b'x' * 200))
+        self.assertGreater(HttpCache(self.root, max_bytes=1000).size, 1000)
+        cache.trim()
+        self.assertLessEqual(cache.size, 1000)
+        self.assertEqual(sorted(cache.entries), sorted(HttpCache(self.root, max_bytes=1000).entries))
+        self.assertNotEqual(cache.get('https://example.com/5'), None)
+
+    def test_record_and_replay(self):
+        session = create_session(http_cache=HttpCache(self.root))
+        self.assertEqual(session.get(f'{self.origin}/tv/show').text, '<html>/tv/show</html>')
+        self.assertEqual(session.get(f'{self.origin}/missing').status_code, 404)
+        session.close()
+        replay = HttpCache(self.root, mode='replay')
+        session = create_session(http_cache=replay)
+        response = session.get(f'{self.origin}/tv/show', stream=True)
+        self.assertEqual(b''.join(response.iter_content(chunk_size=4)), b'<html>/tv/show</html>')
+        self.assertEqual(response.headers['Content-Type'], 'text/html; charset=utf-8')
+        with self.assertRaises(requests.ConnectionError):
+            session.get(f'{self.origin}/missing')
+        session.close()
+        self.assertEqual(OriginHandler.requests, ['/tv/show', '/missing'])
+        self.assertEqual(replay.hits, 1)
+        session = create_session(http_cache=HttpCache(self.root, mode='passthrough'))
+        session.get(f'{self.origin}/tv/show')
+        session.close()
+        self.assertEqual(len(OriginHandler.requests), 3)
+
+    def test_saver_replays_img(self):
+        item = {'Title': 'CACHED_SHOW', 'Img': f'{self.origin}/poster.jpg', 'ID': 'cached'}
+        session = create_session(http_cache=HttpCache(self.root))
+        storage = ShardedStorage(f'{self.temp_dir.name}/record')
+        Saver(item, storage=storage, session=session).save_img()
+        session = create_session(http_cache=HttpCache(self.root, mode='replay'))
+        storage = ShardedStorage(f'{self.temp_dir.name}/replay')
+        Saver(item, storage=storage, session=session).save_img()
+        with open(storage.image_path(item), 'rb') as fp:
+            self.assertEqual(fp.read(), b'<html>/poster.jpg</html>')
+        self.assertEqual(OriginHandler.requests, ['/poster.jpg'])
+
+    def test_caching_proxy(self):
+        proxy = CachingProxy(create_session(http_cache=HttpCache(self.root)), origin=self.origin).start()
+        try:
+            url = proxy.url_for(f'{self.origin}/tv/show?season=1')
+            self.assertTrue(url.startswith(proxy.address))
+            self.assertEqual(proxy.url_for('https://elsewhere.com/a'), 'https://elsewhere.com/a')
+            self.assertEqual(proxy.site_url(url), f'{self.origin}/tv/show?season=1')
+            for n in range(2):
+                self.assertEqual(requests.get(url).text, '<html>/tv/show?season=1</html>')
+        finally:
+            proxy.stop()
+        self.assertEqual(OriginHandler.requests, ['/tv/show?season=1'])
+
+    def test_replay_stays_local(self):
+        factory = DriverFactory(lean=False)
+        scrape = Scraper(http_cache=HttpCache(self.root, mode='replay'), driver_factory=factory, journal_path=f'{self.temp_dir.name}/crawl_journal.jsonl', report_path=f'{self.temp_dir.name}/crawl_report.json')
+        self.assertEqual(factory.allowed_hosts, None)
+        self.assertEqual(scrape.driver_factory.allowed_hosts, ())
+        self.assertEqual(scrape.driver_factory.options().preferences['network.proxy.type'], 2)
+        FakeDiscoveryDriver.instances = []
+        scrape = Scraper(http_cache=HttpCache(self.root, mode='replay'), driver_factory=FakeDiscoveryDriver, readiness=FakeReadiness(), pages_to_scrape=0, journal_path=f'{self.temp_dir.name}/crawl_journal.jsonl', report_path=f'{self.temp_dir.name}/crawl_report.json')
+        scrape.open_journal()
+        urls = list(scrape.iter_urls())
+        scrape.journal.close()
+        self.assertEqual(urls, [f'https://www.rottentomatoes.com/tv/show_{n}' for n in range(3)])
+        self.assertTrue(FakeDiscoveryDriver.instances[0].visited[0].startswith('http://127.0.0.1:'))
+        self.assertTrue(FakeDiscoveryDriver.instances[0].visited[0].endswith('/browse/tv_series_browse/sort:popular'))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.temp_dir.cleanup()
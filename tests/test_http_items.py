@@ -0,0 +1,58 @@
+import unittest
+import sys
+sys.path.append('../')
+from scraper.http_items import HttpItems
+
+
+SHOW_PAGE = '''
+<html><body>
+<score-board data-qa="score-panel" tomatometerscore="96" audiencescore="90"></score-board>
+<h1 class="title">The Last of Us</h1>
+<p data-qa="series-info-description">
+    Joel and Ellie must survive ruthless killers and monsters on a trek across America after an outbreak.
+</p>
+<ul>
+    <li><b>TV Network:</b> <span class="info-item-value">HBO</span></li>
+</ul>
+<span data-qa="series-details-premiere-date">Jan 15, 2023</span>
+<span data-qa="series-details-genre">Action</span>
+<img data-qa="poster-image" src="https://resizing.flixster.com/poster.jpg">
+</body></html>
+'''
+
+
+class FakeResponse:
+
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+
+    def __init__(self, text):
+        self.text = text
+
+    def get(self, url, timeout=None):
+        return FakeResponse(self.text)
+
+
+class HttpItemsTestcase(unittest.TestCase):
+
+    def test_get_items(self):
+        items = HttpItems('https://www.rottentomatoes.com/tv/the_last_of_us', FakeSession(SHOW_PAGE))
+        item_dict = items.get_items()
+        self.assertEqual(item_dict['Title'], 'THE_LAST_OF_US')
+        self.assertEqual(item_dict['Tomatometer'], '96')
+        self.assertEqual(item_dict['Audience Score'], '90')
+        self.assertEqual(item_dict['TV Network'], 'HBO')
+        self.assertEqual(item_dict['Img'], 'https://resizing.flixster.com/poster.jpg')
+        self.assertNotIn('N/A', item_dict.values())
+
+    def test_missing_field_returns_none(self):
+        page = SHOW_PAGE.replace('audiencescore="90"', 'audiencescore=""')
+        items = HttpItems('https://www.rottentomatoes.com/tv/the_last_of_us', FakeSession(page))
+        self.assertIsNone(items.get_items())
+        self.assertEqual(items.missing, ['Audience Score'])
@@ -0,0 +1,113 @@
+import unittest
+import tempfile
+import requests
+from requests.adapters import HTTPAdapter
+from unittest.mock import patch
+import io
+import os
+import sys
+sys.path.append('../')
+from scraper.image_downloader import ImageDownloader
+from scraper.saver import Saver
+from scraper.http_session import create_session
+from scraper.rate_limit import RateLimiter, RetryPolicy
+
+
+class FakeResponse:
+
+    def __init__(self, content):
+        self.content = content
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+
+class FakeSession:
+
+    def __init__(self, content, failures=0):
+        self.content = content
+        self.failures = failures
+        self.requests = 0
+
+    def get(self, url, timeout=None, stream=False):
+        self.requests += 1
+        if self.requests <= self.failures:
+            raise requests.ConnectionError('connection reset')
+        return FakeResponse(self.content)
+
+
+class ImageDownloaderTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dirs = tempfile.TemporaryDirectory()
+        self.content = os.urandom(200000)
+
+    def tearDown(self):
+        self.temp_dirs.cleanup()
+
+    def test_save_queues_image(self):
+        downloader = ImageDownloader(session=FakeSession(self.content), chunk_size=1024)
+        item_dict = {'Title': 'THE_LAST_OF_US', 'Img': 'https://resizing.flixster.com/poster.jpg'}
+        save = Saver(item_dict, downloader=downloader)
+        save.file_path = self.temp_dirs.name
+        future = save.save_img()
+        downloader.shutdown()
+        img_path = future.result()
+        self.assertEqual(img_path, f'{self.temp_dirs.name}/THE_LAST_OF_US.jpg')
+        with open(img_path, 'rb') as handler:
+            self.assertEqual(handler.read(), self.content)
+        self.assertEqual(downloader.downloaded, 1)
+
+    def test_download_retries(self):
+        session = FakeSession(self.content, failures=1)
+        downloader = ImageDownloader(session=session, retries=1)
+        img_path = downloader.download('https://resizing.flixster.com/poster.jpg', f'{self.temp_dirs.name}/poster.jpg')
+        downloader.shutdown()
+        self.assertTrue(os.path.isfile(img_path))
+        self.assertEqual(session.requests, 2)
+        self.assertEqual(downloader.failed, 0)
+
+    def test_session_retries_only(self):
+        def send(adapter, request, **kwargs):
+            response = requests.Response()
+            response.status_code = 503
+            response.url = request.url
+            response.raw = io.BytesIO(b'')
+            sent.append(request.url)
+            return response
+        sent = []
+        session = create_session(retry_policy=RetryPolicy(RateLimiter(rate=1e9), retries=3, base_delay=0))
+        downloader = ImageDownloader(session=session, retries=3)
+        with patch.object(HTTPAdapter, 'send', new=send):
+            img_path = downloader.download('https://resizing.flixster.com/poster.jpg', f'{self.temp_dirs.name}/poster.jpg')
+        downloader.shutdown()
+        self.assertEqual(img_path, None)
+        self.assertEqual(len(sent), 4)
+        self.assertEqual(downloader.failed, 1)
+
+    def test_save_session_retries_only(self):
+        def send(adapter, request, **kwargs):
+            response = requests.Response()
+            response.status_code = 503
+            response.url = request.url
+            response.raw = io.BytesIO(b'')
+            sent.append(request.url)
+            return response
+        sent = []
+        retry_policy = RetryPolicy(RateLimiter(rate=1e9), retries=3, base_delay=0)
+        save = Saver({'Title': 'THE_LAST_OF_US', 'Img': 'https://resizing.flixster.com/poster.jpg'}, session=create_session(retry_policy=retry_policy), retry_policy=retry_policy)
+        save.file_path = self.temp_dirs.name
+        with patch.object(HTTPAdapter, 'send', new=send):
+            save.save_img()
+        self.assertEqual(len(sent), 4)
+        self.assertEqual(retry_policy.gave_up, 1)
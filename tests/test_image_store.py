@@ -0,0 +1,48 @@
+import unittest
+import tempfile
+import io
+import os
+import sys
+sys.path.append('../')
+from PIL import Image
+from scraper.image_downloader import ImageDownloader
+from scraper.image_store import ImageStore
+from test_image_downloader import FakeSession
+
+
+class ImageStoreTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dirs = tempfile.TemporaryDirectory()
+        poster = io.BytesIO()
+        Image.new('RGB', (206, 305), 'red').save(poster, format='JPEG')
+        self.session = FakeSession(poster.getvalue())
+
+    def tearDown(self):
+        self.temp_dirs.cleanup()
+
+    def test_deduplicate_and_thumbnail(self):
+        store = ImageStore(f'{self.temp_dirs.name}/images', downloader=ImageDownloader(session=self.session), thumbnail_sizes=[(50, 50)], processes=1)
+        first = store.submit('https://resizing.flixster.com/a.jpg', link_path=f'{self.temp_dirs.name}/SHOW_A/SHOW_A.jpg').result()
+        second = store.submit('https://resizing.flixster.com/b.jpg', link_path=f'{self.temp_dirs.name}/SHOW_B/SHOW_B.jpg').result()
+        third = store.submit('https://resizing.flixster.com/a.jpg').result()
+        store.close()
+        self.assertEqual(first, second)
+        self.assertEqual(first, third)
+        self.assertEqual(self.session.requests, 2)
+        self.assertEqual((store.stored, store.deduplicated), (1, 2))
+        self.assertEqual(os.stat(first).st_ino, os.stat(f'{self.temp_dirs.name}/SHOW_B/SHOW_B.jpg').st_ino)
+        with Image.open(f'{self.temp_dirs.name}/images/thumbnails/50x50/{os.path.basename(first)}') as thumbnail:
+            self.assertLessEqual(max(thumbnail.size), 50)
+
+    def test_workers_merge_url_map(self):
+        root = f'{self.temp_dirs.name}/images'
+        stores = [ImageStore(root, downloader=ImageDownloader(session=self.session), thumbnail_sizes=[]) for n in range(2)]
+        for n, store in enumerate(stores):
+            store.submit(f'https://resizing.flixster.com/{n}.jpg').result()
+        for store in stores:
+            store.close()
+        reopened = ImageStore(root, downloader=ImageDownloader(session=self.session), thumbnail_sizes=[])
+        reopened.close()
+        self.assertEqual(sorted(reopened.url_map), ['https://resizing.flixster.com/0.jpg', 'https://resizing.flixster.com/1.jpg'])
+        self.assertEqual([name for name in os.listdir(root) if name.endswith('.tmp')], [])
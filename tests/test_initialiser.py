@@ -1,5 +1,9 @@
 import unittest
 import random
+import uuid
+import requests
+from unittest.mock import patch
+from urllib.parse import urlsplit, parse_qs
 import sys
 sys.path.append('../')
 from scraper.initialiser import Initialiser
@@ -16,3 +20,81 @@ class InitialiserTestcase(unittest.TestCase):
     def test_scrape(self):
         self.assertEqual(len(self.url_list), 150)
         self.assertIn('https://www.rottentomatoes.com/tv/', self.test_url)
+
+
+class FakeResponse:
+
+    def __init__(self, urls, cursor=None, has_next_page=False):
+        self.headers = {'Content-Type': 'application/json; charset=utf-8'}
+        self.urls = urls
+        self.cursor = cursor
+        self.has_next_page = has_next_page
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {
+            'grid': {'list': [{'mediaUrl': url} for url in self.urls]},
+            'pageInfo': {'endCursor': self.cursor, 'hasNextPage': self.has_next_page}
+        }
+
+
+class FakeSession:
+
+    def __init__(self, number_of_pages, fail_on=None):
+        self.number_of_pages = number_of_pages
+        self.fail_on = fail_on
+        self.cursors = {}
+        self.requested = []
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def get(self, url, timeout=None):
+        self.requested.append(url)
+        page = 0
+        if '?' in url:
+            page = self.cursors[parse_qs(urlsplit(url).query)['after'][0]]
+        if page == self.fail_on:
+            raise requests.Timeout(f'{url} timed out')
+        cursor = uuid.uuid4().hex + '=='
+        self.cursors[cursor] = page + 1
+        urls = [f'/tv/show_{page}_{n}' for n in range(Initialiser.PAGE_SIZE)]
+        return FakeResponse(urls, cursor, has_next_page=page + 1 < self.number_of_pages)
+
+
+class HttpDiscoveryTestcase(unittest.TestCase):
+
+    def test_scrape_http(self):
+        session = FakeSession(number_of_pages=20)
+        url_list = Initialiser(discovery='http', session=session).scrape()
+        self.assertEqual(len(url_list), 150)
+        self.assertEqual(url_list[0], 'https://www.rottentomatoes.com/tv/show_0_0')
+        self.assertEqual(len(session.requested), 5)
+
+    def test_scrape_http_stops_at_last_page(self):
+        session = FakeSession(number_of_pages=6)
+        url_list = Initialiser(number_of_pages_to_scrape=None, discovery='http', session=session).scrape()
+        self.assertEqual(len(url_list), 180)
+        self.assertEqual(len(set(url_list)), 180)
+        self.assertEqual(len(session.requested), 6)
+
+    def test_scrape_http_raises_on_error(self):
+        session = FakeSession(number_of_pages=6, fail_on=2)
+        initialiser = Initialiser(number_of_pages_to_scrape=None, discovery='http', session=session)
+        with self.assertRaises(requests.Timeout):
+            initialiser.scrape()
+        self.assertEqual(len(initialiser.url_list), 60)
+
+    def test_closes_own_session(self):
+        session = FakeSession(number_of_pages=6, fail_on=2)
+        with patch('scraper.initialiser.create_session', return_value=session):
+            initialiser = Initialiser(number_of_pages_to_scrape=None, discovery='http')
+        with self.assertRaises(requests.Timeout):
+            initialiser.scrape()
+        self.assertEqual(session.closed, True)
+        shared = FakeSession(number_of_pages=6)
+        Initialiser(discovery='http', session=shared).scrape()
+        self.assertEqual(shared.closed, False)
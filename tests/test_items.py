@@ -1,19 +1,16 @@
 import unittest
-from selenium import webdriver
 import random
 import sys
 sys.path.append('../')
 from scraper.initialiser import Initialiser
 from scraper.items import Items
+from scraper.driver_factory import DriverFactory
 
 
 class ItemsTestcase(unittest.TestCase):
 
     def setUp(self):
-        firefox_options = webdriver.FirefoxOptions()
-        firefox_options.add_argument('--window-size=1920,1080')
-        firefox_options.add_argument('--headless')
-        driver = webdriver.Firefox(options=firefox_options)
+        driver = DriverFactory().create_driver()
         initialiser = Initialiser()
         self.url_list = initialiser.scrape()
         random_index = random.randint(0, 150)
@@ -27,3 +24,48 @@ class ItemsTestcase(unittest.TestCase):
             self.item_dict_values = self.item_dict.values()
             self.assertNotIn('N/A', self.item_dict_values)
 
+
+
+class FakeDriver:
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.find_element_calls = 0
+        self.current_url = 'https://www.rottentomatoes.com/tv/the_last_of_us/'
+
+    def execute_script(self, script):
+        return self.batch
+
+    def find_element(self, by, value):
+        self.find_element_calls += 1
+        raise Exception('element not found')
+
+
+class BatchedItemsTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.batch = {
+            'Title': 'The Last of Us',
+            'Tomatometer': '96',
+            'Audience Score': '90',
+            'Synopsis': 'Joel and Ellie must survive ruthless killers and monsters on a trek across America after an outbreak.',
+            'TV Network': 'HBO',
+            'Premiere Date': 'Jan 15, 2023',
+            'Genre': 'Action',
+            'Img': 'https://resizing.flixster.com/poster.jpg'
+        }
+
+    def test_get_items_batched(self):
+        driver = FakeDriver(self.batch)
+        item_dict = Items(driver).get_items()
+        self.assertEqual(item_dict['Title'], 'THE_LAST_OF_US')
+        self.assertEqual(item_dict['URL'], 'https://www.rottentomatoes.com/tv/the_last_of_us')
+        self.assertEqual(item_dict['ID'], Items(FakeDriver(dict(self.batch))).get_items()['ID'])
+        self.assertNotIn('N/A', item_dict.values())
+        self.assertEqual(driver.find_element_calls, 1)
+
+    def test_missing_batch_field_uses_fallback(self):
+        self.batch['Genre'] = None
+        driver = FakeDriver(self.batch)
+        self.assertIsNone(Items(driver).get_items())
+        self.assertEqual(driver.find_element_calls, 2)
@@ -0,0 +1,67 @@
+import unittest
+import tempfile
+import os
+import sys
+sys.path.append('../')
+from scraper.journal import CrawlJournal
+
+
+class CrawlJournalTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dirs = tempfile.TemporaryDirectory()
+        self.journal_path = f'{self.temp_dirs.name}/raw_data/crawl_journal.jsonl'
+        self.urls = [f'https://www.rottentomatoes.com/tv/show_{n}' for n in range(5)]
+
+    def tearDown(self):
+        self.temp_dirs.cleanup()
+
+    def test_resume(self):
+        journal = CrawlJournal(self.journal_path)
+        for url in self.urls:
+            journal.discovered(url)
+        journal.complete_discovery()
+        journal.mark(self.urls[0], 'done')
+        journal.mark(self.urls[1], 'omitted')
+        journal.mark(self.urls[2], 'failed')
+        journal.close()
+        with open(self.journal_path, 'a') as fp:
+            fp.write('{"url": "https://www.rottentomatoes.com/tv/show_3", "sta')
+        resumed = CrawlJournal(self.journal_path, resume=True)
+        self.assertTrue(resumed.discovery_complete)
+        self.assertTrue(resumed.is_finished(self.urls[0]))
+        self.assertEqual(resumed.outstanding(), self.urls[2:])
+        resumed.mark(self.urls[3], 'done')
+        resumed.close()
+        self.assertEqual(CrawlJournal(self.journal_path, resume=True).outstanding(), [self.urls[2], self.urls[4]])
+
+    def test_new_journal_replaces_old(self):
+        journal = CrawlJournal(self.journal_path)
+        journal.discovered(self.urls[0])
+        journal.close()
+        journal = CrawlJournal(self.journal_path)
+        journal.close()
+        self.assertEqual(CrawlJournal(self.journal_path, resume=True).outstanding(), [])
+
+    def test_on_disk(self):
+        journal = CrawlJournal(self.journal_path)
+        for url in self.urls[:3]:
+            journal.discovered(url)
+        journal.mark(self.urls[0], 'done')
+        journal.mark(self.urls[1], 'failed')
+        journal.close()
+        journal = CrawlJournal(self.journal_path, resume=True, on_disk=True)
+        self.assertTrue(os.path.isfile(journal.states.path))
+        self.assertEqual(len(journal.states), 3)
+        self.assertEqual(journal.states[self.urls[1]], 'failed')
+        self.assertFalse(journal.claim(self.urls[0]))
+        self.assertTrue(journal.claim(self.urls[3]))
+        self.assertFalse(journal.claim(self.urls[3]))
+        self.assertTrue(journal.is_claimed(self.urls[3]))
+        self.assertEqual(list(journal.outstanding()), self.urls[1:4])
+        self.assertEqual(list(journal.outstanding(claimed=False)), self.urls[1:3])
+        journal.mark(self.urls[3], 'done')
+        self.assertEqual(list(journal.states), self.urls[:4])
+        journal.close()
+        self.assertFalse(os.path.isfile(journal.states.path))
+        self.assertEqual(CrawlJournal(self.journal_path, resume=True).outstanding(), self.urls[1:3])
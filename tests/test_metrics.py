@@ -0,0 +1,54 @@
+import unittest
+import tempfile
+import json
+import sys
+sys.path.append('../')
+from scraper.metrics import Metrics, Histogram, timed
+
+
+class MetricsTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dirs = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dirs.cleanup()
+
+    def test_percentiles(self):
+        histogram = Histogram(Metrics.BOUNDS)
+        for n in range(1, 1001):
+            histogram.observe(n / 1000)
+        self.assertAlmostEqual(histogram.percentile(0.5), 0.5, delta=0.5 * 0.25)
+        self.assertAlmostEqual(histogram.percentile(0.95), 0.95, delta=0.95 * 0.25)
+        self.assertAlmostEqual(histogram.percentile(0.99), 0.99, delta=0.99 * 0.25)
+        self.assertLessEqual(histogram.percentile(0.99), histogram.maximum)
+        self.assertEqual(histogram.count, 1000)
+
+    def test_report_and_merge(self):
+        metrics = Metrics()
+        metrics.increment('urls', 3)
+        metrics.observe('driver_get', 0.2)
+        with self.assertRaises(ValueError):
+            with metrics.time('json_write'):
+                raise ValueError('disk full')
+        with timed(None, 'json_write'):
+            pass
+        other = Metrics()
+        other.increment('urls')
+        other.increment('items_saved', 2)
+        other.observe('driver_get', 0.4)
+        metrics.merge(json.loads(json.dumps(other.state())))
+        summary = metrics.summary()
+        self.assertEqual(summary['counters'], {'urls': 4, 'json_write_errors': 1, 'items_saved': 2})
+        self.assertEqual(summary['stages']['driver_get']['count'], 2)
+        self.assertAlmostEqual(summary['stages']['driver_get']['mean'], 0.3)
+        self.assertEqual(summary['stages']['json_write']['count'], 1)
+        metrics.write_report(f'{self.temp_dirs.name}/crawl_report.json', engine='selenium')
+        with open(f'{self.temp_dirs.name}/crawl_report.json') as fp:
+            report = json.load(fp)
+        self.assertEqual(report['engine'], 'selenium')
+        self.assertIn('p95', report['stages']['driver_get'])
+        text = metrics.prometheus()
+        self.assertIn('scraper_urls_total 4\n', text)
+        self.assertIn('scraper_stage_seconds_bucket{stage="driver_get",le="+Inf"} 2\n', text)
+        self.assertIn('scraper_stage_seconds_count{stage="json_write"} 1\n', text)
@@ -0,0 +1,50 @@
+import unittest
+import threading
+import time
+import sys
+sys.path.append('../')
+from scraper.pipeline import StreamingPipeline
+
+
+class StreamingPipelineTestcase(unittest.TestCase):
+
+    def test_run(self):
+        results = []
+        pipeline = StreamingPipeline(lambda: range(100), lambda n: n * 2 if n % 10 else None, results.append, workers=4, queue_size=2)
+        pipeline.run()
+        self.assertEqual(pipeline.produced, 100)
+        self.assertEqual(sorted(results), [n * 2 for n in range(100) if n % 10])
+
+    def test_stages_overlap(self):
+        first_result = threading.Event()
+        def producer():
+            for n in range(5):
+                yield n
+            self.assertTrue(first_result.wait(timeout=5))
+            for n in range(5, 10):
+                yield n
+        pipeline = StreamingPipeline(producer, lambda n: n, lambda n: first_result.set(), workers=2)
+        pipeline.run()
+        self.assertEqual(pipeline.consumed, 10)
+
+    def test_backpressure(self):
+        def slow_worker(n):
+            time.sleep(0.01)
+            return n
+        pipeline = StreamingPipeline(lambda: range(50), slow_worker, lambda n: None, workers=2, queue_size=3)
+        sizes = []
+        monitor = threading.Thread(target=lambda: [sizes.append(pipeline.item_queue.qsize()) or time.sleep(0.005) for n in range(40)])
+        monitor.start()
+        pipeline.run()
+        monitor.join()
+        self.assertLessEqual(max(sizes), 3)
+
+    def test_worker_errors_are_recorded(self):
+        def worker(n):
+            if n == 3:
+                raise ValueError('page failed')
+            return n
+        pipeline = StreamingPipeline(lambda: range(5), worker, lambda n: None, workers=2)
+        pipeline.run()
+        self.assertEqual(pipeline.consumed, 4)
+        self.assertEqual(len(pipeline.errors), 1)
@@ -0,0 +1,90 @@
+import unittest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+import threading
+import requests
+import time
+import sys
+sys.path.append('../')
+from scraper.rate_limit import TokenBucket, RateLimiter, RetryPolicy
+from scraper.http_session import create_session
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    statuses = []
+
+    def do_GET(self):
+        status = FlakyHandler.statuses.pop(0) if FlakyHandler.statuses else 200
+        self.send_response(status)
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeResponse:
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class RateLimitTestcase(unittest.TestCase):
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=100, capacity=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.01, delta=0.005)
+        self.assertAlmostEqual(bucket.reserve(), 0.02, delta=0.005)
+        limiter = RateLimiter(rate=50, burst=1, rates={'resizing.flixster.com': 1000})
+        start = time.perf_counter()
+        for n in range(6):
+            limiter.wait('https://www.rottentomatoes.com/tv/show')
+            limiter.wait('https://resizing.flixster.com/poster.jpg')
+        self.assertGreaterEqual(time.perf_counter() - start, 0.09)
+        self.assertEqual(sorted(limiter.buckets), ['resizing.flixster.com', 'www.rottentomatoes.com'])
+
+    def test_retry_policy(self):
+        policy = RetryPolicy(RateLimiter(rate=1000), retries=2, base_delay=0.01)
+        attempts = []
+        def flaky_get(url):
+            attempts.append(url)
+            if len(attempts) == 1:
+                raise requests.Timeout('read timed out')
+            if len(attempts) == 2:
+                return FakeResponse(503)
+            return FakeResponse(200)
+        self.assertEqual(policy.call('https://www.rottentomatoes.com/tv/show', flaky_get, 'show').status_code, 200)
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(policy.retried, 2)
+        self.assertEqual(policy.call('https://www.rottentomatoes.com/tv/show', lambda: FakeResponse(502)).status_code, 502)
+        self.assertEqual(policy.gave_up, 1)
+        def broken():
+            raise ValueError('not retryable')
+        with self.assertRaises(ValueError):
+            policy.call('https://www.rottentomatoes.com/tv/show', broken)
+        self.assertEqual(policy.retried, 4)
+
+    def test_session_retries(self):
+        server = HTTPServer(('127.0.0.1', 0), FlakyHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        FlakyHandler.statuses = [429, 500]
+        policy = RetryPolicy(RateLimiter(rate=1000), retries=3, base_delay=0.01)
+        session = create_session(pool_size=2, retry_policy=policy)
+        try:
+            response = session.get(f'http://127.0.0.1:{server.server_port}/tv/show', timeout=5)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.text, 'ok')
+            self.assertEqual(policy.retried, 2)
+        finally:
+            session.close()
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,47 @@
+import unittest
+import sys
+sys.path.append('../')
+from scraper.readiness import Readiness
+
+
+class FakeDriver:
+
+    def __init__(self, tiles_per_poll):
+        self.tiles_per_poll = tiles_per_poll
+        self.tile_count = 0
+
+    def find_elements(self, by, value):
+        self.tile_count += self.tiles_per_poll
+        return [None] * self.tile_count
+
+
+class ReadinessTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.readiness = Readiness(poll_frequency=0.01, timeouts={'tile_growth': 0.2})
+
+    def test_wait_for_tile_growth(self):
+        driver = FakeDriver(tiles_per_poll=10)
+        self.assertTrue(self.readiness.wait_for_tile_growth(driver, 25))
+        summary = self.readiness.summary()
+        self.assertEqual(summary['tile_growth']['count'], 1)
+        self.assertEqual(summary['tile_growth']['timed_out'], 0)
+        self.assertLess(summary['tile_growth']['max'], 0.2)
+
+    def test_timed_out_wait_is_recorded(self):
+        driver = FakeDriver(tiles_per_poll=0)
+        self.assertIsNone(self.readiness.wait_for_tile_growth(driver, 25))
+        summary = self.readiness.summary()
+        self.assertEqual(summary['tile_growth']['timed_out'], 1)
+        self.assertGreaterEqual(summary['tile_growth']['max'], 0.2)
+
+    def test_merge(self):
+        self.readiness.wait_for_tile_growth(FakeDriver(tiles_per_poll=10), 25)
+        other = Readiness(poll_frequency=0.01, timeouts={'tile_growth': 0.2})
+        other.wait_for_tile_growth(FakeDriver(tiles_per_poll=0), 25)
+        self.readiness.merge(*other.state())
+        summary = self.readiness.summary()
+        self.assertEqual(summary['tile_growth']['count'], 2)
+        self.assertEqual(summary['tile_growth']['timed_out'], 1)
+        self.assertGreaterEqual(summary['tile_growth']['max'], 0.2)
+        self.assertEqual(self.readiness.wait_times['tile_growth']['count'], 2)
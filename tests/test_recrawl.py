@@ -0,0 +1,43 @@
+import unittest
+import tempfile
+import sys
+sys.path.append('../')
+from scraper.recrawl import RecrawlManifest, canonical_url, stable_id
+
+
+class RecrawlTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.item_dict = {
+            "Title": "THE_LAST_OF_US",
+            "Tomatometer": "96",
+            "Audience Score": "90",
+            "Synopsis": "Joel and Ellie must survive ruthless killers and monsters on a trek across America after an outbreak.",
+            "TV Network": "HBO",
+            "Premiere Date": "Jan 15, 2023",
+            "Genre": "Action",
+            "Img": "https://resizing.flixster.com/poster.jpg",
+            "Timestamp": "06-Mar-2023 (15:34:08.470630)",
+            "ID": stable_id('https://www.rottentomatoes.com/tv/the_last_of_us'),
+            "URL": "https://www.rottentomatoes.com/tv/the_last_of_us"
+        }
+        self.temp_dirs = tempfile.TemporaryDirectory()
+        self.manifest_path = f'{self.temp_dirs.name}/raw_data/recrawl_manifest.json'
+
+    def tearDown(self):
+        self.temp_dirs.cleanup()
+
+    def test_stable_id(self):
+        self.assertEqual(canonical_url('http://WWW.rottentomatoes.com/tv/the_last_of_us/?ref=home#reviews'), self.item_dict['URL'])
+        self.assertEqual(stable_id('https://www.rottentomatoes.com/tv/the_last_of_us/'), self.item_dict['ID'])
+
+    def test_unchanged_between_runs(self):
+        manifest = RecrawlManifest(self.manifest_path)
+        self.assertFalse(manifest.is_unchanged(self.item_dict))
+        manifest.record(self.item_dict)
+        manifest.save()
+        next_run = RecrawlManifest(self.manifest_path)
+        self.item_dict['Timestamp'] = '07-Mar-2023 (15:34:08.470630)'
+        self.assertTrue(next_run.is_unchanged(self.item_dict))
+        self.item_dict['Audience Score'] = '91'
+        self.assertFalse(next_run.is_unchanged(self.item_dict))
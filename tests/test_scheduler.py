@@ -0,0 +1,74 @@
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+import tempfile
+import sys
+sys.path.append('../')
+from scraper.scheduler import FreshnessScheduler
+from scraper.scraper import Scraper
+from helpers import item_dict
+
+
+class FakeInitialiser:
+    urls = []
+
+    def __init__(self, **kwargs):
+        self.driver = None
+
+    def iter_urls(self):
+        yield from FakeInitialiser.urls
+
+
+class FreshnessSchedulerTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = f'{self.temp_dir.name}/freshness.json'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def fetched(self, name, days_ago, tomatometer='90%', premiere='Jan 15, 2003'):
+        timestamp = (datetime.now() - timedelta(days=days_ago)).strftime('%d-%b-%Y (%H:%M:%S.%f)')
+        return item_dict(name, url=f'https://www.rottentomatoes.com/tv/{name}', tomatometer=tomatometer, premiere_date=premiere, timestamp=timestamp)
+
+    def test_order(self):
+        scheduler = FreshnessScheduler(self.path)
+        for days_ago, tomatometer in ((40, '80%'), (30, '85%'), (20, '90%'), (10, '95%')):
+            scheduler.record(self.fetched('volatile', days_ago, tomatometer))
+            scheduler.record(self.fetched('stable', days_ago))
+        scheduler.record(self.fetched('premiered', 10, premiere=(datetime.now() - timedelta(days=20)).strftime('%b %d, %Y')))
+        volatile = scheduler.entries['https://www.rottentomatoes.com/tv/volatile']
+        self.assertEqual((volatile['checks'], volatile['changes']), (3, 3))
+        self.assertEqual(scheduler.entries['https://www.rottentomatoes.com/tv/stable']['changes'], 0)
+        self.assertGreater(scheduler.staleness('https://www.rottentomatoes.com/tv/volatile'), scheduler.staleness('https://www.rottentomatoes.com/tv/stable'))
+        urls = [f'https://www.rottentomatoes.com/tv/{name}' for name in ('stable', 'volatile', 'premiered', 'new')]
+        self.assertEqual([url.rsplit('/', 1)[-1] for url in scheduler.order(urls)], ['new', 'premiered', 'volatile', 'stable'])
+        self.assertEqual(len(scheduler.order(urls, budget=2)), 2)
+        self.assertEqual(scheduler.order(urls, budget=0), [])
+        self.assertEqual(FreshnessScheduler(self.path, budget=0).order(urls), [])
+
+    def test_save_merges(self):
+        first = FreshnessScheduler(self.path)
+        second = FreshnessScheduler(self.path)
+        first.record(self.fetched('show_a', 5))
+        second.record(self.fetched('show_a', 1))
+        second.record(self.fetched('show_b', 1))
+        second.save()
+        first.save()
+        saved = FreshnessScheduler(self.path, read_only=True)
+        self.assertEqual(sorted(saved.entries), ['https://www.rottentomatoes.com/tv/show_a', 'https://www.rottentomatoes.com/tv/show_b'])
+        self.assertEqual(saved.entries['https://www.rottentomatoes.com/tv/show_a'], second.entries['https://www.rottentomatoes.com/tv/show_a'])
+
+    def test_scraper_follows_schedule(self):
+        scheduler = FreshnessScheduler(self.path, budget=2)
+        scheduler.record(self.fetched('show_0', 1))
+        FakeInitialiser.urls = [f'https://www.rottentomatoes.com/tv/show_{n}' for n in range(3)]
+        with patch('scraper.scraper.Initialiser', FakeInitialiser):
+            scrape = Scraper(scheduler=scheduler, journal_path=f'{self.temp_dir.name}/crawl_journal.jsonl', report_path=f'{self.temp_dir.name}/crawl_report.json')
+            scrape.open_journal()
+            urls = list(scrape.iter_urls())
+            scrape.journal.close()
+        self.assertEqual(urls, FakeInitialiser.urls[1:])
+        self.assertEqual(scrape.metrics.counters['urls'], 2)
+        self.assertEqual(list(scrape.journal.states), urls)
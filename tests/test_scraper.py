@@ -1,8 +1,15 @@
 import unittest
 from unittest.mock import patch
+import tempfile
+import sqlite3
+import time
 import sys
 sys.path.append('../')
 from scraper.scraper import Scraper
+from scraper.storage import SQLiteStorage
+from scraper.journal import CrawlJournal
+from scraper.concurrency import ConcurrencyController
+from helpers import item_dict
 
 
 class ScraperTestcase(unittest.TestCase):
@@ -16,3 +23,102 @@ class ScraperTestcase(unittest.TestCase):
             self.assertEqual(mock_scrape_items.call_count, len(scrape.url_list))
             urls_used = [args[0] for args in mock_scrape_items.call_args_list]
             self.assertEqual(len(set(urls_used)), len(scrape.url_list))
+
+
+class MultiprocessScraperTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dirs = tempfile.TemporaryDirectory()
+        self.urls = [f'https://www.rottentomatoes.com/tv/show_{n}' for n in range(7)]
+
+    def tearDown(self):
+        self.temp_dirs.cleanup()
+
+    def get_items(self, url):
+        return item_dict(url.rsplit('_', 1)[-1])
+
+    def test_perform_multiprocess_scrape(self):
+        def scrape_urls(scrape):
+            scrape.url_list = list(self.urls)
+        storage = SQLiteStorage(f'{self.temp_dirs.name}/raw_data/shows.db')
+        with patch.object(Scraper, 'scrape_urls', side_effect=scrape_urls), \
+                patch.object(Scraper, 'get_items_with_driver', side_effect=lambda url: None if url == self.urls[3] else self.get_items(url)), \
+                patch('scraper.scraper.Saver.save_img', return_value=None):
+            scrape = Scraper(processes=3, storage=storage, journal_path=f'{self.temp_dirs.name}/raw_data/crawl_journal.jsonl', report_path=f'{self.temp_dirs.name}/raw_data/crawl_report.json')
+            scrape.perform_scrape()
+        self.assertEqual(len(scrape.item_dict_list), 6)
+        journal = CrawlJournal(scrape.journal_path, resume=True)
+        self.assertEqual(journal.states[self.urls[3]], 'omitted')
+        self.assertEqual(sum(state == 'done' for state in journal.states.values()), 6)
+        journal.close()
+        with sqlite3.connect(storage.path) as connection:
+            self.assertEqual(connection.execute('SELECT COUNT(*) FROM shows').fetchone()[0], 6)
+
+    def test_workers_get_concurrency(self):
+        def scrape_urls(scrape):
+            scrape.url_list = list(self.urls)
+        storage = SQLiteStorage(f'{self.temp_dirs.name}/raw_data/shows.db')
+        with patch.object(Scraper, 'scrape_urls', side_effect=scrape_urls), \
+                patch.object(Scraper, 'get_items_with_driver', side_effect=self.get_items), \
+                patch('scraper.scraper.Saver.save_img', return_value=None):
+            scrape = Scraper(processes=2, concurrency=ConcurrencyController(minimum=1, maximum=3, window=1), storage=storage, journal_path=f'{self.temp_dirs.name}/raw_data/crawl_journal.jsonl', report_path=f'{self.temp_dirs.name}/raw_data/crawl_report.json')
+            scrape.perform_scrape()
+        self.assertEqual(len(scrape.concurrency.decisions), 7)
+        self.assertGreater(scrape.worker_stats['concurrency_limit'], 2)
+
+    def test_coordinator_error_stops_workers(self):
+        def scrape_urls(scrape):
+            scrape.url_list = [f'https://www.rottentomatoes.com/tv/show_{n}' for n in range(2000)]
+        storage = SQLiteStorage(f'{self.temp_dirs.name}/raw_data/shows.db')
+        with patch.object(Scraper, 'scrape_urls', side_effect=scrape_urls), \
+                patch.object(Scraper, 'get_items_with_driver', side_effect=self.get_items), \
+                patch.object(Scraper, 'handle_worker_event', side_effect=RuntimeError('journal is full')), \
+                patch('scraper.scraper.Saver.save_img', return_value=None):
+            scrape = Scraper(processes=2, storage=storage, journal_path=f'{self.temp_dirs.name}/raw_data/crawl_journal.jsonl', report_path=f'{self.temp_dirs.name}/raw_data/crawl_report.json')
+            start = time.perf_counter()
+            with self.assertRaises(RuntimeError):
+                scrape.perform_scrape()
+        self.assertLess(time.perf_counter() - start, 60)
+
+    def test_long_crawl(self):
+        def iter_urls(scrape):
+            for url in self.urls:
+                scrape.metrics.increment('urls')
+                yield url
+        storage = SQLiteStorage(f'{self.temp_dirs.name}/raw_data/shows.db')
+        with patch.object(Scraper, 'iter_urls', new=iter_urls), \
+                patch.object(Scraper, 'get_items_with_driver', side_effect=lambda url: None if url == self.urls[3] else self.get_items(url)), \
+                patch('scraper.scraper.Saver.save_img', return_value=None):
+            scrape = Scraper(long_crawl=True, max_driver_pages=50, storage=storage, journal_path=f'{self.temp_dirs.name}/raw_data/crawl_journal.jsonl', report_path=f'{self.temp_dirs.name}/raw_data/crawl_report.json')
+            scrape.perform_scrape()
+        self.assertTrue(scrape.streaming)
+        self.assertEqual(scrape.item_dict_list, [])
+        self.assertEqual(scrape.metrics.counters['items_saved'], 6)
+        self.assertEqual(scrape.metrics.counters['items_omitted'], 1)
+        self.assertEqual(scrape.driver_pool.max_pages, 50)
+        with sqlite3.connect(storage.path) as connection:
+            self.assertEqual(connection.execute('SELECT COUNT(*) FROM shows').fetchone()[0], 6)
+
+    def test_long_crawl_discovery(self):
+        journal_path = f'{self.temp_dirs.name}/raw_data/crawl_journal.jsonl'
+        journal = CrawlJournal(journal_path)
+        journal.discovered(self.urls[0])
+        journal.discovered(self.urls[6])
+        journal.mark(self.urls[0], 'done')
+        journal.close()
+        def initialise(initialiser, keep_urls=True, **kwargs):
+            self.assertFalse(keep_urls)
+            initialiser.driver = None
+        def iter_urls(initialiser):
+            for url in self.urls[:5] + self.urls[1:3]:
+                yield url + '/'
+        with patch('scraper.scraper.Initialiser.__init__', new=initialise), \
+                patch('scraper.scraper.Initialiser.iter_urls', new=iter_urls):
+            scrape = Scraper(long_crawl=True, resume=True, discovery='http', journal_path=journal_path, report_path=f'{self.temp_dirs.name}/raw_data/crawl_report.json')
+            scrape.open_journal()
+            urls = list(scrape.iter_urls())
+            self.assertTrue(scrape.journal.on_disk)
+            scrape.journal.close()
+        self.assertEqual(urls, self.urls[1:5] + [self.urls[6]])
+        self.assertEqual(scrape.url_list, [])
+        self.assertEqual(scrape.metrics.counters['urls'], 5)
@@ -0,0 +1,92 @@
+import unittest
+import tempfile
+import sqlite3
+import json
+import os
+import sys
+sys.path.append('../')
+from scraper.storage import ShardedStorage, SQLiteStorage
+from scraper.saver import Saver
+from scraper.scraper import Scraper
+from unittest.mock import patch
+from helpers import item_dict
+
+
+class ShardedStorageTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dirs = tempfile.TemporaryDirectory()
+        self.root = f'{self.temp_dirs.name}/raw_data/shards'
+        self.item_dicts = [{'Title': f'SHOW_{n}', 'Img': 'N/A', 'Synopsis': 'x' * 200, 'ID': str(n)} for n in range(25)]
+
+    def tearDown(self):
+        self.temp_dirs.cleanup()
+
+    def test_batched_rotated_shards(self):
+        storage = ShardedStorage(self.root, batch_size=10, max_shard_bytes=100)
+        for item_dict in self.item_dicts:
+            Saver(item_dict, storage=storage).save_item_dict()
+        self.assertEqual(len(storage.index['shards']), 2)
+        storage.close()
+        self.assertEqual(len(storage.index['shards']), 3)
+        self.assertEqual(sorted(os.listdir(self.root)), ['images', 'index.json', 'shard-00000.jsonl.gz', 'shard-00001.jsonl.gz', 'shard-00002.jsonl.gz'])
+        with open(f'{self.root}/index.json') as fp:
+            self.assertEqual(json.load(fp)['records']['24'], 'shard-00002.jsonl.gz')
+        self.assertEqual(list(ShardedStorage(self.root).read()), self.item_dicts)
+        self.assertEqual(storage.image_path(self.item_dicts[0]), f'{os.path.abspath(self.root)}/images/0.jpg')
+
+    def test_journal_waits_for_flush(self):
+        storage = ShardedStorage(self.root)
+        scrape = Scraper(storage=storage, journal_path=f'{self.temp_dirs.name}/raw_data/crawl_journal.jsonl', report_path=f'{self.temp_dirs.name}/raw_data/crawl_report.json')
+        scrape.start()
+        with patch('scraper.scraper.Saver.save_img', return_value=None):
+            for item_dict in self.item_dicts[:5]:
+                scrape.save_data(dict(item_dict, URL=f'https://www.rottentomatoes.com/tv/show_{item_dict["ID"]}'))
+        self.assertEqual(scrape.metrics.counters['items_saved'], 5)
+        self.assertEqual(scrape.journal.states, {})
+        scrape.finish()
+        self.assertEqual(len(list(ShardedStorage(self.root).read())), 5)
+        self.assertEqual(list(scrape.journal.states.values()), ['done'] * 5)
+
+
+class SQLiteStorageTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dirs = tempfile.TemporaryDirectory()
+        self.path = f'{self.temp_dirs.name}/raw_data/shows.db'
+
+    def tearDown(self):
+        self.temp_dirs.cleanup()
+
+    def test_upsert_and_rank(self):
+        storage = SQLiteStorage(self.path, batch_size=2)
+        storage.write(item_dict(title='THE_OFFICE', url='https://www.rottentomatoes.com/tv/the_office', tomatometer='81%', audience_score='88%'))
+        storage.write(item_dict(title='THE_OFFICE', url='https://www.rottentomatoes.com/tv/the_office_uk', tomatometer='100%', audience_score='95%'))
+        storage.write(item_dict(title='THE_LAST_OF_US', url='https://www.rottentomatoes.com/tv/the_last_of_us', tomatometer='96%', audience_score='90%', genre='Action'))
+        storage.write(item_dict(title='THE_OFFICE', url='https://www.rottentomatoes.com/tv/the_office', tomatometer='82%', audience_score='89%'))
+        storage.close()
+        self.assertEqual(storage.written, 4)
+        ranked = storage.top_ranked()
+        self.assertEqual([show['url'] for show in ranked], [
+            'https://www.rottentomatoes.com/tv/the_office_uk',
+            'https://www.rottentomatoes.com/tv/the_last_of_us',
+            'https://www.rottentomatoes.com/tv/the_office'
+        ])
+        self.assertEqual(ranked[2]['tomatometer'], 82.0)
+        self.assertEqual(ranked[2]['premiere_date'], '2023-01-15')
+        self.assertEqual(len(storage.top_ranked(genre='Action')), 1)
+
+    def test_on_saved_after_commit(self):
+        storage = SQLiteStorage(self.path)
+        saved = []
+        def on_saved(batch):
+            with sqlite3.connect(self.path) as connection:
+                count = connection.execute('SELECT COUNT(*) FROM shows').fetchone()[0]
+            saved.extend((item_dict['URL'], count) for item_dict in batch)
+        storage.on_saved = on_saved
+        urls = [item_dict(n)['URL'] for n in range(3)]
+        for n in range(3):
+            storage.write(item_dict(n))
+        storage.close()
+        self.assertEqual([url for url, count in saved], urls)
+        self.assertTrue(all(count >= n + 1 for n, (url, count) in enumerate(saved)))
@@ -3,6 +3,30 @@ from test_initialiser import InitialiserTestcase
 from test_items import ItemsTestcase
 from test_saver import SaverTestcase
 from test_scraper import ScraperTestcase
+from test_driver_pool import DriverPoolTestcase
+from test_http_items import HttpItemsTestcase
+from test_items import BatchedItemsTestcase
+from test_readiness import ReadinessTestcase
+from test_initialiser import HttpDiscoveryTestcase
+from test_pipeline import StreamingPipelineTestcase
+from test_image_downloader import ImageDownloaderTestcase
+from test_recrawl import RecrawlTestcase
+from test_journal import CrawlJournalTestcase
+from test_storage import ShardedStorageTestcase
+from test_storage import SQLiteStorageTestcase
+from test_image_store import ImageStoreTestcase
+from test_scraper import MultiprocessScraperTestcase
+from test_work_queue import WorkQueueTestcase
+from test_concurrency import ConcurrencyControllerTestcase
+from test_rate_limit import RateLimitTestcase
+from test_metrics import MetricsTestcase
+from test_benchmark import BenchmarkTestcase
+from test_http_cache import HttpCacheTestcase
+from test_driver_factory import DriverFactoryTestcase
+from test_consent import ConsentJarTestcase
+from test_scheduler import FreshnessSchedulerTestcase
+from test_analytics import ScoreHistoryTestcase
+from test_corpus import CorpusIndexTestcase
 
 loader = unittest.TestLoader()
 suite = unittest.TestSuite()
@@ -11,6 +35,30 @@ suite.addTests(loader.loadTestsFromTestCase(InitialiserTestcase))
 suite.addTests(loader.loadTestsFromTestCase(ItemsTestcase))
 suite.addTests(loader.loadTestsFromTestCase(SaverTestcase))
 suite.addTests(loader.loadTestsFromTestCase(ScraperTestcase))
+suite.addTests(loader.loadTestsFromTestCase(DriverPoolTestcase))
+suite.addTests(loader.loadTestsFromTestCase(HttpItemsTestcase))
+suite.addTests(loader.loadTestsFromTestCase(BatchedItemsTestcase))
+suite.addTests(loader.loadTestsFromTestCase(ReadinessTestcase))
+suite.addTests(loader.loadTestsFromTestCase(HttpDiscoveryTestcase))
+suite.addTests(loader.loadTestsFromTestCase(StreamingPipelineTestcase))
+suite.addTests(loader.loadTestsFromTestCase(ImageDownloaderTestcase))
+suite.addTests(loader.loadTestsFromTestCase(RecrawlTestcase))
+suite.addTests(loader.loadTestsFromTestCase(CrawlJournalTestcase))
+suite.addTests(loader.loadTestsFromTestCase(ShardedStorageTestcase))
+suite.addTests(loader.loadTestsFromTestCase(SQLiteStorageTestcase))
+suite.addTests(loader.loadTestsFromTestCase(ImageStoreTestcase))
+suite.addTests(loader.loadTestsFromTestCase(MultiprocessScraperTestcase))
+suite.addTests(loader.loadTestsFromTestCase(WorkQueueTestcase))
+suite.addTests(loader.loadTestsFromTestCase(ConcurrencyControllerTestcase))
+suite.addTests(loader.loadTestsFromTestCase(RateLimitTestcase))
+suite.addTests(loader.loadTestsFromTestCase(MetricsTestcase))
+suite.addTests(loader.loadTestsFromTestCase(BenchmarkTestcase))
+suite.addTests(loader.loadTestsFromTestCase(HttpCacheTestcase))
+suite.addTests(loader.loadTestsFromTestCase(DriverFactoryTestcase))
+suite.addTests(loader.loadTestsFromTestCase(ConsentJarTestcase))
+suite.addTests(loader.loadTestsFromTestCase(FreshnessSchedulerTestcase))
+suite.addTests(loader.loadTestsFromTestCase(ScoreHistoryTestcase))
+suite.addTests(loader.loadTestsFromTestCase(CorpusIndexTestcase))
 
 runner = unittest.TextTestRunner()
 result = runner.run(suite)
\ No newline at end of file
@@ -0,0 +1,74 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import time
+import sys
+sys.path.append('../')
+from scraper.work_queue import WorkQueue
+from scraper.scraper import Scraper
+
+
+class WorkQueueTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dirs = tempfile.TemporaryDirectory()
+        self.path = f'{self.temp_dirs.name}/raw_data/work_queue.db'
+        self.urls = [f'https://www.rottentomatoes.com/tv/show_{n}' for n in range(5)]
+
+    def tearDown(self):
+        self.temp_dirs.cleanup()
+
+    def test_lease_and_expiry(self):
+        work_queue = WorkQueue(self.path, visibility_timeout=0.2, max_attempts=2)
+        self.assertEqual(work_queue.enqueue(self.urls), 5)
+        self.assertEqual(work_queue.enqueue(self.urls[:2]), 0)
+        other_queue = WorkQueue(self.path, visibility_timeout=0.2, max_attempts=2)
+        first = work_queue.lease('worker-a', 3)
+        second = other_queue.lease('worker-b', 3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(sorted(first + second), sorted(self.urls))
+        self.assertTrue(work_queue.mark(first[0], 'done', 'worker-a'))
+        self.assertFalse(work_queue.mark(second[0], 'done', 'worker-a'))
+        self.assertTrue(work_queue.mark(first[1], 'failed', 'worker-a'))
+        self.assertEqual(work_queue.counts()['pending'], 1)
+        time.sleep(0.1)
+        work_queue.heartbeat('worker-a')
+        time.sleep(0.15)
+        reissued = other_queue.lease('worker-b', 10)
+        self.assertEqual(sorted(reissued), sorted([first[1]] + second))
+        self.assertTrue(other_queue.mark(first[1], 'failed', 'worker-b'))
+        self.assertEqual(work_queue.counts()['failed'], 1)
+        self.assertFalse(work_queue.is_enqueue_complete())
+        work_queue.complete_enqueue()
+        self.assertTrue(other_queue.is_enqueue_complete())
+        self.assertEqual(work_queue.remaining(), 3)
+        work_queue.close()
+        other_queue.close()
+
+    def test_queue_scrape(self):
+        work_queue = WorkQueue(self.path)
+        work_queue.enqueue(self.urls)
+        work_queue.complete_enqueue()
+        item_dict = lambda url: None if url == self.urls[1] else {'Title': 'SHOW', 'URL': url, 'ID': url}
+        with patch.object(Scraper, 'get_items_with_driver', side_effect=item_dict), \
+                patch.object(Scraper, 'save_data', side_effect=lambda item_dict: scrape.journal.mark(item_dict['URL'], 'done')):
+            scrape = Scraper(max_workers=2, work_queue=work_queue, worker_name='worker-a', report_path=f'{self.temp_dirs.name}/raw_data/crawl_report.json')
+            scrape.perform_scrape()
+        self.assertEqual(sorted(scrape.url_list), sorted(self.urls))
+        self.assertEqual(work_queue.counts()['done'], 4)
+        self.assertEqual(work_queue.counts()['omitted'], 1)
+        self.assertTrue(work_queue.is_finished(self.urls[0]))
+        work_queue.close()
+
+    def test_enqueue(self):
+        work_queue = WorkQueue(self.path)
+        work_queue.enqueue(self.urls[:1])
+        def iter_urls(initialiser):
+            yield from self.urls + self.urls[2:3]
+        with patch('scraper.scraper.Initialiser.iter_urls', new=iter_urls):
+            scrape = Scraper(discovery='http', work_queue=work_queue, worker_name='enqueuer', report_path=f'{self.temp_dirs.name}/raw_data/crawl_report.json')
+            scrape.perform_enqueue()
+        self.assertTrue(work_queue.is_enqueue_complete())
+        self.assertEqual(work_queue.remaining(), 5)
+        self.assertEqual(scrape.metrics.counters['urls'], 4)
+        work_queue.close()